@@ -1,5 +1,14 @@
 -- DevOps Fraud Shield Database Schema
 -- SQLite database for storing analysis results, alerts, and commit data
+--
+-- The application creates and upgrades databases with the versioned
+-- migrations in backend/src/services/db_migrations.py; this file mirrors
+-- the latest schema version. A database created from it is still migrated
+-- on first use (every migration is idempotent), which stamps its version.
+
+-- Freed pages are returned by the retention job's incremental vacuum; this
+-- must be set before the first table is created
+PRAGMA auto_vacuum = INCREMENTAL;
 
 -- Analysis results table
 -- Stores results of fraud analysis for repositories
@@ -26,7 +35,8 @@ CREATE TABLE IF NOT EXISTS commit_analysis (
     repository TEXT,
     author TEXT,
     message TEXT,
-    created_at REAL DEFAULT (datetime('now'))
+    created_at REAL DEFAULT (datetime('now')),
+    updated_at REAL DEFAULT (datetime('now'))
 );
 
 -- Alerts table
@@ -77,7 +87,8 @@ CREATE TABLE IF NOT EXISTS contributors (
 );
 
 -- Webhook logs table
--- Stores incoming webhook payloads for auditing
+-- Stores incoming webhook payloads for auditing and serves as the durable
+-- ingest queue drained by the webhook worker pool
 CREATE TABLE IF NOT EXISTS webhook_logs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     event_type TEXT,
@@ -86,6 +97,14 @@ CREATE TABLE IF NOT EXISTS webhook_logs (
     signature_valid BOOLEAN,
     processed BOOLEAN DEFAULT FALSE,
     processing_time REAL,
+    attempts INTEGER DEFAULT 0,
+    claimed_at REAL,  -- lease start (unix time) of the worker processing it
+    claimed_by TEXT,
+    processed_at REAL,
+    error TEXT,  -- last failure, if any
+    delivery_key TEXT,  -- deduplication key, released after the dedup window
+    priority INTEGER DEFAULT 0,  -- 1 for default/protected branch events, claimed first
+    next_attempt_at REAL,  -- unix time before which a failed delivery is not retried
     created_at REAL DEFAULT (datetime('now'))
 );
 
@@ -115,16 +134,49 @@ CREATE TABLE IF NOT EXISTS audit_log (
     created_at REAL DEFAULT (datetime('now'))
 );
 
+-- Daily analysis rollups
+-- Per-repository daily aggregates of analyses removed by retention
+-- (source 'analysis' for analysis_results, 'commit' for commit_analysis)
+CREATE TABLE IF NOT EXISTS analysis_rollups (
+    source TEXT NOT NULL CHECK(source IN ('analysis', 'commit')),
+    repository TEXT NOT NULL,  -- '' when the analysis had none
+    day TEXT NOT NULL,  -- YYYY-MM-DD
+    analyses INTEGER NOT NULL DEFAULT 0,
+    high_risk_analyses INTEGER NOT NULL DEFAULT 0,
+    risk_score_sum REAL NOT NULL DEFAULT 0.0,
+    risk_score_count INTEGER NOT NULL DEFAULT 0,
+    max_risk_score REAL,
+    last_timestamp REAL,
+    PRIMARY KEY (source, repository, day)
+) WITHOUT ROWID;
+
 -- Indexes for performance
-CREATE INDEX IF NOT EXISTS idx_analysis_results_repository ON analysis_results(repository);
+-- Listing indexes end in created_at (and implicitly the rowid), matching the
+-- keyset pagination order (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_analysis_results_repository ON analysis_results(repository, created_at);
+CREATE INDEX IF NOT EXISTS idx_analysis_results_created_at ON analysis_results(created_at);
 CREATE INDEX IF NOT EXISTS idx_analysis_results_timestamp ON analysis_results(timestamp);
-CREATE INDEX IF NOT EXISTS idx_commit_analysis_commit_id ON commit_analysis(commit_id);
-CREATE INDEX IF NOT EXISTS idx_alerts_type ON alerts(type);
-CREATE INDEX IF NOT EXISTS idx_alerts_severity ON alerts(severity);
-CREATE INDEX IF NOT EXISTS idx_alerts_resolved ON alerts(resolved);
+CREATE INDEX IF NOT EXISTS idx_analysis_results_risk_score ON analysis_results(risk_score);
+CREATE INDEX IF NOT EXISTS idx_commit_analysis_repository ON commit_analysis(repository, created_at);
+CREATE INDEX IF NOT EXISTS idx_commit_analysis_created_at ON commit_analysis(created_at);
+CREATE INDEX IF NOT EXISTS idx_alerts_type ON alerts(type, created_at);
+CREATE INDEX IF NOT EXISTS idx_alerts_severity ON alerts(severity, created_at);
+CREATE INDEX IF NOT EXISTS idx_alerts_repository ON alerts(repository, created_at);
+CREATE INDEX IF NOT EXISTS idx_alerts_created_at ON alerts(created_at);
+-- Active alerts newest first, without a sort step
+CREATE INDEX IF NOT EXISTS idx_alerts_active ON alerts(resolved, created_at);
+-- Incremental exports seek on (updated_at, id)
+CREATE INDEX IF NOT EXISTS idx_analysis_results_updated_at ON analysis_results(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_commit_analysis_updated_at ON commit_analysis(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_alerts_updated_at ON alerts(updated_at, id);
 CREATE INDEX IF NOT EXISTS idx_repositories_name ON repositories(name);
 CREATE INDEX IF NOT EXISTS idx_contributors_repository ON contributors(repository);
 CREATE INDEX IF NOT EXISTS idx_webhook_logs_event_type ON webhook_logs(event_type);
+CREATE INDEX IF NOT EXISTS idx_webhook_logs_claim ON webhook_logs(processed, priority DESC, id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_webhook_logs_delivery_key ON webhook_logs(delivery_key) WHERE delivery_key IS NOT NULL;
+-- Covers the queue statistics aggregate
+CREATE INDEX IF NOT EXISTS idx_webhook_logs_state ON webhook_logs(processed, claimed_at, attempts, processing_time);
+CREATE INDEX IF NOT EXISTS idx_webhook_logs_created_at ON webhook_logs(created_at);
 CREATE INDEX IF NOT EXISTS idx_audit_log_action ON audit_log(action);
 
 -- Views for common queries
@@ -139,28 +191,62 @@ SELECT * FROM analysis_results
 WHERE risk_score > 0.7
 ORDER BY timestamp DESC;
 
+-- Live analyses plus the rollups of those removed by retention
 CREATE VIEW IF NOT EXISTS repository_stats AS
+WITH per_repository AS (
+    SELECT repository, COUNT(*) AS analyses, SUM(risk_score) AS risk_score_sum,
+           COUNT(risk_score) AS risk_score_count, MAX(timestamp) AS last_analysis
+    FROM analysis_results GROUP BY repository
+    UNION ALL
+    SELECT repository, SUM(analyses), SUM(risk_score_sum), SUM(risk_score_count), MAX(last_timestamp)
+    FROM analysis_rollups WHERE source = 'analysis' GROUP BY repository
+)
 SELECT
     r.name,
     r.total_commits,
-    COUNT(ar.id) as analysis_count,
-    AVG(ar.risk_score) as avg_risk_score,
-    MAX(ar.timestamp) as last_analysis
+    IFNULL(SUM(p.analyses), 0) as analysis_count,
+    SUM(p.risk_score_sum) / SUM(p.risk_score_count) as avg_risk_score,
+    MAX(p.last_analysis) as last_analysis
 FROM repositories r
-LEFT JOIN analysis_results ar ON r.name = ar.repository
+LEFT JOIN per_repository p ON r.name = p.repository
 GROUP BY r.name;
 
--- Triggers for automatic timestamp updates
+-- Triggers for automatic timestamp updates. The exported tables are stamped
+-- to the millisecond, since incremental exports seek on (updated_at, id)
 CREATE TRIGGER IF NOT EXISTS update_analysis_results_timestamp
-    AFTER UPDATE ON analysis_results
+    AFTER UPDATE ON analysis_results WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE analysis_results SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS analysis_results_insert_timestamp
+    AFTER INSERT ON analysis_results WHEN NEW.updated_at IS NULL
 BEGIN
-    UPDATE analysis_results SET updated_at = datetime('now') WHERE id = NEW.id;
+    UPDATE analysis_results SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_commit_analysis_timestamp
+    AFTER UPDATE ON commit_analysis WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE commit_analysis SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS commit_analysis_insert_timestamp
+    AFTER INSERT ON commit_analysis WHEN NEW.updated_at IS NULL
+BEGIN
+    UPDATE commit_analysis SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
 END;
 
 CREATE TRIGGER IF NOT EXISTS update_alerts_timestamp
-    AFTER UPDATE ON alerts
+    AFTER UPDATE ON alerts WHEN NEW.updated_at IS OLD.updated_at
 BEGIN
-    UPDATE alerts SET updated_at = datetime('now') WHERE id = NEW.id;
+    UPDATE alerts SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS alerts_insert_timestamp
+    AFTER INSERT ON alerts WHEN NEW.updated_at IS NULL
+BEGIN
+    UPDATE alerts SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
 END;
 
 CREATE TRIGGER IF NOT EXISTS update_repositories_timestamp
@@ -173,4 +259,316 @@ CREATE TRIGGER IF NOT EXISTS update_contributors_timestamp
     AFTER UPDATE ON contributors
 BEGIN
     UPDATE contributors SET updated_at = datetime('now') WHERE id = NEW.id;
-END;
\ No newline at end of file
+END;
+
+-- Statistics counters behind /api/fraud/stats, kept current by the triggers
+-- below in the same transaction as each write
+CREATE TABLE IF NOT EXISTS fraud_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_analyses INTEGER NOT NULL DEFAULT 0,
+    high_risk_analyses INTEGER NOT NULL DEFAULT 0,
+    risk_score_sum REAL NOT NULL DEFAULT 0.0,
+    risk_score_count INTEGER NOT NULL DEFAULT 0,
+    active_alerts INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO fraud_stats (id) VALUES (1);
+
+CREATE TRIGGER IF NOT EXISTS fraud_stats_analysis_insert
+    AFTER INSERT ON analysis_results
+BEGIN
+    UPDATE fraud_stats SET
+        total_analyses = total_analyses + 1,
+        high_risk_analyses = high_risk_analyses + IFNULL(NEW.risk_score > 0.7, 0),
+        risk_score_sum = risk_score_sum + IFNULL(NEW.risk_score, 0),
+        risk_score_count = risk_score_count + (NEW.risk_score IS NOT NULL)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS fraud_stats_analysis_delete
+    AFTER DELETE ON analysis_results
+BEGIN
+    UPDATE fraud_stats SET
+        total_analyses = total_analyses - 1,
+        high_risk_analyses = high_risk_analyses - IFNULL(OLD.risk_score > 0.7, 0),
+        risk_score_sum = risk_score_sum - IFNULL(OLD.risk_score, 0),
+        risk_score_count = risk_score_count - (OLD.risk_score IS NOT NULL)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS fraud_stats_analysis_rescore
+    AFTER UPDATE OF risk_score ON analysis_results
+BEGIN
+    UPDATE fraud_stats SET
+        high_risk_analyses = high_risk_analyses + IFNULL(NEW.risk_score > 0.7, 0) - IFNULL(OLD.risk_score > 0.7, 0),
+        risk_score_sum = risk_score_sum + IFNULL(NEW.risk_score, 0) - IFNULL(OLD.risk_score, 0),
+        risk_score_count = risk_score_count + (NEW.risk_score IS NOT NULL) - (OLD.risk_score IS NOT NULL)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS fraud_stats_alert_insert
+    AFTER INSERT ON alerts
+BEGIN
+    UPDATE fraud_stats SET
+        active_alerts = active_alerts + IFNULL(NEW.resolved = FALSE, 0)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS fraud_stats_alert_delete
+    AFTER DELETE ON alerts
+BEGIN
+    UPDATE fraud_stats SET
+        active_alerts = active_alerts - IFNULL(OLD.resolved = FALSE, 0)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS fraud_stats_alert_resolve
+    AFTER UPDATE OF resolved ON alerts
+BEGIN
+    UPDATE fraud_stats SET
+        active_alerts = active_alerts + IFNULL(NEW.resolved = FALSE, 0) - IFNULL(OLD.resolved = FALSE, 0)
+    WHERE id = 1;
+END;
+
+-- Rule violations normalized out of the rule_violations JSON of
+-- analysis_results (source 'analysis') and commit_analysis (source
+-- 'commit'), one row per violation or per file it names. Kept in step by
+-- the triggers below; scripts/backfill_violations.py fills in rows stored
+-- before the table existed.
+CREATE TABLE IF NOT EXISTS violations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL CHECK(source IN ('analysis', 'commit')),
+    source_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    severity TEXT,
+    commit_id TEXT,
+    repository TEXT,
+    file TEXT,
+    description TEXT,
+    created_at REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_violations_type ON violations(type, created_at);
+CREATE INDEX IF NOT EXISTS idx_violations_repository ON violations(repository, created_at);
+CREATE INDEX IF NOT EXISTS idx_violations_created_at ON violations(created_at);
+CREATE INDEX IF NOT EXISTS idx_violations_commit_id ON violations(commit_id);
+CREATE INDEX IF NOT EXISTS idx_violations_file ON violations(file) WHERE file IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_violations_source ON violations(source, source_id);
+
+CREATE TRIGGER IF NOT EXISTS violations_analysis_insert
+    AFTER INSERT ON analysis_results
+BEGIN
+    INSERT INTO violations (source, source_id, type, severity, commit_id, repository, file, description, created_at)
+    SELECT 'analysis', NEW.id,
+           COALESCE(json_extract(v.value, '$.type'), 'unknown'),
+           json_extract(v.value, '$.severity'),
+           COALESCE(json_extract(v.value, '$.commit_id'), NULL),
+           NEW.repository, f.value, json_extract(v.value, '$.description'), NEW.created_at
+    FROM json_each(CASE WHEN json_valid(NEW.rule_violations) THEN NEW.rule_violations ELSE '[]' END) AS v
+    LEFT JOIN json_each(CASE WHEN v.type = 'object' THEN
+                            CASE WHEN json_type(v.value, '$.files') = 'array'
+                                 THEN json_extract(v.value, '$.files') END
+                        END) AS f
+    WHERE v.type = 'object';
+END;
+
+CREATE TRIGGER IF NOT EXISTS violations_analysis_update
+    AFTER UPDATE OF rule_violations, repository, created_at ON analysis_results
+BEGIN
+    DELETE FROM violations WHERE source = 'analysis' AND source_id = OLD.id;
+    INSERT INTO violations (source, source_id, type, severity, commit_id, repository, file, description, created_at)
+    SELECT 'analysis', NEW.id,
+           COALESCE(json_extract(v.value, '$.type'), 'unknown'),
+           json_extract(v.value, '$.severity'),
+           COALESCE(json_extract(v.value, '$.commit_id'), NULL),
+           NEW.repository, f.value, json_extract(v.value, '$.description'), NEW.created_at
+    FROM json_each(CASE WHEN json_valid(NEW.rule_violations) THEN NEW.rule_violations ELSE '[]' END) AS v
+    LEFT JOIN json_each(CASE WHEN v.type = 'object' THEN
+                            CASE WHEN json_type(v.value, '$.files') = 'array'
+                                 THEN json_extract(v.value, '$.files') END
+                        END) AS f
+    WHERE v.type = 'object';
+END;
+
+CREATE TRIGGER IF NOT EXISTS violations_analysis_delete
+    AFTER DELETE ON analysis_results
+BEGIN
+    DELETE FROM violations WHERE source = 'analysis' AND source_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS violations_commit_insert
+    AFTER INSERT ON commit_analysis
+BEGIN
+    INSERT INTO violations (source, source_id, type, severity, commit_id, repository, file, description, created_at)
+    SELECT 'commit', NEW.id,
+           COALESCE(json_extract(v.value, '$.type'), 'unknown'),
+           json_extract(v.value, '$.severity'),
+           COALESCE(json_extract(v.value, '$.commit_id'), NEW.commit_id),
+           NEW.repository, f.value, json_extract(v.value, '$.description'), NEW.created_at
+    FROM json_each(CASE WHEN json_valid(NEW.rule_violations) THEN NEW.rule_violations ELSE '[]' END) AS v
+    LEFT JOIN json_each(CASE WHEN v.type = 'object' THEN
+                            CASE WHEN json_type(v.value, '$.files') = 'array'
+                                 THEN json_extract(v.value, '$.files') END
+                        END) AS f
+    WHERE v.type = 'object';
+END;
+
+CREATE TRIGGER IF NOT EXISTS violations_commit_update
+    AFTER UPDATE OF rule_violations, repository, created_at ON commit_analysis
+BEGIN
+    DELETE FROM violations WHERE source = 'commit' AND source_id = OLD.id;
+    INSERT INTO violations (source, source_id, type, severity, commit_id, repository, file, description, created_at)
+    SELECT 'commit', NEW.id,
+           COALESCE(json_extract(v.value, '$.type'), 'unknown'),
+           json_extract(v.value, '$.severity'),
+           COALESCE(json_extract(v.value, '$.commit_id'), NEW.commit_id),
+           NEW.repository, f.value, json_extract(v.value, '$.description'), NEW.created_at
+    FROM json_each(CASE WHEN json_valid(NEW.rule_violations) THEN NEW.rule_violations ELSE '[]' END) AS v
+    LEFT JOIN json_each(CASE WHEN v.type = 'object' THEN
+                            CASE WHEN json_type(v.value, '$.files') = 'array'
+                                 THEN json_extract(v.value, '$.files') END
+                        END) AS f
+    WHERE v.type = 'object';
+END;
+
+CREATE TRIGGER IF NOT EXISTS violations_commit_delete
+    AFTER DELETE ON commit_analysis
+BEGIN
+    DELETE FROM violations WHERE source = 'commit' AND source_id = OLD.id;
+END;
+
+-- Full-text indexes behind /api/search. External-content FTS5 tables: they
+-- store only the index and read the text from the source table, so every
+-- insert, update and delete of the indexed columns must go through the
+-- triggers below.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS commit_search USING fts5(
+    message, author,
+    content='commit_analysis', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS commit_search_insert
+    AFTER INSERT ON commit_analysis
+BEGIN
+    INSERT INTO commit_search (rowid, message, author) VALUES (NEW.id, NEW.message, NEW.author);
+END;
+
+CREATE TRIGGER IF NOT EXISTS commit_search_update
+    AFTER UPDATE OF message, author ON commit_analysis
+BEGIN
+    INSERT INTO commit_search (commit_search, rowid, message, author) VALUES ('delete', OLD.id, OLD.message, OLD.author);
+    INSERT INTO commit_search (rowid, message, author) VALUES (NEW.id, NEW.message, NEW.author);
+END;
+
+CREATE TRIGGER IF NOT EXISTS commit_search_delete
+    AFTER DELETE ON commit_analysis
+BEGIN
+    INSERT INTO commit_search (commit_search, rowid, message, author) VALUES ('delete', OLD.id, OLD.message, OLD.author);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS alert_search USING fts5(
+    message,
+    content='alerts', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS alert_search_insert
+    AFTER INSERT ON alerts
+BEGIN
+    INSERT INTO alert_search (rowid, message) VALUES (NEW.id, NEW.message);
+END;
+
+CREATE TRIGGER IF NOT EXISTS alert_search_update
+    AFTER UPDATE OF message ON alerts
+BEGIN
+    INSERT INTO alert_search (alert_search, rowid, message) VALUES ('delete', OLD.id, OLD.message);
+    INSERT INTO alert_search (rowid, message) VALUES (NEW.id, NEW.message);
+END;
+
+CREATE TRIGGER IF NOT EXISTS alert_search_delete
+    AFTER DELETE ON alerts
+BEGIN
+    INSERT INTO alert_search (alert_search, rowid, message) VALUES ('delete', OLD.id, OLD.message);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS violation_search USING fts5(
+    description, file,
+    content='violations', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS violation_search_insert
+    AFTER INSERT ON violations
+BEGIN
+    INSERT INTO violation_search (rowid, description, file) VALUES (NEW.id, NEW.description, NEW.file);
+END;
+
+CREATE TRIGGER IF NOT EXISTS violation_search_update
+    AFTER UPDATE OF description, file ON violations
+BEGIN
+    INSERT INTO violation_search (violation_search, rowid, description, file) VALUES ('delete', OLD.id, OLD.description, OLD.file);
+    INSERT INTO violation_search (rowid, description, file) VALUES (NEW.id, NEW.description, NEW.file);
+END;
+
+CREATE TRIGGER IF NOT EXISTS violation_search_delete
+    AFTER DELETE ON violations
+BEGIN
+    INSERT INTO violation_search (violation_search, rowid, description, file) VALUES ('delete', OLD.id, OLD.description, OLD.file);
+END;
+
+-- Append-only log behind the live event feed (/api/events). The triggers
+-- below add an entry in the same transaction as each analysis,
+-- re-analysis, alert and resolution; every API process tails it by id.
+-- Old entries are removed by retention.
+CREATE TABLE IF NOT EXISTS event_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,  -- JSON event payload
+    created_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)  -- unix time
+);
+
+CREATE INDEX IF NOT EXISTS idx_event_log_created_at ON event_log(created_at);
+
+CREATE TRIGGER IF NOT EXISTS event_log_analysis_results_insert
+    AFTER INSERT ON analysis_results
+BEGIN
+    INSERT INTO event_log (type, data) VALUES ('analysis', json_object(
+        'id', NEW.id, 'repository', NEW.repository, 'timestamp', NEW.timestamp, 'risk_score', NEW.risk_score,
+        'violations', CASE WHEN json_valid(NEW.rule_violations) AND json_type(NEW.rule_violations) = 'array'
+                           THEN json_array_length(NEW.rule_violations) ELSE 0 END));
+END;
+
+CREATE TRIGGER IF NOT EXISTS event_log_commit_analysis_insert
+    AFTER INSERT ON commit_analysis
+BEGIN
+    INSERT INTO event_log (type, data) VALUES ('commit_analysis', json_object(
+        'id', NEW.id, 'commit_id', NEW.commit_id, 'repository', NEW.repository, 'author', NEW.author,
+        'risk_score', NEW.risk_score,
+        'violations', CASE WHEN json_valid(NEW.rule_violations) AND json_type(NEW.rule_violations) = 'array'
+                           THEN json_array_length(NEW.rule_violations) ELSE 0 END));
+END;
+
+CREATE TRIGGER IF NOT EXISTS event_log_commit_analysis_update
+    AFTER UPDATE OF risk_score, rule_violations ON commit_analysis
+BEGIN
+    INSERT INTO event_log (type, data) VALUES ('commit_analysis', json_object(
+        'id', NEW.id, 'commit_id', NEW.commit_id, 'repository', NEW.repository, 'author', NEW.author,
+        'risk_score', NEW.risk_score,
+        'violations', CASE WHEN json_valid(NEW.rule_violations) AND json_type(NEW.rule_violations) = 'array'
+                           THEN json_array_length(NEW.rule_violations) ELSE 0 END));
+END;
+
+CREATE TRIGGER IF NOT EXISTS event_log_alerts_insert
+    AFTER INSERT ON alerts
+BEGIN
+    INSERT INTO event_log (type, data) VALUES ('alert', json_object(
+        'id', NEW.id, 'type', NEW.type, 'severity', NEW.severity, 'message', NEW.message,
+        'repository', NEW.repository, 'commit_id', NEW.commit_id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS event_log_alerts_update
+    AFTER UPDATE OF resolved ON alerts WHEN NEW.resolved AND NOT OLD.resolved
+BEGIN
+    INSERT INTO event_log (type, data) VALUES ('alert_resolved', json_object('id', NEW.id));
+END;
@@ -0,0 +1,20 @@
+"""Gunicorn settings for running the API with several worker processes
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported and its shared services warmed in the master before
+workers are forked, so every worker shares the engine, threat signatures
+and model pages copy-on-write instead of building its own copy.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any fork
+    from src.api.dependencies import get_container
+    get_container().warm_up(freeze=True)
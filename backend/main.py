@@ -1,30 +1,48 @@
-print("=== Starting DevOps Fraud Shield Backend ===")
-print("Python path:", __file__)
+import time
 
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
+from fastapi.responses import JSONResponse
 import os
-from dotenv import load_dotenv
 
-print("Basic imports completed")
+# Importing the routers only defines routes; the engine, signatures and
+# database behind them are built by the container on warm-up or first use.
+# A router that fails to import stops the process here instead of the API
+# coming up without it.
+from src.utils.logger import get_logger
+from src.api.dependencies import get_container
+from src.api import (
+    simulate_routes, webhook_handler, fraud_controller, alerts_controller, search_controller, export_controller,
+    events_controller
+)
 
-# ------- Logger Safe Import -------
-try:
-    from src.utils.logger import get_logger
-    from src.utils.config import Config
-    logger = get_logger(__name__)
-    print("Logger loaded")
-except Exception as e:
-    print("Logger failed:", e)
-    import logging
-    logging.basicConfig(level=logging.INFO)
-    logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
-load_dotenv()
+# ------- Lifespan -------
+@asynccontextmanager
+async def lifespan(app):
+    # Build the shared services before serving (a no-op when a pre-forking
+    # server already warmed them in the master), then drain the durable
+    # webhook queue in a dedicated worker pool
+    container = get_container()
+    container.warm_up()
+    # Tail the event log for /api/events, which carries every process's writes
+    container.db_service.event_feed.start()
+    container.webhook_workers.start()
+    # Periodic retention, rollups and incremental vacuum
+    container.retention.start()
+    yield
+    container.retention.stop()
+    container.webhook_workers.stop()
+    container.async_db.close()
+    # Drain buffered writes before the process exits
+    container.db_service.close()
 
 # ------- Create FastAPI App -------
-app = FastAPI(title="DevOps Fraud Shield API", version="1.0.0")
+app = FastAPI(title="DevOps Fraud Shield API", version="1.0.0", lifespan=lifespan)
 
 # ------- CORS -------
 app.add_middleware(
@@ -35,41 +53,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-print("Including routers...")
-
 # ------- Routers -------
-# ---- SIMULATE ROUTER ----
-try:
-    from src.api import simulate_routes
-    
-    app.include_router(
-        simulate_routes.router, 
-        prefix="/api/simulate", 
-        tags=["simulation"]
-    )
-    print("Simulate router loaded successfully (New File)")
-except Exception as e:
-    print("CRITICAL ERROR loading Simulate Router:", e)
-
-try:
-    from src.api.webhook_handler import router as webhook_router
-    app.include_router(webhook_router, prefix="/api", tags=["webhook"])
-except Exception as e:
-    print("Webhook router error:", e)
-
-try:
-    from src.api.fraud_controller import router as fraud_router
-    app.include_router(fraud_router, prefix="/api/fraud", tags=["fraud"])
-except Exception as e:
-    print("Fraud router error:", e)
-
-try:
-    from src.api.alerts_controller import router as alerts_router
-    app.include_router(alerts_router, prefix="/api/alerts", tags=["alerts"])
-except Exception as e:
-    print("Alerts router error:", e)
-
-print("Routers loaded successfully")
+app.include_router(simulate_routes.router, prefix="/api/simulate", tags=["simulation"])
+app.include_router(webhook_handler.router, prefix="/api", tags=["webhook"])
+app.include_router(fraud_controller.router, prefix="/api/fraud", tags=["fraud"])
+app.include_router(alerts_controller.router, prefix="/api/alerts", tags=["alerts"])
+app.include_router(search_controller.router, prefix="/api/search", tags=["search"])
+app.include_router(export_controller.router, prefix="/api/export", tags=["export"])
+app.include_router(events_controller.router, prefix="/api/events", tags=["events"])
 
 # ------- Base Routes -------
 @app.get("/")
@@ -80,7 +71,18 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    container = get_container()
+    if not container.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready", "startup_timings": container.startup_timings}
+
+get_container().startup_timings["import"] = round(time.perf_counter() - _import_started, 4)
+logger.info(f"API module loaded in {get_container().startup_timings['import'] * 1000:.1f}ms")
+
 # ------- Start Server -------
 if __name__ == "__main__":
+    import uvicorn
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
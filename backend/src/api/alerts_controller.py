@@ -1,36 +1,64 @@
-from fastapi import APIRouter, HTTPException, Query
-from ..services.db_service import DBService
-from ..services.slack_service import SlackService
-from ..services.email_service import EmailService
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from .dependencies import get_container
 from ..utils.logger import get_logger
+from ..utils.pagination import MAX_PAGE_SIZE, parse_fields
 from typing import Optional
 import time
 
 router = APIRouter()
 logger = get_logger(__name__)
-db_service = DBService()
-slack_service = SlackService()
-email_service = EmailService()
+container = get_container()
 
 @router.get("/recent")
-async def get_recent_alerts(limit: int = Query(50, description="Maximum number of alerts to return")):
-    """Get recent security alerts"""
-    try:
-        alerts = db_service.get_recent_alerts(limit)
+async def get_recent_alerts(request: Request,
+                            limit: int = Query(50, description="Maximum number of alerts to return")):
+    """Get recent security alerts (served from the response cache)"""
+    async def recent():
+        alerts = await container.async_db.get_recent_alerts(limit)
         return {
             "status": "success",
             "count": len(alerts),
             "alerts": alerts
         }
+
+    try:
+        return await container.response_cache.respond(request, f"recent_alerts:{limit}", recent)
     except Exception as e:
         logger.error(f"Error getting recent alerts: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve alerts")
 
+@router.get("")
+async def list_alerts(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    repository: Optional[str] = None,
+    severity: Optional[str] = None,
+    type: Optional[str] = None,
+    resolved: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return")
+):
+    """List alerts newest first, one keyset page at a time"""
+    try:
+        page = await container.async_db.list_alerts(limit, cursor, repository=repository, severity=severity,
+                                                    alert_type=type, resolved=resolved,
+                                                    fields=parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=500, detail="Failed to retrieve alerts")
+    return {
+        "status": "success",
+        "count": len(page["items"]),
+        "alerts": page["items"],
+        "next_cursor": page["next_cursor"]
+    }
+
 @router.put("/{alert_id}/resolve")
 async def resolve_alert(alert_id: int):
     """Mark an alert as resolved"""
     try:
-        success = db_service.resolve_alert(alert_id)
+        success = await container.async_db.resolve_alert(alert_id)
         if not success:
             raise HTTPException(status_code=404, detail="Alert not found")
 
@@ -45,10 +73,10 @@ async def resolve_alert(alert_id: int):
         raise HTTPException(status_code=500, detail="Failed to resolve alert")
 
 @router.post("/test/slack")
-async def test_slack_notification():
+def test_slack_notification():
     """Test Slack notification functionality"""
     try:
-        success = slack_service.send_alert(
+        success = container.slack_service.send_alert(
             "🧪 Test Alert from DevOps Fraud Shield\nThis is a test notification to verify Slack integration.",
             severity="low"
         )
@@ -66,10 +94,10 @@ async def test_slack_notification():
         raise HTTPException(status_code=500, detail="Slack test failed")
 
 @router.post("/test/email")
-async def test_email_notification():
+def test_email_notification():
     """Test email notification functionality"""
     try:
-        success = email_service.send_alert(
+        success = container.email_service.send_alert(
             "Test Alert",
             "🧪 Test Alert from DevOps Fraud Shield\nThis is a test notification to verify email integration.",
             ["test@example.com"]  # In production, this should be configurable
@@ -87,38 +115,27 @@ async def test_email_notification():
         logger.error(f"Error testing email notification: {e}")
         raise HTTPException(status_code=500, detail="Email test failed")
 
+async def _alerts_summary():
+    summary = await container.async_db.get_alerts_summary()
+    if summary is None:
+        return None
+    summary["generated_at"] = time.time()
+    return {
+        "status": "success",
+        "summary": summary
+    }
+
 @router.get("/summary")
-async def get_alerts_summary():
-    """Get alerts summary statistics"""
+async def get_alerts_summary(request: Request):
+    """Get alerts summary statistics (served from the response cache)"""
     try:
-        alerts = db_service.get_recent_alerts(1000)  # Get many for summary
-
-        # Calculate summary statistics
-        total_alerts = len(alerts)
-        active_alerts = len([a for a in alerts if not a.get("resolved", False)])
-
-        severity_counts = {}
-        for alert in alerts:
-            severity = alert.get("severity", "unknown")
-            severity_counts[severity] = severity_counts.get(severity, 0) + 1
-
-        # Group by type
-        type_counts = {}
-        for alert in alerts:
-            alert_type = alert.get("type", "unknown")
-            type_counts[alert_type] = type_counts.get(alert_type, 0) + 1
-
-        return {
-            "status": "success",
-            "summary": {
-                "total_alerts": total_alerts,
-                "active_alerts": active_alerts,
-                "severity_breakdown": severity_counts,
-                "type_breakdown": type_counts,
-                "generated_at": time.time()
-            }
-        }
+        response = await container.response_cache.respond(request, "alerts_summary", _alerts_summary)
+        if response is None:
+            raise HTTPException(status_code=500, detail="Failed to generate summary")
+        return response
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting alerts summary: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate summary")
@@ -128,20 +145,20 @@ async def escalate_alert(alert_id: int, priority: Optional[str] = "high"):
     """Escalate an alert with higher priority notifications"""
     try:
         # Get alert details
-        alerts = db_service.get_recent_alerts(1000)
-        alert = next((a for a in alerts if a["id"] == alert_id), None)
+        alert = await container.async_db.get_alert(alert_id)
 
         if not alert:
             raise HTTPException(status_code=404, detail="Alert not found")
 
-        # Send escalated notifications
+        # Send escalated notifications; the senders block, so they run in the threadpool
         message = f"🚨 ESCALATED ALERT 🚨\n\n{alert['message']}\n\nPriority: {priority.upper()}"
 
         # Send to Slack with high priority
-        slack_service.send_alert(message, severity="high")
+        await run_in_threadpool(container.slack_service.send_alert, message, severity="high")
 
         # Send email to additional recipients
-        email_service.send_alert(
+        await run_in_threadpool(
+            container.email_service.send_alert,
             f"ESCALATED: {alert['type']}",
             message,
             ["security-lead@company.com", "devops-team@company.com"]  # Configurable
@@ -156,4 +173,12 @@ async def escalate_alert(alert_id: int, priority: Optional[str] = "high"):
         raise
     except Exception as e:
         logger.error(f"Error escalating alert {alert_id}: {e}")
-        raise HTTPException(status_code=500, detail="Failed to escalate alert")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to escalate alert")
+
+@router.get("/{alert_id}")
+async def get_alert(alert_id: int):
+    """Get a single alert by ID"""
+    alert = await container.async_db.get_alert(alert_id)
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    return {"status": "success", "alert": alert}
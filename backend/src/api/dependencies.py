@@ -0,0 +1,170 @@
+import gc
+import re
+import threading
+import time
+from functools import cached_property
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class AppContainer:
+    """Process-wide services shared by every router
+
+    Each component is built once, on first access, and the fraud engine is
+    wired from the same DB service, rule engine (with its threat signature
+    snapshot) and AI analyzer the routes use. ``warm_up`` builds everything
+    up front; under a pre-forking server it runs in the master so workers
+    share the loaded state copy-on-write.
+
+    Components can be supplied as keyword arguments, which is how tests
+    swap in a temporary database or stub services.
+    """
+
+    def __init__(self, **overrides):
+        for name, value in overrides.items():
+            setattr(self, name, value)
+        self.ready = False
+        self.startup_timings = {}
+        self._lock = threading.Lock()
+
+    @cached_property
+    def db_service(self):
+        from ..services.db_service import DBService
+        return DBService()
+
+    @cached_property
+    def async_db(self):
+        from ..services.async_db import AsyncDBService
+        return AsyncDBService(self.db_service)
+
+    @cached_property
+    def response_cache(self):
+        from .response_cache import ResponseCache
+        return ResponseCache(self.db_service)
+
+    @cached_property
+    def threat_signatures(self):
+        from ..utils.threat_signatures import ThreatSignatures
+        return ThreatSignatures()
+
+    @cached_property
+    def rule_engine(self):
+        from ..core.rule_engine import RuleEngine
+        return RuleEngine(threat_signatures=self.threat_signatures)
+
+    @cached_property
+    def ai_analyzer(self):
+        from ..core.ai_analyzer import AIAnalyzer
+        return AIAnalyzer()
+
+    @cached_property
+    def slack_service(self):
+        from ..services.slack_service import SlackService
+        return SlackService()
+
+    @cached_property
+    def email_service(self):
+        from ..services.email_service import EmailService
+        return EmailService()
+
+    @cached_property
+    def fraud_engine(self):
+        from ..core.fraud_engine import FraudEngine
+        return FraudEngine(ai_analyzer=self.ai_analyzer, rule_engine=self.rule_engine,
+                           db_service=self.db_service, slack_service=self.slack_service,
+                           email_service=self.email_service)
+
+    @cached_property
+    def gitlab_service(self):
+        from ..services.gitlab_service import GitLabService
+        return GitLabService()
+
+    @cached_property
+    def webhook_validator(self):
+        from ..utils.validator import WebhookValidator
+        return WebhookValidator()
+
+    @cached_property
+    def rate_limiter(self):
+        from ..utils.validator import RateLimiter
+        return RateLimiter()
+
+    @cached_property
+    def deduplicator(self):
+        from ..services.webhook_dedup import WebhookDeduplicator
+        return WebhookDeduplicator(self.db_service)
+
+    @cached_property
+    def admission(self):
+        from ..services.webhook_admission import WebhookAdmissionController
+        return WebhookAdmissionController(self.async_db)
+
+    @cached_property
+    def retention(self):
+        from ..services.retention import RetentionManager
+        return RetentionManager(self.db_service)
+
+    @cached_property
+    def exporter(self):
+        from ..services.data_export import DataExporter
+        return DataExporter(self.db_service)
+
+    @cached_property
+    def webhook_workers(self):
+        from ..services.webhook_queue import WebhookWorkerPool
+        from . import webhook_handler
+        return WebhookWorkerPool(self.db_service, {
+            "push": webhook_handler.process_push_event,
+            "merge_request": webhook_handler.process_merge_event,
+            "pull_request": webhook_handler.process_merge_event
+        }, maintenance=self.deduplicator.release_expired)
+
+    def warm_up(self, freeze=False):
+        """Build every component and prime the caches the request path uses
+
+        With ``freeze=True`` the resulting objects are moved out of the
+        garbage collector's tracked generations (``gc.freeze``), so forked
+        workers don't dirty the shared pages when the collector runs.
+        Failures propagate so the server refuses to start rather than
+        serve with a broken engine. Safe to call more than once.
+        """
+        with self._lock:
+            if not self.ready:
+                self._timed("database", self.db_service._ensure_tables)
+                # re caches compiled patterns; compile the signatures once here
+                self._timed("threat_signatures", lambda: [
+                    re.compile(pattern) for pattern in self.threat_signatures.get_code_injection_patterns()
+                ])
+                self._timed("ai_model", lambda: self.ai_analyzer)
+                self._timed("fraud_engine", lambda: self.fraud_engine)
+                self._timed("integrations", lambda: (self.gitlab_service, self.webhook_validator))
+                self._timed("webhook_ingest", lambda: (self.deduplicator, self.admission,
+                                                       self.webhook_workers))
+                self.ready = True
+                breakdown = ", ".join(f"{name}={seconds * 1000:.1f}ms"
+                                      for name, seconds in self.startup_timings.items())
+                logger.info(f"Application container warmed up ({breakdown})")
+        if freeze:
+            gc.collect()
+            gc.freeze()
+
+    def _timed(self, name, build):
+        """Run one warm-up step, recording how long it took"""
+        started = time.perf_counter()
+        build()
+        self.startup_timings[name] = round(time.perf_counter() - started, 4)
+
+
+_container = None
+_container_lock = threading.Lock()
+
+
+def get_container():
+    """Return the process-wide container, creating it on first use"""
+    global _container
+    if _container is None:
+        with _container_lock:
+            if _container is None:
+                _container = AppContainer()
+    return _container
@@ -0,0 +1,75 @@
+import json
+from fastapi import APIRouter, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from .dependencies import get_container
+from ..utils.logger import get_logger
+from typing import Optional
+
+router = APIRouter()
+logger = get_logger(__name__)
+container = get_container()
+
+# How long an EventSource waits before reconnecting, in milliseconds
+SSE_RETRY_MS = 3000
+
+
+def parse_event_id(value):
+    """A Last-Event-ID as an int; anything else starts with new events only"""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_types(value):
+    return {t.strip() for t in value.split(",") if t.strip()} if value else None
+
+
+async def sse_stream(events):
+    """Encode a subscription as a text/event-stream; heartbeats are comments"""
+    yield f"retry: {SSE_RETRY_MS}\n\n".encode("utf-8")
+    try:
+        async for event in events:
+            if event is None:
+                yield b": keep-alive\n\n"
+                continue
+            data = json.dumps({"time": event["time"], **event["data"]}, separators=(",", ":"), default=str)
+            yield f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n".encode("utf-8")
+    finally:
+        # Unsubscribe as soon as the client goes away
+        await events.aclose()
+
+
+@router.get("")
+async def stream_events(
+    types: Optional[str] = Query(None, description="Comma-separated event types, e.g. alert,analysis"),
+    last_event_id: Optional[str] = Query(None, description="Resume after this event id"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """Live feed of committed analyses and alerts as server-sent events
+
+    EventSource reconnects send ``Last-Event-ID``, and the missed events
+    still held are replayed; a ``resync`` event means some were dropped.
+    """
+    events = container.db_service.subscribe_events(parse_event_id(last_event_id_header or last_event_id),
+                                                   parse_types(types))
+    return StreamingResponse(sse_stream(events), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # Stop nginx from buffering the stream
+        "X-Accel-Buffering": "no"
+    })
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, types: Optional[str] = None, last_event_id: Optional[str] = None):
+    """The same feed over a WebSocket, one JSON message per event"""
+    await websocket.accept()
+    events = container.db_service.subscribe_events(parse_event_id(last_event_id), parse_types(types))
+    try:
+        async for event in events:
+            message = {"type": "ping"} if event is None else event
+            await websocket.send_text(json.dumps(message, separators=(",", ":"), default=str))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await events.aclose()
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from .dependencies import get_container
+from ..services.data_export import FORMATS
+from ..utils.logger import get_logger
+
+router = APIRouter()
+logger = get_logger(__name__)
+container = get_container()
+
+@router.get("/{table}")
+async def export_table(
+    table: str,
+    format: str = Query("ndjson", description="ndjson or csv"),
+    gzip: bool = Query(False, description="gzip-compress the download"),
+    since: Optional[str] = Query(None, description="X-Export-Watermark of the previous export")
+):
+    """Stream every row of a table added or updated after ``since`` as a download
+
+    The rows are read in batches while the response is sent, so exports of
+    any size run in constant memory. ``X-Export-Watermark`` marks the last
+    row included; pass it as ``since`` next time to export only the rows
+    added or updated since, including re-analyzed commits and resolved
+    alerts.
+    """
+    if table not in container.db_service.EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export table: {table}")
+    try:
+        watermark = await container.async_db.get_export_watermark(table)
+        chunks = container.exporter.stream(table, format, since, watermark, compress=gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error starting export of {table}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to start export")
+
+    filename = f"{table}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Export-Watermark": watermark or since or ""
+        }
+    )
@@ -1,30 +1,43 @@
-from fastapi import APIRouter, HTTPException, Query
-from ..core.fraud_engine import FraudEngine
-from ..services.gitlab_service import GitLabService
-from ..services.db_service import DBService
+from fastapi import APIRouter, HTTPException, Query, Request
+from .dependencies import get_container
 from ..utils.logger import get_logger
+from ..utils.config import Config
+from ..utils.deadline import Deadline
+from ..utils.pagination import MAX_PAGE_SIZE, parse_fields
 from typing import Optional
 import time
 
 router = APIRouter()
 logger = get_logger(__name__)
-fraud_engine = FraudEngine()
-gitlab_service = GitLabService()
-db_service = DBService()
+container = get_container()
+
+# Fields of a /series point, each returned as one array
+SERIES_FIELDS = ("time", "analyses", "high_risk_analyses", "average_risk_score", "max_risk_score")
 
 @router.post("/analyze")
-async def analyze_repository(project_id: str = Query(..., description="GitLab project ID")):
-    """Manually trigger fraud analysis for a repository"""
+def analyze_repository(project_id: str = Query(..., description="GitLab project ID")):
+    """Manually trigger fraud analysis for a repository
+
+    The whole request (fetch, analyze, store, alert) runs under a hard
+    ``ANALYZE_SLA_SECONDS`` budget. When the budget runs out the best
+    available result is returned with ``partial: true``. The GitLab calls
+    and the analysis block, so this is a plain function that FastAPI runs
+    in its threadpool, away from the event loop.
+    """
+    deadline = Deadline(Config.ANALYZE_SLA_SECONDS)
+    skipped_stages = []
     try:
         logger.info(f"Manual analysis requested for project {project_id}")
 
         # Get project information
-        project_info = gitlab_service.get_project_info(project_id)
+        project_info = container.gitlab_service.get_project_info(project_id, deadline=deadline)
         if not project_info:
+            if deadline.expired():
+                raise HTTPException(status_code=504, detail="Analysis SLA exceeded while fetching project")
             raise HTTPException(status_code=404, detail="Project not found")
 
         # Get recent commits
-        commits = gitlab_service.get_project_commits(project_id)
+        commits = container.gitlab_service.get_project_commits(project_id, deadline=deadline)
         if not commits:
             return {
                 "status": "no_commits",
@@ -35,12 +48,20 @@ async def analyze_repository(project_id: str = Query(..., description="GitLab pr
         # Get detailed commit information
         detailed_commits = []
         for commit in commits[:10]:  # Limit to last 10 commits for performance
-            details = gitlab_service.get_commit_details(project_id, commit["id"])
+            if deadline.expired():
+                skipped_stages.append("fetch_commits")
+                break
+            # Line stats are exact per commit; paths and diff load lazily
+            details = container.gitlab_service.get_commit_details(project_id, commit["id"], deadline=deadline)
             if details:
                 detailed_commits.append(details)
 
         # Get contributors
-        contributors = gitlab_service.get_project_contributors(project_id)
+        contributors = []
+        if deadline.expired():
+            skipped_stages.append("fetch_contributors")
+        else:
+            contributors = container.gitlab_service.get_project_contributors(project_id, deadline=deadline)
 
         # Prepare repository data
         repo_data = {
@@ -53,79 +74,240 @@ async def analyze_repository(project_id: str = Query(..., description="GitLab pr
         }
 
         # Run analysis
-        result = fraud_engine.analyze_repository(repo_data, detailed_commits)
+        result = container.fraud_engine.analyze_repository(repo_data, detailed_commits, deadline=deadline)
+        result["skipped_stages"] = skipped_stages + result["skipped_stages"]
+        result["partial"] = bool(result["skipped_stages"])
 
         return {
-            "status": "completed",
+            "status": "partial" if result["partial"] else "completed",
             "project": project_info["name"],
-            "analysis": result
+            "analysis": result,
+            "sla_seconds": deadline.budget,
+            "elapsed_seconds": round(deadline.elapsed(), 3)
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in manual analysis: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+async def _fraud_stats():
+    return {
+        "status": "success",
+        "data": await container.async_db.get_fraud_stats()
+    }
+
 @router.get("/stats")
-async def get_fraud_stats():
-    """Get overall fraud detection statistics"""
+async def get_fraud_stats(request: Request, verify: bool = False):
+    """Get overall fraud detection statistics
+
+    Served from the response cache (with ``ETag``/304 support). With
+    ``verify=true`` the precomputed counters are instead read fresh and
+    checked against a full recount of the tables.
+    """
     try:
-        stats = db_service.get_fraud_stats()
-        return {
-            "status": "success",
-            "data": stats
-        }
+        if not verify:
+            return await container.response_cache.respond(request, "fraud_stats", _fraud_stats)
+        response = await _fraud_stats()
+        response["consistency"] = await container.async_db.check_fraud_stats()
+        return response
     except Exception as e:
         logger.error(f"Error getting fraud stats: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve statistics")
 
+@router.get("/analyses")
+async def list_analyses(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    repository: Optional[str] = None,
+    min_risk: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_risk: Optional[float] = Query(None, ge=0.0, le=1.0),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return")
+):
+    """List repository analysis results newest first, one keyset page at a time"""
+    return await _listing_response(container.async_db.list_analysis_results, limit, cursor, repository,
+                                   min_risk, max_risk, fields)
+
+@router.get("/commits")
+async def list_commit_analyses(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    repository: Optional[str] = None,
+    min_risk: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_risk: Optional[float] = Query(None, ge=0.0, le=1.0),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return")
+):
+    """List commit analyses newest first, one keyset page at a time"""
+    return await _listing_response(container.async_db.list_commit_analyses, limit, cursor, repository,
+                                   min_risk, max_risk, fields)
+
+@router.get("/violations")
+async def list_violations(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    type: Optional[str] = None,
+    severity: Optional[str] = None,
+    repository: Optional[str] = None,
+    commit_id: Optional[str] = None,
+    file: Optional[str] = None,
+    since_days: Optional[float] = Query(None, gt=0, description="Only the last N days"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return")
+):
+    """List rule violations newest first, one keyset page at a time"""
+    try:
+        page = await container.async_db.list_violations(limit, cursor, violation_type=type, severity=severity,
+                                                        repository=repository, commit_id=commit_id, file=file,
+                                                        since_days=since_days, fields=parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=500, detail="Failed to retrieve violations")
+    return {
+        "status": "success",
+        "count": len(page["items"]),
+        "items": page["items"],
+        "next_cursor": page["next_cursor"]
+    }
+
+@router.get("/violations/summary")
+async def get_violation_summary(
+    since_days: Optional[float] = Query(None, gt=0, description="Only the last N days"),
+    type: Optional[str] = None,
+    repository: Optional[str] = None
+):
+    """Violation counts per type and per repository"""
+    summary = await container.async_db.get_violation_summary(since_days=since_days, violation_type=type,
+                                                             repository=repository)
+    if summary is None:
+        raise HTTPException(status_code=500, detail="Failed to summarize violations")
+    return {"status": "success", "data": summary}
+
+async def _listing_response(list_page, limit, cursor, repository, min_risk, max_risk, fields):
+    try:
+        page = await list_page(limit, cursor, repository=repository, min_risk=min_risk, max_risk=max_risk,
+                               fields=parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=500, detail="Failed to retrieve results")
+    return {
+        "status": "success",
+        "count": len(page["items"]),
+        "items": page["items"],
+        "next_cursor": page["next_cursor"]
+    }
+
+@router.get("/series")
+async def get_risk_series(
+    request: Request,
+    repository: Optional[str] = Query(None, description="One repository; all of them by default"),
+    bucket: str = Query("hour", description="minute, hour or day"),
+    since_days: float = Query(7, gt=0, le=3650, description="How many days back"),
+    source: str = Query("analysis", description="analysis (repository analyses) or commit"),
+    points: int = Query(200, ge=3, le=2000, description="Most points to return")
+):
+    """Risk over time for charts, bucketed in SQL and downsampled to ``points``
+
+    Each field is returned as one array (``series.time[i]`` goes with
+    ``series.average_risk_score[i]``) to keep the payload small. Served
+    from the response cache, with ``ETag`` support.
+    """
+    async def series():
+        page = await container.async_db.get_risk_series(repository, bucket, since_days, source, points)
+        if page is None:
+            return None
+        return {
+            "status": "success",
+            "repository": repository,
+            "bucket": bucket,
+            "source": source,
+            "buckets": page["buckets"],
+            "points": len(page["items"]),
+            "series": {field: [item[field] for item in page["items"]] for field in SERIES_FIELDS}
+        }
+
+    key = f"risk_series:{source}:{bucket}:{since_days}:{points}:{repository!r}"
+    try:
+        response = await container.response_cache.respond(request, key, series)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if response is None:
+        raise HTTPException(status_code=500, detail="Failed to retrieve risk series")
+    return response
+
 @router.get("/repositories/{project_id}/risk")
-async def get_repository_risk(project_id: str):
-    """Get risk assessment for a specific repository"""
+async def get_repository_risk(project_id: str, days: int = Query(30, ge=1, le=3650)):
+    """Get risk assessment and daily risk trend for a repository
+
+    ``project_id`` is matched against the repository name recorded with
+    each analysis. Days beyond the raw-data retention come from rollups.
+    """
     try:
-        # Get recent analysis for this repository
-        # This is a simplified version - in a real implementation you'd query the database
-        # for the most recent analysis of this specific repository
+        daily = await container.async_db.get_risk_trend(project_id, days)
+        if not daily:
+            raise HTTPException(status_code=404, detail="No analyses recorded for this repository")
 
-        # For now, return mock data
+        scored = [day["average_risk_score"] for day in daily if day["average_risk_score"] is not None]
         return {
             "project_id": project_id,
-            "current_risk_score": 0.15,
-            "last_analysis": time.time() - 3600,  # 1 hour ago
-            "trend": "stable",
+            "current_risk_score": scored[-1] if scored else None,
+            "last_analysis": max((day["last_analysis"] for day in daily if day["last_analysis"]), default=None),
+            "trend": _risk_trend(scored),
             "recommendations": [
                 "Regular code reviews recommended",
                 "Monitor contributor activity"
-            ]
+            ],
+            "daily": daily
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting repository risk: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve risk assessment")
 
+def _risk_trend(scores, tolerance=0.05):
+    """Compare the recent half of a daily series with the earlier half"""
+    if len(scores) < 2:
+        return "stable"
+    half = len(scores) // 2
+    earlier = sum(scores[:half]) / half
+    recent = sum(scores[half:]) / (len(scores) - half)
+    if recent > earlier + tolerance:
+        return "rising"
+    if recent < earlier - tolerance:
+        return "falling"
+    return "stable"
+
 @router.post("/repositories/{project_id}/scan")
-async def scan_repository(project_id: str, depth: Optional[int] = 50):
-    """Perform a deep scan of repository commits"""
+def scan_repository(project_id: str, depth: Optional[int] = 50):
+    """Perform a deep scan of repository commits (in the threadpool, like ``/analyze``)"""
     try:
         logger.info(f"Deep scan requested for project {project_id} with depth {depth}")
 
         # Get commits with specified depth
-        commits = gitlab_service.get_project_commits(project_id)
+        commits = container.gitlab_service.get_project_commits(project_id)
         commits = commits[:depth] if commits else []
 
         if not commits:
             raise HTTPException(status_code=404, detail="No commits found")
 
-        # Analyze each commit individually
+        project_info = container.gitlab_service.get_project_info(project_id) or {}
+        repository = project_info.get("name", project_id)
+
+        # Analyze each commit individually; results are committed together below
         results = []
         for commit in commits:
-            details = gitlab_service.get_commit_details(project_id, commit["id"])
+            details = container.gitlab_service.get_commit_details(project_id, commit["id"])
             if details:
-                result = fraud_engine.analyze_commit(details)
+                result = container.fraud_engine.analyze_commit(details, wait=False, repository=repository)
                 results.append({
                     "commit_id": commit["id"],
                     "risk_score": result["risk_score"],
                     "violations": len(result["rule_violations"])
                 })
+        container.db_service.flush()
 
         # Calculate aggregate statistics
         total_commits = len(results)
@@ -145,6 +327,18 @@ async def scan_repository(project_id: str, depth: Optional[int] = 50):
         logger.error(f"Error in repository scan: {e}")
         raise HTTPException(status_code=500, detail=f"Scan failed: {str(e)}")
 
+@router.get("/health/db")
+async def check_db_health():
+    """Check database reachability, connection pool and database thread statistics"""
+    health = await container.async_db.health_check()
+    if health["status"] != "healthy":
+        raise HTTPException(status_code=503, detail=health.get("error", "Database unavailable"))
+    health["executor"] = container.async_db.get_stats()
+    health["response_cache"] = container.response_cache.get_stats()
+    health["events"] = dict(container.db_service.events.get_stats(), feed=container.db_service.event_feed.get_stats())
+    health["retention"] = container.retention.get_stats()
+    return health
+
 @router.get("/health/ml")
 async def check_ml_health():
     """Check ML model health and status"""
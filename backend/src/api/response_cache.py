@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import json
+import os
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+from ..utils.ttl_cache import TTLCache
+
+
+class ResponseCache:
+    """Short-lived cache of the JSON bodies of the polled dashboard endpoints
+
+    Every open dashboard polls the same few summaries, so a body is kept
+    for ``ttl_seconds`` and shared by all of them: a hundred viewers cost
+    one query per TTL. Entries are tagged with ``DBService.data_version``,
+    which each committed analysis or alert write bumps, so the request
+    after a write recomputes rather than serving stale data until the TTL
+    runs out. Writes made by other processes are only seen once it does.
+
+    Concurrent misses for the same key share one computation. Responses
+    carry an ``ETag`` of the body, and a request whose ``If-None-Match``
+    still matches gets an empty 304.
+    """
+
+    def __init__(self, db_service, ttl_seconds=None, max_entries=256):
+        self.db_service = db_service
+        self.ttl_seconds = ttl_seconds or float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "5"))
+        self._entries = TTLCache(max_entries, self.ttl_seconds)
+        self._inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "not_modified": 0}
+
+    async def get(self, key, compute):
+        """The (body, etag) cached for ``key``, computed with ``compute()`` on a miss
+
+        ``compute`` is a coroutine function returning the JSON payload, or
+        None if it failed; failures are not cached, and None is returned.
+        """
+        version = self.db_service.data_version
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.stats["hits"] += 1
+            return entry[1:]
+
+        flight = self._inflight.get((key, version))
+        if flight is None:
+            self.stats["misses"] += 1
+            flight = asyncio.ensure_future(self._compute(key, version, compute))
+            self._inflight[(key, version)] = flight
+            flight.add_done_callback(lambda done: self._landed(key, version, done))
+        else:
+            self.stats["coalesced"] += 1
+        # Shielded: a client that disconnects doesn't cancel the others' query
+        return await asyncio.shield(flight)
+
+    async def _compute(self, key, version, compute):
+        payload = await compute()
+        if payload is None:
+            return None
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self._entries.set(key, (version, body, etag))
+        return body, etag
+
+    def _landed(self, key, version, flight):
+        self._inflight.pop((key, version), None)
+        if not flight.cancelled():
+            # Retrieve the error so it isn't reported again if every waiter went away
+            flight.exception()
+
+    async def respond(self, request, key, compute):
+        """A JSON response for ``key``, a 304 if the client's copy is current, or None if ``compute`` failed"""
+        cached = await self.get(key, compute)
+        if cached is None:
+            return None
+        body, etag = cached
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    def get_stats(self):
+        return dict(self.stats, entries=len(self._entries), inflight=len(self._inflight),
+                    ttl_seconds=self.ttl_seconds)
+
+    def clear(self):
+        self._entries.clear()
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an ``If-None-Match`` header names ``etag`` (weak comparison, as RFC 9110 asks)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
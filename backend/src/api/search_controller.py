@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException, Query
+from .dependencies import get_container
+from ..utils.logger import get_logger
+from ..utils.pagination import MAX_PAGE_SIZE
+from typing import Optional
+
+router = APIRouter()
+logger = get_logger(__name__)
+container = get_container()
+
+@router.get("")
+async def search(
+    q: str = Query(..., description="Search terms; \"phrases\", prefix* and OR are supported"),
+    scope: str = Query("commits", description="commits, alerts or violations"),
+    repository: Optional[str] = None,
+    since_days: Optional[float] = Query(None, gt=0, description="Only rows from the last N days"),
+    sort: str = Query("rank", description="rank (best match first) or newest"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """Full-text search over commit messages and authors, alert messages and violations"""
+    try:
+        page = await container.async_db.search(scope, q, limit, cursor, repository=repository,
+                                               since_days=since_days, sort=sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=500, detail="Search failed")
+    return {
+        "status": "success",
+        "scope": scope,
+        "count": len(page["items"]),
+        "results": page["items"],
+        "next_cursor": page["next_cursor"]
+    }
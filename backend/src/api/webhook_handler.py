@@ -1,59 +1,126 @@
-from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
-from ..core.fraud_engine import FraudEngine
-from ..services.gitlab_service import GitLabService
+from fastapi import APIRouter, Request, Response, HTTPException
+from .dependencies import get_container
 from ..utils.logger import get_logger
-from ..utils.validator import WebhookValidator
-import hmac
-import hashlib
-import json
+from ..utils.config import Config
+from ..utils.deadline import Deadline
+from ..utils.webhook_payload import PayloadTooLarge, extract_event_fields, loads, read_limited_body
+import time
 
 router = APIRouter()
 logger = get_logger(__name__)
-fraud_engine = FraudEngine()
-gitlab_service = GitLabService()
-validator = WebhookValidator()
+container = get_container()
 
-@router.post("/webhook")
-async def handle_webhook(request: Request, background_tasks: BackgroundTasks):
-    """Handle incoming webhooks from GitLab/GitHub"""
+# Header values (GitLab sends "<Kind> Hook") mapped to queue event types
+EVENT_TYPES = {
+    "push": "push",
+    "push hook": "push",
+    "merge_request": "merge_request",
+    "merge request hook": "merge_request",
+    "pull_request": "pull_request"
+}
+
+@router.post("/webhook", status_code=202)
+async def handle_webhook(request: Request, response: Response):
+    """Handle incoming webhooks from GitLab/GitHub
+
+    The body is read up to ``MAX_WEBHOOK_BODY_BYTES`` and authenticated over
+    the raw bytes before any parsing, so unauthenticated or oversized
+    traffic costs no JSON work. Accepted deliveries are reduced to the
+    fields the analysis needs, appended to the durable webhook queue and
+    acknowledged with 202 straight away. When the queue backs up, feature
+    branch events are shed with 429 and, at the hard limit, everything with
+    503; both responses carry ``Retry-After``.
+    """
     try:
         # Get raw body for signature verification
-        body = await request.body()
-        payload = json.loads(body.decode('utf-8'))
+        body = await read_limited_body(request, Config.MAX_WEBHOOK_BODY_BYTES)
 
         # Verify webhook signature if configured
         signature = request.headers.get('X-Gitlab-Token') or request.headers.get('X-Hub-Signature-256')
+        validator = container.webhook_validator
+        if validator.secret and not signature:
+            raise HTTPException(status_code=401, detail="Missing webhook signature")
         if signature and not validator.verify_signature(body, signature, request.headers.get('X-Gitlab-Event')):
             raise HTTPException(status_code=401, detail="Invalid webhook signature")
 
-        event_type = request.headers.get('X-Gitlab-Event') or request.headers.get('X-Github-Event')
+        event_header = request.headers.get('X-Gitlab-Event') or request.headers.get('X-Github-Event')
+        event_type = EVENT_TYPES.get((event_header or '').lower())
 
-        if event_type == 'push':
-            background_tasks.add_task(process_push_event, payload)
-            return {"status": "accepted", "message": "Push event queued for analysis"}
+        if event_type is None:
+            logger.info(f"Unhandled event type: {event_header}")
+            response.status_code = 200
+            return {"status": "ignored", "message": f"Event type {event_header} not processed"}
 
-        elif event_type == 'merge_request' or event_type == 'pull_request':
-            background_tasks.add_task(process_merge_event, payload)
-            return {"status": "accepted", "message": "Merge event queued for analysis"}
+        # Retried deliveries carrying a known delivery ID skip parsing entirely
+        delivery_key = container.deduplicator.delivery_id_key(request.headers)
+        if container.deduplicator.seen(delivery_key):
+            return _duplicate_response(response, delivery_key)
 
-        else:
-            logger.info(f"Unhandled event type: {event_type}")
-            return {"status": "ignored", "message": f"Event type {event_type} not processed"}
+        # Refuse before parsing when the queue is at its hard limit
+        _admit(await container.admission.check())
+
+        payload = loads(body)
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=400, detail="Invalid JSON payload")
+        payload = extract_event_fields(event_type, payload)
+
+        if delivery_key is None:
+            delivery_key = container.deduplicator.payload_key(event_type, payload)
+            if container.deduplicator.seen(delivery_key):
+                return _duplicate_response(response, delivery_key)
+
+        priority = container.admission.priority_for(event_type, payload)
+        _admit(await container.admission.check(priority))
+
+        repo = payload.get('repository') or payload.get('project') or {}
+        queue_id, duplicate = await container.async_db.enqueue_webhook(
+            event_type, repo.get('name'), payload, delivery_key=delivery_key, priority=priority
+        )
+        if duplicate:
+            # Already queued by another worker process or before a restart
+            container.deduplicator.remember(delivery_key)
+            container.deduplicator.record_duplicate(delivery_key)
+            return _duplicate_response(response, delivery_key)
+        if queue_id is None:
+            raise HTTPException(status_code=503, detail="Webhook queue unavailable")
+        container.admission.record_admitted(priority)
+        container.deduplicator.remember(delivery_key)
+        container.webhook_workers.wake()
+
+        kind = "Push" if event_type == "push" else "Merge"
+        return {"status": "accepted", "message": f"{kind} event queued for analysis", "queue_id": queue_id}
 
-    except json.JSONDecodeError:
+    except HTTPException:
+        raise
+    except PayloadTooLarge:
+        raise HTTPException(status_code=413, detail="Webhook payload too large")
+    except ValueError:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
     except Exception as e:
         logger.error(f"Error processing webhook: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def _admit(decision):
+    if not decision.admitted:
+        raise HTTPException(status_code=decision.status_code, detail=decision.reason,
+                            headers={"Retry-After": str(decision.retry_after)})
+
+def _duplicate_response(response, delivery_key):
+    response.status_code = 200
+    return {"status": "duplicate", "message": "Delivery already received", "delivery_key": delivery_key}
+
+ZERO_SHA = "0" * 40
+
 def process_push_event(payload):
     """Process push event in background"""
     try:
         logger.info("Processing push event")
+        deadline = Deadline(Config.WEBHOOK_ANALYSIS_BUDGET_SECONDS)
 
         # Extract repository information
         repo = payload.get('repository', {})
-        project_id = repo.get('id') or repo.get('full_name', '').replace('/', '%2F')
+        project_id = (payload.get('project_id') or repo.get('id')
+                      or repo.get('full_name', '').replace('/', '%2F'))
 
         # Get commits from the push
         commits = payload.get('commits', [])
@@ -70,15 +137,33 @@ def process_push_event(payload):
                 "message": commit.get('message'),
                 "author": commit.get('author', {}).get('name'),
                 "timestamp": commit.get('timestamp'),
-                "files_changed": [],  # Will be filled by detailed fetch if needed
+                "files_changed": _payload_files(commit),
                 "lines_added": 0,
                 "lines_deleted": 0
             })
 
-        # Get detailed commit information if we have GitLab service
-        if project_id and gitlab_service.token:
+        before, after = payload.get('before'), payload.get('after')
+        range_commits = None
+
+        # Fetch the whole pushed range with one compare call when possible
+        if project_id and container.gitlab_service.token and before and after and before != ZERO_SHA:
+            commit_files = {c['id']: c['files_changed'] for c in transformed_commits}
+            range_commits = container.gitlab_service.get_range_commits(project_id, before, after, commit_files,
+                                                                       deadline=deadline)
+
+        if range_commits:
+            transformed_commits = range_commits
+        elif project_id and container.gitlab_service.token:
+            # New branch or compare failure: fall back to per-commit details.
+            # The push payload already lists changed paths, so the diff itself
+            # is only fetched if a content rule asks for it.
             for i, commit in enumerate(transformed_commits):
-                details = gitlab_service.get_commit_details(project_id, commit['id'])
+                if deadline.expired():
+                    break
+                details = container.gitlab_service.get_commit_details(
+                    project_id, commit['id'], files_changed=commit['files_changed'] or None,
+                    deadline=deadline
+                )
                 if details:
                     transformed_commits[i] = details
 
@@ -87,37 +172,105 @@ def process_push_event(payload):
             "name": repo.get('name', 'unknown'),
             "id": project_id,
             "url": repo.get('url') or repo.get('html_url'),
-            "timestamp": payload.get('timestamp') or __import__('time').time(),
+            "timestamp": payload.get('timestamp') or time.time(),
             "commits": transformed_commits
         }
 
         # Run fraud analysis
-        result = fraud_engine.analyze_repository(repo_data, transformed_commits)
+        result = container.fraud_engine.analyze_repository(repo_data, transformed_commits, deadline=deadline)
 
         logger.info(f"Push event analysis completed for {repo_data['name']}")
 
     except Exception as e:
         logger.error(f"Error processing push event: {e}")
+        raise
+
+def _payload_files(commit):
+    """Changed paths listed on a push payload commit (GitLab and GitHub)"""
+    files = []
+    for key in ('added', 'modified', 'removed'):
+        files.extend(commit.get(key) or [])
+    return files
 
 def process_merge_event(payload):
     """Process merge/pull request event"""
     try:
         logger.info("Processing merge/pull request event")
+        deadline = Deadline(Config.WEBHOOK_ANALYSIS_BUDGET_SECONDS)
 
         # Extract relevant information
-        pr = payload.get('object_attributes', {}) if 'object_attributes' in payload else payload
+        if 'object_attributes' in payload:
+            pr = payload['object_attributes']
+            merged = pr.get('state') == 'merged'
+        else:
+            pr = payload.get('pull_request') or payload
+            merged = pr.get('state') == 'merged' or bool(pr.get('merged'))
 
-        if pr.get('state') != 'merged':
+        if not merged:
             logger.info("PR not merged, skipping analysis")
             return
 
-        # For merged PRs, we could analyze the commits
-        # This is a simplified version - in production you'd want more detailed analysis
+        repo = payload.get('project') or payload.get('repository') or {}
+        project_id = (pr.get('target_project_id') or repo.get('id')
+                      or repo.get('full_name', '').replace('/', '%2F'))
+
+        if not project_id or not container.gitlab_service.token:
+            logger.info("No GitLab access for merged PR, skipping analysis")
+            return
+
+        refs = _merge_refs(pr)
+        if not refs and pr.get('iid'):
+            refs = container.gitlab_service.get_merge_request_refs(project_id, pr['iid'], deadline=deadline)
+        if not refs:
+            logger.warning(f"Could not resolve commit range for PR {pr.get('title', 'unknown')}")
+            return
+
+        # The compare call lists the merge request's commits. MR payloads
+        # carry no per-commit paths, so each commit's own stats are fetched
+        # and its diff is loaded lazily rather than split from the range.
+        base_sha, head_sha = refs
+        commits = container.gitlab_service.get_range_commits(project_id, base_sha, head_sha, deadline=deadline)
+        if not commits:
+            logger.info("No commits in merged PR range")
+            return
+
+        repo_data = {
+            "name": repo.get('name', 'unknown'),
+            "id": project_id,
+            "url": repo.get('web_url') or repo.get('html_url'),
+            "timestamp": time.time(),
+            "commits": commits,
+            "merge_request": pr.get('iid') or pr.get('number')
+        }
+
+        container.fraud_engine.analyze_repository(repo_data, commits, deadline=deadline)
 
         logger.info(f"Merged PR analysis completed for {pr.get('title', 'unknown')}")
 
     except Exception as e:
         logger.error(f"Error processing merge event: {e}")
+        raise
+
+def _merge_refs(pr):
+    """Base and head SHAs carried on the webhook payload, if any"""
+    diff_refs = pr.get('diff_refs') or {}
+    if diff_refs.get('base_sha') and diff_refs.get('head_sha'):
+        return diff_refs['base_sha'], diff_refs['head_sha']
+    base, head = pr.get('base') or {}, pr.get('head') or {}
+    if base.get('sha') and head.get('sha'):
+        return base['sha'], head['sha']
+    return None
+
+@router.get("/webhook/queue")
+async def get_webhook_queue_stats():
+    """Get durable webhook queue statistics"""
+    return {
+        "status": "success",
+        "queue": await container.async_db.get_webhook_queue_stats(container.webhook_workers.max_attempts),
+        "duplicates_ignored": container.deduplicator.duplicates,
+        "admission": container.admission.stats(),
+        "workers": container.webhook_workers.workers if container.webhook_workers.running else 0
+    }
 
 @router.get("/webhook/test")
 async def test_webhook():
@@ -8,21 +8,37 @@ import json
 logger = get_logger(__name__)
 
 class FraudEngine:
-    def __init__(self):
-        self.ai_analyzer = AIAnalyzer()
-        self.rule_engine = RuleEngine()
-        self.risk_scorer = RiskScorer()
-        self.db_service = DBService()
-
-    def analyze_repository(self, repo_data, commits):
-        """Comprehensive fraud analysis of a repository"""
+    def __init__(self, ai_analyzer=None, rule_engine=None, risk_scorer=None, db_service=None,
+                 slack_service=None, email_service=None):
+        self.ai_analyzer = ai_analyzer or AIAnalyzer()
+        self.rule_engine = rule_engine or RuleEngine()
+        self.risk_scorer = risk_scorer or RiskScorer()
+        self.db_service = db_service or DBService()
+        self.slack_service = slack_service
+        self.email_service = email_service
+
+    def analyze_repository(self, repo_data, commits, deadline=None):
+        """Comprehensive fraud analysis of a repository
+
+        With a ``deadline``, every stage (AI analysis, rule checks, storage,
+        alerting) is skipped once the budget is spent and I/O inside a stage
+        is bounded by the remaining time. The result is then scored from
+        whatever completed and marked ``partial`` with the skipped stages.
+        """
         logger.info(f"Starting fraud analysis for repository: {repo_data.get('name', 'unknown')}")
+        skipped_stages = []
 
         # AI-based anomaly detection
-        ai_results = self.ai_analyzer.analyze_commits(commits)
+        if self._stage_allowed("ai_analysis", deadline, skipped_stages):
+            ai_results = self.ai_analyzer.analyze_commits(commits)
+        else:
+            ai_results = {"anomaly_score": 0.0, "is_anomaly": False}
 
         # Rule-based checks
-        rule_violations = self.rule_engine.check_rules(commits, repo_data)
+        if self._stage_allowed("rule_checks", deadline, skipped_stages):
+            rule_violations = self.rule_engine.check_rules(commits, repo_data, deadline)
+        else:
+            rule_violations = []
 
         # Calculate overall risk score
         risk_score = self.risk_scorer.calculate_risk_score(ai_results, rule_violations, repo_data)
@@ -34,44 +50,84 @@ class FraudEngine:
             "risk_score": risk_score,
             "ai_analysis": ai_results,
             "rule_violations": rule_violations,
-            "recommendations": self._generate_recommendations(risk_score, rule_violations)
+            "recommendations": self._generate_recommendations(risk_score, rule_violations),
+            "truncated_diffs": [c.get("id") for c in commits if self._diff_truncated(c)]
         }
 
         # Store in database
-        self.db_service.store_analysis_result(analysis_result)
+        if self._stage_allowed("store", deadline, skipped_stages):
+            self.db_service.store_analysis_result(analysis_result, deadline=deadline)
 
         # Check if alert should be triggered
         if risk_score > 0.7:  # High risk threshold
-            self._trigger_alert(analysis_result)
+            if self._stage_allowed("alert", deadline, skipped_stages):
+                self._trigger_alert(analysis_result, deadline, skipped_stages)
+
+        analysis_result["partial"] = bool(skipped_stages)
+        analysis_result["skipped_stages"] = skipped_stages
 
         logger.info(f"Fraud analysis completed. Risk score: {risk_score}")
         return analysis_result
 
-    def analyze_commit(self, commit_data):
-        """Analyze a single commit for fraud indicators"""
+    def analyze_commit(self, commit_data, deadline=None, wait=True, repository=None):
+        """Analyze a single commit for fraud indicators
+
+        ``wait=False`` stores the result fire-and-forget through the DB
+        write buffer; bulk callers then flush once at the end. The commit's
+        message and author are stored with the result, under ``repository``
+        when given, so they can be searched.
+        """
         logger.info(f"Analyzing commit: {commit_data.get('id', 'unknown')}")
+        skipped_stages = []
 
         # AI analysis
-        ai_result = self.ai_analyzer.analyze_commits([commit_data])
+        if self._stage_allowed("ai_analysis", deadline, skipped_stages):
+            ai_result = self.ai_analyzer.analyze_commits([commit_data])
+        else:
+            ai_result = {"anomaly_score": 0.0, "is_anomaly": False}
 
         # Rule checks
-        rule_violations = self.rule_engine.check_commit_rules(commit_data)
+        if self._stage_allowed("rule_checks", deadline, skipped_stages):
+            rule_violations = self.rule_engine.check_commit_rules(commit_data)
+        else:
+            rule_violations = []
 
         # Risk scoring
         risk_score = self.risk_scorer.calculate_commit_risk(ai_result, rule_violations)
 
         result = {
             "commit_id": commit_data.get("id"),
+            "repository": repository,
+            "author": commit_data.get("author"),
+            "message": commit_data.get("message"),
             "risk_score": risk_score,
             "ai_analysis": ai_result,
-            "rule_violations": rule_violations
+            "rule_violations": rule_violations,
+            "diff_truncated": self._diff_truncated(commit_data)
         }
 
         # Store commit analysis
-        self.db_service.store_commit_analysis(result)
+        if self._stage_allowed("store", deadline, skipped_stages):
+            self.db_service.store_commit_analysis(result, deadline=deadline, wait=wait)
 
+        result["partial"] = bool(skipped_stages)
+        result["skipped_stages"] = skipped_stages
         return result
 
+    def _stage_allowed(self, stage, deadline, skipped_stages):
+        """Whether a pipeline stage may start; records it as skipped otherwise"""
+        if deadline is not None and deadline.expired():
+            logger.warning(f"Deadline reached, skipping stage: {stage}")
+            skipped_stages.append(stage)
+            return False
+        return True
+
+    def _diff_truncated(self, commit):
+        """Whether the commit's diff was cut at the size limit (without forcing a fetch)"""
+        if not getattr(commit, "diff_loaded", True):
+            return False
+        return bool(commit.get("diff_truncated", False))
+
     def _generate_recommendations(self, risk_score, rule_violations):
         """Generate security recommendations based on analysis"""
         recommendations = []
@@ -91,17 +147,22 @@ class FraudEngine:
 
         return recommendations
 
-    def _trigger_alert(self, analysis_result):
+    def _trigger_alert(self, analysis_result, deadline=None, skipped_stages=None):
         """Trigger alerts for high-risk findings"""
         from ..services.slack_service import SlackService
         from ..services.email_service import EmailService
 
-        slack = SlackService()
-        email = EmailService()
+        slack = self.slack_service or SlackService()
+        email = self.email_service or EmailService()
 
         message = f"🚨 High-risk activity detected in {analysis_result['repository']}\n"
         message += f"Risk Score: {analysis_result['risk_score']:.2f}\n"
         message += f"Violations: {len(analysis_result['rule_violations'])}"
 
-        slack.send_alert(message)
-        email.send_alert("High Risk Alert", message, ["security@company.com"])
\ No newline at end of file
+        slack.send_alert(message, deadline=deadline)
+        if deadline is not None and deadline.expired():
+            logger.warning("Deadline reached, skipping email alert")
+            if skipped_stages is not None:
+                skipped_stages.append("alert_email")
+            return
+        email.send_alert("High Risk Alert", message, ["security@company.com"], deadline=deadline)
\ No newline at end of file
@@ -4,15 +4,28 @@ from ..utils.threat_signatures import ThreatSignatures
 
 logger = get_logger(__name__)
 
+# Changed files of these types are not scanned for code injection
+UNSCANNED_EXTENSIONS = (
+    ".md", ".rst", ".txt", ".csv", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico",
+    ".pdf", ".lock", ".sum"
+)
+
 class RuleEngine:
-    def __init__(self):
-        self.threat_signatures = ThreatSignatures()
+    def __init__(self, threat_signatures=None):
+        self.threat_signatures = threat_signatures or ThreatSignatures()
+
+    def check_rules(self, commits, repo_data, deadline=None):
+        """Check all commits against fraud detection rules
 
-    def check_rules(self, commits, repo_data):
-        """Check all commits against fraud detection rules"""
+        With a deadline, commits left unchecked when it expires are skipped
+        and only the violations found so far are returned.
+        """
         violations = []
 
         for commit in commits:
+            if deadline is not None and deadline.expired():
+                logger.warning("Deadline reached during rule checks, skipping remaining commits")
+                break
             commit_violations = self.check_commit_rules(commit)
             if commit_violations:
                 violations.extend(commit_violations)
@@ -53,7 +66,8 @@ class RuleEngine:
                     "type": "sensitive_file_modification",
                     "commit_id": commit.get('id'),
                     "severity": "high",
-                    "description": f"Modified sensitive files: {', '.join(sensitive_files)}"
+                    "description": f"Modified sensitive files: {', '.join(sensitive_files)}",
+                    "files": sensitive_files
                 })
 
             # Check for code injection patterns
@@ -153,7 +167,9 @@ class RuleEngine:
         """Check for potential code injection patterns"""
         injection_patterns = self.threat_signatures.get_code_injection_patterns()
 
-        content = commit.get('diff', '') + commit.get('message', '')
+        content = commit.get('message', '')
+        if self._needs_content_scan(commit):
+            content = commit.get('diff', '') + content
         content_lower = content.lower()
 
         for pattern in injection_patterns:
@@ -161,6 +177,20 @@ class RuleEngine:
                 return True
         return False
 
+    def _needs_content_scan(self, commit):
+        """Whether to read the diff, which for a lazy commit means fetching it
+
+        A diff already in hand is always scanned. Otherwise the fetch is
+        skipped when the line stats show nothing was added, or when every
+        changed file is documentation, data or an image.
+        """
+        if 'diff' in commit.keys():
+            return True
+        if 'lines_added' in commit and not commit['lines_added']:
+            return False
+        files_changed = commit.get('files_changed', [])
+        return not files_changed or not all(f.lower().endswith(UNSCANNED_EXTENSIONS) for f in files_changed)
+
     def _check_commit_timing(self, commit):
         """Check for suspicious commit timing"""
         # This would require timezone analysis
@@ -0,0 +1,99 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class AsyncDBService:
+    """Awaitable facade over DBService for the API routes
+
+    Every public DBService method is available under the same name and
+    arguments as a coroutine that runs the call on a dedicated pool of
+    ``threads`` database threads, so queries never block the event loop.
+    The pool is separate from Starlette's default thread pool and sized
+    like the SQLite reader pool (``SQLITE_READERS``), so queued calls wait
+    here rather than each holding a thread while blocked on a connection.
+
+    ``PRIORITY_METHODS`` (queueing a webhook and reading the queue depth
+    for admission) run on a thread of their own: webhook acknowledgements
+    then never queue behind slow API queries, however busy the main pool
+    is.
+    """
+
+    PRIORITY_METHODS = frozenset({"enqueue_webhook", "get_webhook_queue_stats"})
+
+    def __init__(self, db_service, threads=None):
+        self.db_service = db_service
+        self.threads = threads or int(os.getenv("DB_EXECUTOR_THREADS", os.getenv("SQLITE_READERS", "4")))
+        self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="db")
+        self._priority_executor = ThreadPoolExecutor(1, thread_name_prefix="db-priority")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._peak_queued = 0
+        self._submitted = 0
+        self._failed = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def __getattr__(self, name):
+        attribute = getattr(self.db_service, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+        executor = self._priority_executor if name in self.PRIORITY_METHODS else self._executor
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            return await self._run(executor, attribute, args, kwargs)
+        return call
+
+    async def _run(self, executor, method, args, kwargs):
+        submitted = time.monotonic()
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+
+        def work():
+            waited = time.monotonic() - submitted
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_seconds += waited
+                self._max_wait_seconds = max(self._max_wait_seconds, waited)
+            try:
+                return method(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self._failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        return await asyncio.get_running_loop().run_in_executor(executor, work)
+
+    def get_stats(self):
+        """Saturation of the database threads: a growing ``queued`` means calls wait for a thread"""
+        with self._lock:
+            started = self._submitted - self._queued
+            return {
+                "threads": self.threads,
+                "running": self._running,
+                "queued": self._queued,
+                "peak_queued": self._peak_queued,
+                "calls": self._submitted,
+                "failed": self._failed,
+                "average_wait_seconds": round(self._wait_seconds / started, 4) if started else 0.0,
+                "max_wait_seconds": round(self._max_wait_seconds, 4)
+            }
+
+    def close(self):
+        """Wait for running calls, then stop the threads"""
+        self._executor.shutdown(wait=True)
+        self._priority_executor.shutdown(wait=True)
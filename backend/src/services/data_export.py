@@ -0,0 +1,153 @@
+import csv
+import gzip
+import io
+import json
+import os
+import zlib
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Export format -> media type
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# NOT NULL text columns, where an empty CSV field is an empty string
+_REQUIRED_TEXT = {
+    "analysis_results": {"repository"},
+    "commit_analysis": {"commit_id"},
+    "alerts": {"type", "message"}
+}
+
+
+class DataExporter:
+    """Streams analysis history out as NDJSON or CSV and loads it back
+
+    Exports read the table in ``(updated_at, id)`` order, ``batch_size``
+    rows at a time (see ``DBService.export_batches``), and encode each
+    batch to one output chunk, optionally through an incremental gzip
+    stream, so memory use does not depend on the size of the table.
+    Exports are incremental: a run covers the rows added or updated after
+    the ``since`` watermark up to the watermark taken when it starts, and
+    that watermark is the ``since`` of the next run.
+
+    In NDJSON the JSON documents (``ai_analysis``, ``rule_violations``,
+    ``recommendations``) are nested objects; in CSV they are JSON strings.
+    """
+
+    def __init__(self, db_service, batch_size=None):
+        self.db_service = db_service
+        self.batch_size = batch_size or int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    def watermark(self, table):
+        return self.db_service.get_export_watermark(table)
+
+    def stream(self, table, fmt="ndjson", since=None, until=None, compress=False):
+        """Return an iterator over the export's byte chunks
+
+        The arguments are checked here rather than on first iteration, so
+        a bad request fails before a response has started.
+        """
+        self._check(table, fmt)
+        if until is None:
+            until = self.watermark(table)
+        batches = self.db_service.export_batches(table, since, until, self.batch_size)
+        return (chunk for _, chunk in self._chunks(table, fmt, batches, compress))
+
+    def export(self, table, out, fmt="ndjson", since=None, compress=False):
+        """Write an export to the binary file ``out``; returns (rows, watermark)"""
+        self._check(table, fmt)
+        until = self.watermark(table)
+        batches = self.db_service.export_batches(table, since, until, self.batch_size)
+        rows = 0
+        for count, chunk in self._chunks(table, fmt, batches, compress):
+            out.write(chunk)
+            rows += count
+        logger.info(f"Exported {rows} rows of {table} (watermark {until})")
+        return rows, until or since
+
+    def _check(self, table, fmt):
+        if table not in self.db_service.EXPORTS:
+            raise ValueError(f"Unknown export table: {table!r}")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt!r}")
+
+    def _chunks(self, table, fmt, batches, compress):
+        """(rows, bytes) per batch, the bytes gzip-compressed if asked"""
+        columns = self.db_service.EXPORTS[table]
+        gzipper = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+
+        def encoded():
+            if fmt == "csv":
+                yield 0, self._csv_lines([columns])
+            for batch in batches:
+                if fmt == "csv":
+                    yield len(batch), self._csv_lines(self._csv_row(columns, row) for row in batch)
+                else:
+                    yield len(batch), "".join(
+                        json.dumps(row, separators=(",", ":"), ensure_ascii=False) + "\n" for row in batch
+                    ).encode("utf-8")
+
+        for count, chunk in encoded():
+            if gzipper is not None:
+                chunk = gzipper.compress(chunk)
+            if chunk or count:
+                yield count, chunk
+        if gzipper is not None:
+            yield 0, gzipper.flush()
+
+    @staticmethod
+    def _csv_row(columns, row):
+        values = []
+        for column in columns:
+            value = row[column]
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+            elif isinstance(value, bool):
+                value = int(value)
+            values.append(value)
+        return values
+
+    @staticmethod
+    def _csv_lines(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    def import_file(self, table, source, fmt="ndjson"):
+        """Load an export from the binary file ``source`` (gzip is detected)
+
+        Returns the number of rows written; rows already present are
+        skipped unless the import has a newer version, see
+        ``DBService.import_rows``.
+        """
+        self._check(table, fmt)
+        if not hasattr(source, "peek"):
+            source = io.BufferedReader(source)
+        if source.peek(2)[:2] == b"\x1f\x8b":
+            source = gzip.GzipFile(fileobj=source)
+        text = io.TextIOWrapper(source, encoding="utf-8", newline="")
+        rows = self._read_csv(table, text) if fmt == "csv" else self._read_ndjson(text)
+        return self.db_service.import_rows(table, rows, self.batch_size)
+
+    @staticmethod
+    def _read_ndjson(text):
+        for number, line in enumerate(text, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"Invalid JSON on line {number}: {e}") from e
+
+    def _read_csv(self, table, text):
+        """Rows of a CSV export with the types the NDJSON export would have"""
+        json_columns = self.db_service.LISTINGS[table]["json"]
+        required = _REQUIRED_TEXT[table]
+        for row in csv.DictReader(text):
+            for column, value in row.items():
+                if value == "" and column not in required:
+                    row[column] = None
+                elif column in json_columns:
+                    row[column] = json.loads(value)
+                elif column == "resolved":
+                    row[column] = value.lower() in ("1", "true")
+            yield row
@@ -0,0 +1,686 @@
+"""Versioned schema migrations for the fraud database
+
+The schema version is kept in ``PRAGMA user_version``. Each migration runs
+in its own ``BEGIN IMMEDIATE`` transaction together with the version bump,
+so concurrent processes apply it exactly once and a failure leaves the
+database at the previous version. ``database/schema.sql`` mirrors the
+result of the latest migration.
+"""
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _ensure_columns(cursor, table, columns):
+    """Add any of ``columns`` ({name: definition}) missing from ``table``"""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    for name, definition in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+def _baseline(cursor):
+    """Tables, views and triggers of schema.sql
+
+    Databases created by schema.sql already have all of this; ones created
+    by earlier versions of DBService get the columns they were missing.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repository TEXT NOT NULL,
+            timestamp REAL,
+            risk_score REAL,
+            ai_analysis TEXT,
+            rule_violations TEXT,
+            recommendations TEXT,
+            created_at REAL DEFAULT (datetime('now')),
+            updated_at REAL DEFAULT (datetime('now'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS commit_analysis (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            commit_id TEXT NOT NULL UNIQUE,
+            risk_score REAL,
+            ai_analysis TEXT,
+            rule_violations TEXT,
+            repository TEXT,
+            author TEXT,
+            message TEXT,
+            created_at REAL DEFAULT (datetime('now'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            severity TEXT CHECK(severity IN ('low', 'medium', 'high', 'critical')),
+            message TEXT NOT NULL,
+            repository TEXT,
+            commit_id TEXT,
+            resolved BOOLEAN DEFAULT FALSE,
+            resolved_at REAL,
+            created_at REAL DEFAULT (datetime('now')),
+            updated_at REAL DEFAULT (datetime('now'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS repositories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            url TEXT,
+            platform TEXT CHECK(platform IN ('gitlab', 'github', 'bitbucket')),
+            project_id TEXT,
+            last_analysis REAL,
+            total_commits INTEGER DEFAULT 0,
+            risk_trend TEXT,
+            created_at REAL DEFAULT (datetime('now')),
+            updated_at REAL DEFAULT (datetime('now'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contributors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repository TEXT NOT NULL,
+            username TEXT NOT NULL,
+            email TEXT,
+            total_commits INTEGER DEFAULT 0,
+            risk_score REAL DEFAULT 0.0,
+            trust_level TEXT CHECK(trust_level IN ('high', 'medium', 'low', 'unknown')),
+            first_seen REAL,
+            last_seen REAL,
+            created_at REAL DEFAULT (datetime('now')),
+            updated_at REAL DEFAULT (datetime('now')),
+            UNIQUE(repository, username)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS webhook_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT,
+            repository TEXT,
+            payload TEXT,
+            signature_valid BOOLEAN,
+            processed BOOLEAN DEFAULT FALSE,
+            processing_time REAL,
+            attempts INTEGER DEFAULT 0,
+            claimed_at REAL,
+            claimed_by TEXT,
+            processed_at REAL,
+            error TEXT,
+            delivery_key TEXT,
+            priority INTEGER DEFAULT 0,
+            created_at REAL DEFAULT (datetime('now'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ml_performance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            model_version TEXT,
+            accuracy REAL,
+            precision REAL,
+            recall REAL,
+            f1_score REAL,
+            training_data_size INTEGER,
+            created_at REAL DEFAULT (datetime('now'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audit_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT NOT NULL,
+            user TEXT,
+            resource TEXT,
+            details TEXT,
+            ip_address TEXT,
+            user_agent TEXT,
+            created_at REAL DEFAULT (datetime('now'))
+        )
+    ''')
+
+    _ensure_columns(cursor, "analysis_results", {"updated_at": "REAL"})
+    _ensure_columns(cursor, "commit_analysis", {
+        "repository": "TEXT",
+        "author": "TEXT",
+        "message": "TEXT"
+    })
+    _ensure_columns(cursor, "alerts", {"resolved_at": "REAL", "updated_at": "REAL"})
+    _ensure_columns(cursor, "webhook_logs", {
+        "attempts": "INTEGER DEFAULT 0",
+        "claimed_at": "REAL",
+        "claimed_by": "TEXT",
+        "processed_at": "REAL",
+        "error": "TEXT",
+        "delivery_key": "TEXT",
+        "priority": "INTEGER DEFAULT 0"
+    })
+
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS idx_analysis_results_repository ON analysis_results(repository)",
+        "CREATE INDEX IF NOT EXISTS idx_analysis_results_timestamp ON analysis_results(timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_type ON alerts(type)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_severity ON alerts(severity)",
+        "CREATE INDEX IF NOT EXISTS idx_repositories_name ON repositories(name)",
+        "CREATE INDEX IF NOT EXISTS idx_contributors_repository ON contributors(repository)",
+        "CREATE INDEX IF NOT EXISTS idx_webhook_logs_event_type ON webhook_logs(event_type)",
+        "CREATE INDEX IF NOT EXISTS idx_audit_log_action ON audit_log(action)",
+        # Claim order: highest priority first, then oldest
+        "DROP INDEX IF EXISTS idx_webhook_logs_pending",
+        "CREATE INDEX IF NOT EXISTS idx_webhook_logs_claim ON webhook_logs(processed, priority DESC, id)",
+        # Durable deduplication of webhook deliveries across processes
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_webhook_logs_delivery_key
+           ON webhook_logs(delivery_key) WHERE delivery_key IS NOT NULL''',
+        '''CREATE VIEW IF NOT EXISTS recent_alerts AS
+           SELECT * FROM alerts WHERE resolved = FALSE ORDER BY created_at DESC LIMIT 100''',
+        '''CREATE VIEW IF NOT EXISTS high_risk_analysis AS
+           SELECT * FROM analysis_results WHERE risk_score > 0.7 ORDER BY timestamp DESC''',
+        '''CREATE VIEW IF NOT EXISTS repository_stats AS
+           SELECT r.name, r.total_commits, COUNT(ar.id) as analysis_count,
+                  AVG(ar.risk_score) as avg_risk_score, MAX(ar.timestamp) as last_analysis
+           FROM repositories r
+           LEFT JOIN analysis_results ar ON r.name = ar.repository
+           GROUP BY r.name'''
+    ):
+        cursor.execute(statement)
+
+    for table in ("analysis_results", "alerts", "repositories", "contributors"):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS update_{table}_timestamp
+                AFTER UPDATE ON {table}
+            BEGIN
+                UPDATE {table} SET updated_at = datetime('now') WHERE id = NEW.id;
+            END
+        ''')
+
+
+def _unique_commit_analysis(cursor):
+    """One analysis row per commit, as schema.sql declares
+
+    Older databases could hold several rows for a re-analyzed commit; the
+    newest is kept.
+    """
+    cursor.execute('''
+        DELETE FROM commit_analysis
+        WHERE id NOT IN (SELECT MAX(id) FROM commit_analysis GROUP BY commit_id)
+    ''')
+    # Redundant next to a unique index on the same column
+    cursor.execute("DROP INDEX IF EXISTS idx_commit_analysis_commit_id")
+    if not _has_unique_index(cursor, "commit_analysis", ["commit_id"]):
+        cursor.execute('''
+            CREATE UNIQUE INDEX idx_commit_analysis_commit_id_unique
+            ON commit_analysis(commit_id)
+        ''')
+
+
+def _has_unique_index(cursor, table, columns):
+    for _, name, unique, *_ in cursor.execute(f"PRAGMA index_list({table})").fetchall():
+        if unique and [row[2] for row in cursor.execute(f"PRAGMA index_info({name})")] == columns:
+            return True
+    return False
+
+
+def _hot_query_indexes(cursor):
+    """Indexes shaped after the dashboard and queue queries
+
+    - active alerts newest first: ``WHERE resolved = FALSE ORDER BY
+      created_at DESC`` walks (resolved, created_at) backwards with no sort
+      step, and counting active alerts only touches the index;
+    - high-risk counts and the average score read the narrow risk_score
+      index instead of the JSON-heavy analysis rows;
+    - queue statistics aggregate over a covering index of the state columns.
+    """
+    for statement in (
+        "DROP INDEX IF EXISTS idx_alerts_resolved",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_active ON alerts(resolved, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_analysis_results_risk_score ON analysis_results(risk_score)",
+        '''CREATE INDEX IF NOT EXISTS idx_webhook_logs_state
+           ON webhook_logs(processed, claimed_at, attempts, processing_time)'''
+    ):
+        cursor.execute(statement)
+
+
+# Counter deltas applied by the fraud_stats triggers; a NULL risk score
+# counts towards the total but not the average, as AVG() would
+_ANALYSIS_DELTAS = {
+    "total_analyses": "1",
+    "high_risk_analyses": "IFNULL({row}.risk_score > 0.7, 0)",
+    "risk_score_sum": "IFNULL({row}.risk_score, 0)",
+    "risk_score_count": "({row}.risk_score IS NOT NULL)"
+}
+_ALERT_DELTAS = {"active_alerts": "IFNULL({row}.resolved = FALSE, 0)"}
+FRAUD_STATS_COUNTERS = tuple(_ANALYSIS_DELTAS) + tuple(_ALERT_DELTAS)
+
+
+def _stats_trigger(name, event, table, deltas, rows):
+    """Trigger adding (NEW) and/or subtracting (OLD) each delta in ``deltas``"""
+    assignments = ",\n                ".join(
+        f"{column} = {column}" + "".join(
+            f" {sign} {expression.format(row=row)}" for sign, row in rows
+        )
+        for column, expression in deltas.items()
+    )
+    return f'''
+        CREATE TRIGGER IF NOT EXISTS {name}
+            AFTER {event} ON {table}
+        BEGIN
+            UPDATE fraud_stats SET
+                {assignments}
+            WHERE id = 1;
+        END
+    '''
+
+
+def recount_fraud_stats(conn):
+    """Recompute the fraud_stats counters from the source tables
+
+    Analyses already removed by retention are counted from their rollups.
+    """
+    total, high_risk, risk_sum, risk_count = conn.execute('''
+        SELECT COUNT(*), IFNULL(SUM(risk_score > 0.7), 0), IFNULL(SUM(risk_score), 0.0),
+               COUNT(risk_score)
+        FROM analysis_results
+    ''').fetchone()
+    has_rollups = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analysis_rollups'"
+    ).fetchone()
+    if has_rollups:
+        rolled_up = conn.execute('''
+            SELECT IFNULL(SUM(analyses), 0), IFNULL(SUM(high_risk_analyses), 0),
+                   IFNULL(SUM(risk_score_sum), 0.0), IFNULL(SUM(risk_score_count), 0)
+            FROM analysis_rollups WHERE source = 'analysis'
+        ''').fetchone()
+        total, high_risk, risk_sum, risk_count = (
+            live + archived for live, archived in zip((total, high_risk, risk_sum, risk_count), rolled_up)
+        )
+    active_alerts = conn.execute("SELECT COUNT(*) FROM alerts WHERE resolved = FALSE").fetchone()[0]
+    return {
+        "total_analyses": total,
+        "high_risk_analyses": high_risk,
+        "risk_score_sum": risk_sum,
+        "risk_score_count": risk_count,
+        "active_alerts": active_alerts
+    }
+
+
+def _fraud_stats_counters(cursor):
+    """Single-row counters behind /api/fraud/stats
+
+    Triggers keep them current in the same transaction as every insert,
+    delete, rescore and resolve, so reading the statistics no longer scans
+    the analysis and alert tables. Seeded from a full recount.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fraud_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_analyses INTEGER NOT NULL DEFAULT 0,
+            high_risk_analyses INTEGER NOT NULL DEFAULT 0,
+            risk_score_sum REAL NOT NULL DEFAULT 0.0,
+            risk_score_count INTEGER NOT NULL DEFAULT 0,
+            active_alerts INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    counters = recount_fraud_stats(cursor)
+    cursor.execute(
+        f"INSERT OR REPLACE INTO fraud_stats (id, {', '.join(counters)}) "
+        f"VALUES (1, {', '.join('?' * len(counters))})",
+        list(counters.values())
+    )
+    for statement in (
+        _stats_trigger("fraud_stats_analysis_insert", "INSERT", "analysis_results",
+                       _ANALYSIS_DELTAS, [("+", "NEW")]),
+        _stats_trigger("fraud_stats_analysis_delete", "DELETE", "analysis_results",
+                       _ANALYSIS_DELTAS, [("-", "OLD")]),
+        _stats_trigger("fraud_stats_analysis_rescore", "UPDATE OF risk_score", "analysis_results",
+                       {k: v for k, v in _ANALYSIS_DELTAS.items() if k != "total_analyses"},
+                       [("+", "NEW"), ("-", "OLD")]),
+        _stats_trigger("fraud_stats_alert_insert", "INSERT", "alerts", _ALERT_DELTAS, [("+", "NEW")]),
+        _stats_trigger("fraud_stats_alert_delete", "DELETE", "alerts", _ALERT_DELTAS, [("-", "OLD")]),
+        _stats_trigger("fraud_stats_alert_resolve", "UPDATE OF resolved", "alerts",
+                       _ALERT_DELTAS, [("+", "NEW"), ("-", "OLD")])
+    ):
+        cursor.execute(statement)
+
+
+def _listing_indexes(cursor):
+    """Indexes for keyset pagination over (created_at, id)
+
+    Every index implicitly ends with the rowid, so an index on (created_at)
+    or (filter column, created_at) yields rows already in listing order and
+    seeks straight to a cursor position. The single-column severity, type
+    and repository indexes are widened rather than duplicated; they still
+    serve the GROUP BY and equality lookups they were built for.
+    """
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS idx_alerts_created_at ON alerts(created_at)",
+        "DROP INDEX IF EXISTS idx_alerts_severity",
+        "CREATE INDEX idx_alerts_severity ON alerts(severity, created_at)",
+        "DROP INDEX IF EXISTS idx_alerts_type",
+        "CREATE INDEX idx_alerts_type ON alerts(type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_repository ON alerts(repository, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_analysis_results_created_at ON analysis_results(created_at)",
+        "DROP INDEX IF EXISTS idx_analysis_results_repository",
+        "CREATE INDEX idx_analysis_results_repository ON analysis_results(repository, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_commit_analysis_created_at ON commit_analysis(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_commit_analysis_repository ON commit_analysis(repository, created_at)"
+    ):
+        cursor.execute(statement)
+
+
+# Tables whose rule_violations JSON is normalized into ``violations``:
+# source name -> (table, SQL for the commit a violation belongs to)
+VIOLATION_SOURCES = {
+    "analysis": ("analysis_results", "NULL"),
+    "commit": ("commit_analysis", "{row}.commit_id")
+}
+
+
+def violation_rows_sql(source, row, scan=False):
+    """SELECT yielding the ``violations`` rows for the parent row ``row``
+
+    ``row`` is NEW inside a trigger; with ``scan`` it is an alias over the
+    whole source table. One row per violation object, or per entry of its
+    ``files`` list. The JSON is only walked where it is well formed, so a
+    malformed document never fails the write that carries it.
+    """
+    table, commit_id = VIOLATION_SOURCES[source]
+    commit_id = commit_id.format(row=row)
+    parents = f"{table} AS {row}, " if scan else ""
+    return f'''
+        SELECT '{source}', {row}.id,
+               COALESCE(json_extract(v.value, '$.type'), 'unknown'),
+               json_extract(v.value, '$.severity'),
+               COALESCE(json_extract(v.value, '$.commit_id'), {commit_id}),
+               {row}.repository, f.value, json_extract(v.value, '$.description'), {row}.created_at
+        FROM {parents}json_each(CASE WHEN json_valid({row}.rule_violations) THEN {row}.rule_violations ELSE '[]' END) AS v
+        LEFT JOIN json_each(CASE WHEN v.type = 'object' THEN
+                                CASE WHEN json_type(v.value, '$.files') = 'array'
+                                     THEN json_extract(v.value, '$.files') END
+                            END) AS f
+        WHERE v.type = 'object'
+    '''
+
+
+VIOLATION_COLUMNS = "(source, source_id, type, severity, commit_id, repository, file, description, created_at)"
+
+
+def _violations_table(cursor):
+    """Rule violations as rows instead of JSON inside the analysis tables
+
+    Triggers keep ``violations`` in step with every insert, re-analysis and
+    delete of ``analysis_results`` and ``commit_analysis``, including
+    buffered batch inserts. Rows written before this migration are filled
+    in by ``scripts/backfill_violations.py`` rather than here, so upgrading
+    a large database doesn't hold the write lock for a full rewrite.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS violations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL CHECK(source IN ('analysis', 'commit')),
+            source_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            severity TEXT,
+            commit_id TEXT,
+            repository TEXT,
+            file TEXT,
+            description TEXT,
+            created_at REAL
+        )
+    ''')
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS idx_violations_type ON violations(type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_violations_repository ON violations(repository, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_violations_created_at ON violations(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_violations_commit_id ON violations(commit_id)",
+        "CREATE INDEX IF NOT EXISTS idx_violations_file ON violations(file) WHERE file IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS idx_violations_source ON violations(source, source_id)"
+    ):
+        cursor.execute(statement)
+
+    for source, (table, _) in VIOLATION_SOURCES.items():
+        delete = f"DELETE FROM violations WHERE source = '{source}' AND source_id = OLD.id;"
+        insert = f"INSERT INTO violations {VIOLATION_COLUMNS} {violation_rows_sql(source, 'NEW')};"
+        for name, event, body in (
+            ("insert", "INSERT", insert),
+            ("update", "UPDATE OF rule_violations, repository, created_at", delete + insert),
+            ("delete", "DELETE", delete)
+        ):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS violations_{source}_{name}
+                    AFTER {event} ON {table}
+                BEGIN
+                    {body}
+                END
+            ''')
+
+
+# Rolled-up sources: source name -> table
+ROLLUP_SOURCES = {"analysis": "analysis_results", "commit": "commit_analysis"}
+
+
+def _retention_rollups(cursor):
+    """Daily per-repository aggregates of rows removed by retention
+
+    Retention folds expired analyses into ``analysis_rollups`` before
+    deleting them, so long-range statistics and risk trends survive the
+    raw rows. ``repository_stats`` is redefined to read both.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_rollups (
+            source TEXT NOT NULL CHECK(source IN ('analysis', 'commit')),
+            repository TEXT NOT NULL,
+            day TEXT NOT NULL,
+            analyses INTEGER NOT NULL DEFAULT 0,
+            high_risk_analyses INTEGER NOT NULL DEFAULT 0,
+            risk_score_sum REAL NOT NULL DEFAULT 0.0,
+            risk_score_count INTEGER NOT NULL DEFAULT 0,
+            max_risk_score REAL,
+            last_timestamp REAL,
+            PRIMARY KEY (source, repository, day)
+        ) WITHOUT ROWID
+    ''')
+    # Retention finds expired queue entries by age
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_webhook_logs_created_at ON webhook_logs(created_at)")
+    cursor.execute("DROP VIEW IF EXISTS repository_stats")
+    cursor.execute('''
+        CREATE VIEW repository_stats AS
+        WITH per_repository AS (
+            SELECT repository, COUNT(*) AS analyses, SUM(risk_score) AS risk_score_sum,
+                   COUNT(risk_score) AS risk_score_count, MAX(timestamp) AS last_analysis
+            FROM analysis_results GROUP BY repository
+            UNION ALL
+            SELECT repository, SUM(analyses), SUM(risk_score_sum), SUM(risk_score_count), MAX(last_timestamp)
+            FROM analysis_rollups WHERE source = 'analysis' GROUP BY repository
+        )
+        SELECT r.name, r.total_commits, IFNULL(SUM(p.analyses), 0) as analysis_count,
+               SUM(p.risk_score_sum) / SUM(p.risk_score_count) as avg_risk_score,
+               MAX(p.last_analysis) as last_analysis
+        FROM repositories r
+        LEFT JOIN per_repository p ON r.name = p.repository
+        GROUP BY r.name
+    ''')
+
+
+# Full-text indexes: search scope -> (table, index, indexed columns)
+SEARCH_INDEXES = {
+    "commits": ("commit_analysis", "commit_search", ("message", "author")),
+    "alerts": ("alerts", "alert_search", ("message",)),
+    "violations": ("violations", "violation_search", ("description", "file"))
+}
+
+
+def _search_indexes(cursor):
+    """FTS5 indexes behind ``/api/search``
+
+    Commit messages and authors, alert messages, and violation descriptions
+    and files are indexed. The indexes are external-content tables: they
+    hold only the inverted index and read the text back from the source
+    table, so they add little to the database size. Triggers keep them in
+    step with every insert, update and delete, including the violations
+    the violations triggers write. Existing rows are indexed here with a
+    single ``rebuild``, which the triggers need: removing a row the index
+    never saw corrupts it.
+    """
+    for table, index, columns in SEARCH_INDEXES.values():
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                {", ".join(columns)},
+                content='{table}', content_rowid='id',
+                tokenize='porter unicode61 remove_diacritics 2'
+            )
+        ''')
+        new = ", ".join(f"NEW.{column}" for column in columns)
+        old = ", ".join(f"OLD.{column}" for column in columns)
+        insert = f"INSERT INTO {index} (rowid, {', '.join(columns)}) VALUES (NEW.id, {new});"
+        delete = f"INSERT INTO {index} ({index}, rowid, {', '.join(columns)}) VALUES ('delete', OLD.id, {old});"
+        for name, event, body in (
+            ("insert", "INSERT", insert),
+            ("update", f"UPDATE OF {', '.join(columns)}", delete + insert),
+            ("delete", "DELETE", delete)
+        ):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {index}_{name}
+                    AFTER {event} ON {table}
+                BEGIN
+                    {body}
+                END
+            ''')
+        cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+def _webhook_retry_backoff(cursor):
+    """When a failed webhook delivery may next be claimed
+
+    Workers skip deliveries whose ``next_attempt_at`` is still in the
+    future, so retries back off instead of being claimed again at once.
+    """
+    _ensure_columns(cursor, "webhook_logs", {"next_attempt_at": "REAL"})
+
+
+# Rows announced on the live event feed:
+# (event type, table, trigger event, condition, JSON payload built from NEW)
+_VIOLATION_COUNT = ("CASE WHEN json_valid(NEW.rule_violations) AND json_type(NEW.rule_violations) = 'array' "
+                    "THEN json_array_length(NEW.rule_violations) ELSE 0 END")
+_COMMIT_ANALYSIS_EVENT = (f"json_object('id', NEW.id, 'commit_id', NEW.commit_id, 'repository', NEW.repository, "
+                          f"'author', NEW.author, 'risk_score', NEW.risk_score, 'violations', {_VIOLATION_COUNT})")
+EVENT_SOURCES = (
+    ("analysis", "analysis_results", "INSERT", "",
+     f"json_object('id', NEW.id, 'repository', NEW.repository, 'timestamp', NEW.timestamp, "
+     f"'risk_score', NEW.risk_score, 'violations', {_VIOLATION_COUNT})"),
+    ("commit_analysis", "commit_analysis", "INSERT", "", _COMMIT_ANALYSIS_EVENT),
+    # A re-analysis keeps the row (and its id) and rewrites the result
+    ("commit_analysis", "commit_analysis", "UPDATE OF risk_score, rule_violations", "", _COMMIT_ANALYSIS_EVENT),
+    ("alert", "alerts", "INSERT", "",
+     "json_object('id', NEW.id, 'type', NEW.type, 'severity', NEW.severity, 'message', NEW.message, "
+     "'repository', NEW.repository, 'commit_id', NEW.commit_id)"),
+    ("alert_resolved", "alerts", "UPDATE OF resolved", "WHEN NEW.resolved AND NOT OLD.resolved",
+     "json_object('id', NEW.id)"),
+)
+
+
+def _event_log(cursor):
+    """Append-only log behind the live event feed (``/api/events``)
+
+    Triggers append a row in the same transaction as each analysis,
+    re-analysis, alert and alert resolution, whichever process or
+    connection writes it. Every API process tails the log by id (see
+    ``EventFeed``), so the ids are the same across processes and a client
+    can resume on any of them. Old entries are removed by retention.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS event_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_event_log_created_at ON event_log(created_at)")
+    for event_type, table, event, when, payload in EVENT_SOURCES:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS event_log_{table}_{event.split()[0].lower()}
+                AFTER {event} ON {table} {when}
+            BEGIN
+                INSERT INTO event_log (type, data) VALUES ('{event_type}', {payload});
+            END
+        ''')
+
+
+# Change time with millisecond precision, so export watermarks rarely tie
+NOW_MS = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+# Tables exported incrementally; rows updated in place are exported again
+EXPORT_TABLES = ("analysis_results", "commit_analysis", "alerts")
+
+
+def _export_change_tracking(cursor):
+    """``updated_at`` on every exported table, kept current by triggers
+
+    Incremental exports seek on ``(updated_at, id)``, so a re-analyzed
+    commit or a resolved alert is exported again. ``commit_analysis`` gains
+    the column (existing rows start at their ``created_at``). An update
+    that does not set ``updated_at`` itself is stamped by the
+    ``update_*_timestamp`` trigger, now with millisecond precision, and an
+    insert that leaves it empty by ``*_insert_timestamp``.
+    """
+    _ensure_columns(cursor, "commit_analysis", {"updated_at": "REAL"})
+    for table in EXPORT_TABLES:
+        cursor.execute(f"UPDATE {table} SET updated_at = IFNULL(created_at, {NOW_MS}) WHERE updated_at IS NULL")
+        cursor.execute(f"DROP TRIGGER IF EXISTS update_{table}_timestamp")
+        cursor.execute(f'''
+            CREATE TRIGGER update_{table}_timestamp
+                AFTER UPDATE ON {table} WHEN NEW.updated_at IS OLD.updated_at
+            BEGIN
+                UPDATE {table} SET updated_at = {NOW_MS} WHERE id = NEW.id;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_insert_timestamp
+                AFTER INSERT ON {table} WHEN NEW.updated_at IS NULL
+            BEGIN
+                UPDATE {table} SET updated_at = {NOW_MS} WHERE id = NEW.id;
+            END
+        ''')
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_updated_at ON {table}(updated_at, id)")
+
+
+# (version, description, migration); append only, never renumber
+MIGRATIONS = [
+    (1, "baseline schema", _baseline),
+    (2, "unique commit analysis per commit", _unique_commit_analysis),
+    (3, "indexes for hot queries", _hot_query_indexes),
+    (4, "incrementally maintained fraud statistics", _fraud_stats_counters),
+    (5, "indexes for keyset pagination", _listing_indexes),
+    (6, "normalized rule violations", _violations_table),
+    (7, "daily rollups for retention", _retention_rollups),
+    (8, "full-text search indexes", _search_indexes),
+    (9, "retry backoff for webhook deliveries", _webhook_retry_backoff),
+    (10, "event log for the live feed", _event_log),
+    (11, "change tracking for incremental exports", _export_change_tracking),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending migrations; returns the versions that were applied"""
+    applied = []
+    for version, description, migration in MIGRATIONS:
+        if schema_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            if schema_version(conn) < version:
+                migration(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {version}")
+                applied.append(version)
+                logger.info(f"Applied schema migration {version}: {description}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
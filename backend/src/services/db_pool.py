@@ -0,0 +1,178 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from ..utils.deadline import io_timeout
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# sqlite3's own default busy timeout
+DEFAULT_BUSY_TIMEOUT = 5.0
+
+
+class SQLitePool:
+    """Long-lived SQLite connections: one writer per thread plus a reader pool
+
+    The database runs in WAL mode so dashboard reads never wait for webhook
+    writes, with ``synchronous=NORMAL`` (fsync on checkpoint rather than on
+    every commit), memory-mapped I/O and a larger page cache. Connections
+    keep their prepared-statement cache between calls. New databases are
+    created with incremental auto-vacuum so retention can return space.
+
+    Writers are per thread because SQLite serialises writes anyway; readers
+    are shared through a bounded pool of ``query_only`` connections.
+    Connections inherited across a fork are discarded and reopened.
+    """
+
+    def __init__(self, db_path, readers=None, busy_timeout=DEFAULT_BUSY_TIMEOUT):
+        self.db_path = db_path
+        self.readers = readers or int(os.getenv("SQLITE_READERS", "4"))
+        self.busy_timeout = busy_timeout
+        self.synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+        self.mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+        self.cache_size_kb = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+        self.statement_cache_size = int(os.getenv("SQLITE_STATEMENT_CACHE_SIZE", "256"))
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._connections = []
+        self._idle_readers = queue.LifoQueue()
+        self._reader_count = 0
+        self.stats = {
+            "connections_opened": 0,
+            "writer_checkouts": 0,
+            "reader_checkouts": 0,
+            "reader_waits": 0,
+            "reader_wait_seconds": 0.0
+        }
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            # Never touch a parent's connection from the child
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+    def _open(self, read_only=False):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False,
+                               cached_statements=self.statement_cache_size)
+        if not read_only:
+            # Only takes effect on a new, empty database; existing ones are
+            # converted offline (scripts/run_retention.py --full-vacuum)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        conn.execute(f"PRAGMA cache_size = -{self.cache_size_kb}")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        with self._lock:
+            self._connections.append(conn)
+            self.stats["connections_opened"] += 1
+        return conn
+
+    @contextmanager
+    def _busy_timeout(self, conn, deadline):
+        """Shorten the busy timeout to fit ``deadline`` for one checkout"""
+        if deadline is None:
+            yield conn
+            return
+        timeout = io_timeout(deadline, self.busy_timeout)
+        conn.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+        try:
+            yield conn
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+
+    @contextmanager
+    def writer(self, deadline=None):
+        """This thread's read-write connection
+
+        Behaves like ``with sqlite3.connect(...) as conn``: the transaction
+        is committed on success and rolled back on error, but the
+        connection stays open for the next call.
+        """
+        self._check_fork()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        self.stats["writer_checkouts"] += 1
+        with self._busy_timeout(conn, deadline):
+            with conn:
+                yield conn
+
+    @contextmanager
+    def reader(self, deadline=None):
+        """Borrow a read-only connection from the pool"""
+        self._check_fork()
+        conn = None
+        try:
+            conn = self._idle_readers.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._reader_count < self.readers
+                if can_open:
+                    self._reader_count += 1
+            if can_open:
+                conn = self._open(read_only=True)
+            else:
+                started = time.monotonic()
+                conn = self._idle_readers.get(timeout=io_timeout(deadline, self.busy_timeout))
+                with self._lock:
+                    self.stats["reader_waits"] += 1
+                    self.stats["reader_wait_seconds"] += time.monotonic() - started
+        self.stats["reader_checkouts"] += 1
+        try:
+            with self._busy_timeout(conn, deadline):
+                yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle_readers.put(conn)
+
+    def dedicated_reader(self):
+        """A read-only connection kept by one caller instead of pooled
+
+        For state that belongs to a connection, such as ``PRAGMA
+        data_version``. It is closed with the pool.
+        """
+        self._check_fork()
+        return self._open(read_only=True)
+
+    def health(self):
+        """Check the database answers and report its journal settings"""
+        try:
+            with self.reader() as conn:
+                conn.execute("SELECT 1").fetchone()
+                journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            return {"status": "healthy", "journal_mode": journal_mode, "synchronous": self.synchronous}
+        except Exception as e:
+            logger.error(f"Database health check failed: {e}")
+            return {"status": "unhealthy", "error": str(e)}
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["open_connections"] = len(self._connections)
+            stats["idle_readers"] = self._idle_readers.qsize()
+            stats["max_readers"] = self.readers
+        stats["reader_wait_seconds"] = round(stats["reader_wait_seconds"], 4)
+        return stats
+
+    def close(self):
+        """Close every connection opened by this process"""
+        with self._lock:
+            connections = self._connections if self._pid == os.getpid() else []
+            self._connections = []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._reset()
@@ -1,9 +1,64 @@
-import sqlite3
 import json
 import os
+import threading
+import time
 from datetime import datetime
+from .db_pool import SQLitePool
+from .write_buffer import WriteBehindBuffer
+from .event_bus import EventBus
+from .event_feed import EventFeed
+from .db_migrations import (
+    FRAUD_STATS_COUNTERS, ROLLUP_SOURCES, SCHEMA_VERSION, SEARCH_INDEXES, VIOLATION_COLUMNS, VIOLATION_SOURCES,
+    migrate, recount_fraud_stats, violation_rows_sql
+)
+from ..utils.pagination import MAX_PAGE_SIZE, InvalidCursor, decode_cursor, encode_cursor
+from ..utils.search_query import build_match_query
+from ..utils.payload_codec import PayloadCodec
+from ..utils.downsample import lttb, lttb_spans
 
 class DBService:
+    # Listable tables: the columns a page can return, and the JSON documents
+    # among them, which are only selected and decoded when asked for
+    LISTINGS = {
+        "alerts": {
+            "columns": ("id", "type", "severity", "message", "repository", "commit_id",
+                        "resolved", "resolved_at", "created_at"),
+            "json": ()
+        },
+        "analysis_results": {
+            "columns": ("id", "repository", "timestamp", "risk_score", "ai_analysis",
+                        "rule_violations", "recommendations", "created_at"),
+            "json": ("ai_analysis", "rule_violations", "recommendations")
+        },
+        "commit_analysis": {
+            "columns": ("id", "commit_id", "repository", "author", "message", "risk_score",
+                        "ai_analysis", "rule_violations", "created_at"),
+            "json": ("ai_analysis", "rule_violations")
+        },
+        "violations": {
+            "columns": ("id", "type", "severity", "commit_id", "repository", "file", "description",
+                        "source", "source_id", "created_at"),
+            "json": ()
+        }
+    }
+
+    # Exportable tables and every column an export carries, so an import
+    # restores the rows as they were; JSON documents as in LISTINGS
+    EXPORTS = {
+        "analysis_results": ("id", "repository", "timestamp", "risk_score", "ai_analysis", "rule_violations",
+                             "recommendations", "created_at", "updated_at"),
+        "commit_analysis": ("id", "commit_id", "repository", "author", "message", "risk_score", "ai_analysis",
+                            "rule_violations", "created_at", "updated_at"),
+        "alerts": ("id", "type", "severity", "message", "repository", "commit_id", "resolved", "resolved_at",
+                   "created_at", "updated_at")
+    }
+    # Imported columns that fall back to their default when missing or null
+    IMPORT_DEFAULTS = {"resolved": "FALSE", "created_at": "datetime('now')", "updated_at": "datetime('now')"}
+
+    # Risk series bucket -> width in seconds, and the most buckets one series may span
+    SERIES_BUCKETS = {"minute": 60, "hour": 3600, "day": 86400}
+    SERIES_MAX_BUCKETS = 100000
+
     def __init__(self, db_path=None):
         
         # Use absolute path resolution
@@ -18,6 +73,15 @@ class DBService:
         # Don't initialize database during import - do it lazily
         self._initialized = False
         self._logger = None
+        self._pool = None
+        self._write_buffer = None
+        self.codec = PayloadCodec()
+        # Bumped after every committed analysis or alert write; response caches compare it
+        self.data_version = 0
+        self._version_lock = threading.Lock()
+        # Live feed of committed analyses and alerts, from every process
+        self.events = EventBus()
+        self.event_feed = EventFeed(self, self.events)
 
     @property
     def logger(self):
@@ -27,8 +91,71 @@ class DBService:
             self._logger = get_logger(__name__)
         return self._logger
 
+    @property
+    def pool(self):
+        """Connection pool, opened on first use"""
+        if self._pool is None:
+            self._pool = SQLitePool(self.db_path)
+        return self._pool
+
+    def _connect(self, deadline=None):
+        """This thread's pooled write connection, busy timeout fitted to the deadline"""
+        return self.pool.writer(deadline)
+
+    @property
+    def write_buffer(self):
+        """Group-commit buffer for the single-row ``store_*`` inserts"""
+        if self._write_buffer is None:
+            self._write_buffer = WriteBehindBuffer(self.pool, on_flush=self._data_changed)
+        return self._write_buffer
+
+    def _data_changed(self):
+        """Record that analyses or alerts changed, invalidating cached responses"""
+        with self._version_lock:
+            self.data_version += 1
+        # Announce this process's writes without waiting for the next poll
+        self.event_feed.wake()
+
+    def subscribe_events(self, last_event_id=None, types=None):
+        """``EventBus.subscribe`` on the live feed, which starts tailing the event log on first use"""
+        self.event_feed.start()
+        return self.events.subscribe(last_event_id, types)
+
+    def _buffered_insert(self, sql, params, wait, deadline):
+        """Queue an insert; with ``wait`` returns whether it was committed"""
+        ticket = self.write_buffer.add(sql, params, wait=wait, deadline=deadline)
+        if wait and ticket.error is not None:
+            raise ticket.error
+        return ticket
+
+    def flush(self, deadline=None):
+        """Commit every buffered insert now"""
+        if self._write_buffer is None:
+            return 0
+        return self._write_buffer.flush(deadline)
+
+    def _read(self, deadline=None):
+        """A pooled read-only connection"""
+        return self.pool.reader(deadline)
+
+    def health_check(self):
+        """Database reachability plus connection pool statistics"""
+        health = self.pool.health()
+        health["pool"] = self.pool.get_stats()
+        health["write_buffer"] = self.write_buffer.get_stats()
+        return health
+
+    def close(self):
+        """Drain buffered writes and close pooled connections (reopened on next use)"""
+        self.event_feed.stop()
+        if self._write_buffer is not None:
+            self._write_buffer.close()
+            self._write_buffer = None
+        if self._pool is not None:
+            self._pool.close()
+
     def _ensure_tables(self):
-        """Create database tables if they don't exist"""
+        """Bring the database up to the current schema version"""
         if self._initialized:
             return
 
@@ -37,110 +164,88 @@ class DBService:
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir)
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            # Analysis results table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS analysis_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    repository TEXT NOT NULL,
-                    timestamp REAL,
-                    risk_score REAL,
-                    ai_analysis TEXT,
-                    rule_violations TEXT,
-                    recommendations TEXT,
-                    created_at REAL DEFAULT (datetime('now'))
-                )
-            ''')
-
-            # Commit analysis table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS commit_analysis (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    commit_id TEXT NOT NULL,
-                    risk_score REAL,
-                    ai_analysis TEXT,
-                    rule_violations TEXT,
-                    created_at REAL DEFAULT (datetime('now'))
-                )
-            ''')
-
-            # Alerts table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS alerts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    type TEXT NOT NULL,
-                    severity TEXT,
-                    message TEXT,
-                    repository TEXT,
-                    commit_id TEXT,
-                    resolved BOOLEAN DEFAULT FALSE,
-                    created_at REAL DEFAULT (datetime('now'))
-                )
-            ''')
-
-            conn.commit()
+        with self._connect() as conn:
+            applied = migrate(conn)
             self._initialized = True
-            self.logger.info("Database tables ensured")
+            self.logger.info(f"Database schema at version {SCHEMA_VERSION}"
+                             + (f" (applied {applied})" if applied else ""))
+
+    def store_analysis_result(self, result, deadline=None, wait=True):
+        """Store repository analysis result
 
-    def store_analysis_result(self, result):
-        """Store repository analysis result"""
+        Inserts go through the write-behind buffer. With ``wait`` (the
+        default) this returns once the row is committed; ``wait=False``
+        leaves it to the next group flush. The same applies to
+        ``store_commit_analysis`` and ``store_alert``.
+        """
         self._ensure_tables()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO analysis_results
-                    (repository, timestamp, risk_score, ai_analysis, rule_violations, recommendations)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    result.get('repository'),
-                    result.get('timestamp'),
-                    result.get('risk_score'),
-                    json.dumps(result.get('ai_analysis', {})),
-                    json.dumps(result.get('rule_violations', [])),
-                    json.dumps(result.get('recommendations', []))
-                ))
-                conn.commit()
+            self._buffered_insert('''
+                INSERT INTO analysis_results
+                (repository, timestamp, risk_score, ai_analysis, rule_violations, recommendations, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            ''', (
+                result.get('repository'),
+                result.get('timestamp'),
+                result.get('risk_score'),
+                self.codec.encode(result.get('ai_analysis', {})),
+                self._violations_json(result.get('rule_violations', [])),
+                self.codec.encode(result.get('recommendations', []))
+            ), wait, deadline)
+            if wait:
                 self.logger.info(f"Stored analysis result for {result.get('repository')}")
         except Exception as e:
             self.logger.error(f"Error storing analysis result: {e}")
 
-    def store_commit_analysis(self, result):
+    @staticmethod
+    def _violations_json(violations):
+        """Rule violations stay JSON text: the violations triggers read them with json_each"""
+        return json.dumps(violations, separators=(",", ":"))
+
+    def store_commit_analysis(self, result, deadline=None, wait=True):
         """Store individual commit analysis"""
         # Ensure tables exist before attempting to insert
         self._ensure_tables()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO commit_analysis
-                    (commit_id, risk_score, ai_analysis, rule_violations)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    result.get('commit_id'),
-                    result.get('risk_score'),
-                    json.dumps(result.get('ai_analysis', {})),
-                    json.dumps(result.get('rule_violations', []))
-                ))
-                conn.commit()
+            # commit_id is unique: re-analyzing a commit replaces its result
+            self._buffered_insert('''
+                INSERT INTO commit_analysis
+                (commit_id, risk_score, ai_analysis, rule_violations, repository, author, message, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+                ON CONFLICT(commit_id) DO UPDATE SET
+                    risk_score = excluded.risk_score,
+                    ai_analysis = excluded.ai_analysis,
+                    rule_violations = excluded.rule_violations,
+                    repository = COALESCE(excluded.repository, repository),
+                    author = excluded.author,
+                    message = excluded.message,
+                    created_at = datetime('now'),
+                    updated_at = excluded.updated_at
+            ''', (
+                result.get('commit_id'),
+                result.get('risk_score'),
+                self.codec.encode(result.get('ai_analysis', {})),
+                self._violations_json(result.get('rule_violations', [])),
+                result.get('repository'),
+                result.get('author'),
+                result.get('message')
+            ), wait, deadline)
+            if wait:
                 self.logger.info(f"Stored commit analysis for {result.get('commit_id')}")
         except Exception as e:
             self.logger.error(f"Error storing commit analysis: {e}")
 
-    def store_alert(self, alert_type, severity, message, repository=None, commit_id=None):
+    def store_alert(self, alert_type, severity, message, repository=None, commit_id=None, deadline=None,
+                    wait=True):
         """Store an alert"""
         # Ensure tables exist before attempting to insert
         self._ensure_tables()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO alerts (type, severity, message, repository, commit_id)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (alert_type, severity, message, repository, commit_id))
-                conn.commit()
+            self._buffered_insert('''
+                INSERT INTO alerts (type, severity, message, repository, commit_id, updated_at)
+                VALUES (?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            ''', (alert_type, severity, message, repository, commit_id), wait, deadline)
+            if wait:
                 self.logger.info(f"Stored alert: {alert_type}")
         except Exception as e:
             self.logger.error(f"Error storing alert: {e}")
@@ -149,7 +254,7 @@ class DBService:
         """Get recent alerts"""
         self._ensure_tables()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._read() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT id, type, severity, message, repository, commit_id, resolved, created_at
@@ -158,54 +263,324 @@ class DBService:
                     ORDER BY created_at DESC
                     LIMIT ?
                 ''', (limit,))
-                rows = cursor.fetchall()
-
-                alerts = []
-                for row in rows:
-                    alerts.append({
-                        "id": row[0],
-                        "type": row[1],
-                        "severity": row[2],
-                        "message": row[3],
-                        "repository": row[4],
-                        "commit_id": row[5],
-                        "resolved": bool(row[6]),
-                        "created_at": row[7]
-                    })
-                return alerts
+                return [self._alert_from_row(row) for row in cursor.fetchall()]
         except Exception as e:
             self.logger.error(f"Error getting recent alerts: {e}")
             return []
 
-    def get_fraud_stats(self):
-        """Get overall fraud statistics"""
+    def get_alert(self, alert_id):
+        """Get a single alert (resolved or not) by ID; None if it doesn't exist"""
         self._ensure_tables()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._read() as conn:
+                row = conn.execute('''
+                    SELECT id, type, severity, message, repository, commit_id, resolved, created_at
+                    FROM alerts
+                    WHERE id = ?
+                ''', (alert_id,)).fetchone()
+                return self._alert_from_row(row) if row else None
+        except Exception as e:
+            self.logger.error(f"Error getting alert {alert_id}: {e}")
+            return None
 
-                # Get total analyses
-                cursor.execute('SELECT COUNT(*) FROM analysis_results')
-                total_analyses = cursor.fetchone()[0]
+    def get_alerts_summary(self):
+        """Alert totals plus severity and type breakdowns over all alerts"""
+        self._ensure_tables()
+        try:
+            with self._read() as conn:
+                total, active = conn.execute('''
+                    SELECT COUNT(*), COALESCE(SUM(resolved = FALSE), 0) FROM alerts
+                ''').fetchone()
+                severity_counts = dict(conn.execute('''
+                    SELECT COALESCE(severity, 'unknown'), COUNT(*) FROM alerts GROUP BY severity
+                ''').fetchall())
+                type_counts = dict(conn.execute('''
+                    SELECT type, COUNT(*) FROM alerts GROUP BY type
+                ''').fetchall())
+                return {
+                    "total_alerts": total,
+                    "active_alerts": active,
+                    "severity_breakdown": severity_counts,
+                    "type_breakdown": type_counts
+                }
+        except Exception as e:
+            self.logger.error(f"Error getting alerts summary: {e}")
+            return None
 
-                # Get high-risk analyses
-                cursor.execute('SELECT COUNT(*) FROM analysis_results WHERE risk_score > 0.7')
-                high_risk = cursor.fetchone()[0]
+    @staticmethod
+    def _alert_from_row(row):
+        return {
+            "id": row[0],
+            "type": row[1],
+            "severity": row[2],
+            "message": row[3],
+            "repository": row[4],
+            "commit_id": row[5],
+            "resolved": bool(row[6]),
+            "created_at": row[7]
+        }
 
-                # Get recent alerts count
-                cursor.execute('SELECT COUNT(*) FROM alerts WHERE resolved = FALSE')
-                active_alerts = cursor.fetchone()[0]
+    def list_alerts(self, limit=50, cursor=None, repository=None, severity=None, alert_type=None,
+                    resolved=None, fields=None):
+        """Page through alerts, newest first (see ``_list_page``)"""
+        return self._list_page("alerts", [
+            ("repository = ?", repository),
+            ("severity = ?", severity),
+            ("type = ?", alert_type),
+            ("resolved = ?", resolved)
+        ], limit, cursor, fields)
 
-                # Get average risk score
-                cursor.execute('SELECT AVG(risk_score) FROM analysis_results')
-                avg_risk = cursor.fetchone()[0] or 0.0
+    def list_analysis_results(self, limit=50, cursor=None, repository=None, min_risk=None, max_risk=None,
+                              fields=None):
+        """Page through repository analysis results, newest first"""
+        return self._list_page("analysis_results", [
+            ("repository = ?", repository),
+            ("risk_score >= ?", min_risk),
+            ("risk_score <= ?", max_risk)
+        ], limit, cursor, fields)
 
-                return {
-                    "total_analyses": total_analyses,
-                    "high_risk_analyses": high_risk,
-                    "active_alerts": active_alerts,
-                    "average_risk_score": round(avg_risk, 3)
-                }
+    def list_commit_analyses(self, limit=50, cursor=None, repository=None, min_risk=None, max_risk=None,
+                             fields=None):
+        """Page through commit analyses, newest first"""
+        return self._list_page("commit_analysis", [
+            ("repository = ?", repository),
+            ("risk_score >= ?", min_risk),
+            ("risk_score <= ?", max_risk)
+        ], limit, cursor, fields)
+
+    def list_violations(self, limit=50, cursor=None, violation_type=None, severity=None, repository=None,
+                        commit_id=None, file=None, since_days=None, fields=None):
+        """Page through normalized rule violations, newest first"""
+        return self._list_page("violations", [
+            ("type = ?", violation_type),
+            ("severity = ?", severity),
+            ("repository = ?", repository),
+            ("commit_id = ?", commit_id),
+            ("file = ?", file),
+            self._since_filter(since_days)
+        ], limit, cursor, fields)
+
+    def get_violation_summary(self, since_days=None, violation_type=None, repository=None):
+        """Violation counts per type/severity and per repository
+
+        Counts are rows of the ``violations`` table, so a violation listing
+        several files counts once per file.
+        """
+        filters = [
+            (condition, value) for condition, value in (
+                ("type = ?", violation_type),
+                ("repository = ?", repository),
+                self._since_filter(since_days)
+            ) if value is not None
+        ]
+        where = "WHERE " + " AND ".join(condition for condition, _ in filters) if filters else ""
+        params = [value for _, value in filters]
+        self._ensure_tables()
+        try:
+            with self._read() as conn:
+                by_type = conn.execute(f'''
+                    SELECT type, severity, COUNT(*), COUNT(DISTINCT repository), MAX(created_at)
+                    FROM violations {where}
+                    GROUP BY type, severity
+                    ORDER BY COUNT(*) DESC
+                ''', params).fetchall()
+                by_repository = conn.execute(f'''
+                    SELECT repository, COUNT(*), MAX(created_at)
+                    FROM violations {where}
+                    GROUP BY repository
+                    ORDER BY COUNT(*) DESC
+                ''', params).fetchall()
+            return {
+                "by_type": [
+                    {"type": row[0], "severity": row[1], "occurrences": row[2], "repositories": row[3],
+                     "last_seen": row[4]}
+                    for row in by_type
+                ],
+                "by_repository": [
+                    {"repository": row[0], "occurrences": row[1], "last_seen": row[2]}
+                    for row in by_repository
+                ]
+            }
+        except Exception as e:
+            self.logger.error(f"Error getting violation summary: {e}")
+            return None
+
+    @staticmethod
+    def _since_filter(since_days):
+        """Filter on the last ``since_days`` days; skipped when None"""
+        return ("created_at >= datetime('now', ?)", None if since_days is None else f"-{float(since_days)} days")
+
+    def backfill_violations(self, batch_size=1000):
+        """Normalize violations of rows stored before the violations table existed
+
+        Walks each source table in id order, one short write transaction
+        per batch, and skips rows that already have violations, so it can
+        be interrupted and rerun. Returns the number of rows inserted per
+        source.
+        """
+        self._ensure_tables()
+        inserted = {}
+        for source, (table, _) in VIOLATION_SOURCES.items():
+            inserted[source] = 0
+            with self._read() as conn:
+                max_id = conn.execute(f"SELECT IFNULL(MAX(id), 0) FROM {table}").fetchone()[0]
+            last_id = 0
+            while last_id < max_id:
+                with self._connect() as conn:
+                    cursor = conn.execute(f'''
+                        INSERT INTO violations {VIOLATION_COLUMNS}
+                        {violation_rows_sql(source, "parent", scan=True)}
+                        AND parent.id > ? AND parent.id <= ?
+                        AND NOT EXISTS (SELECT 1 FROM violations
+                                        WHERE source = '{source}' AND source_id = parent.id)
+                    ''', (last_id, last_id + batch_size))
+                    inserted[source] += cursor.rowcount
+                last_id += batch_size
+            self.logger.info(f"Backfilled {inserted[source]} violations from {table}")
+        return inserted
+
+    def _list_page(self, table, filters, limit, cursor, fields):
+        """One keyset page of ``table`` ordered by (created_at, id) descending
+
+        ``filters`` are (condition, value) pairs; those whose value is None
+        are skipped. A page continues strictly after the position encoded in
+        ``cursor``, which the (..., created_at) indexes seek to directly, so
+        deep pages cost the same as the first. ``fields`` restricts the
+        columns returned (id and created_at are always included); by default
+        the JSON documents are left out. Returns ``{"items", "next_cursor"}``
+        with ``next_cursor`` None on the last page, or None on a database
+        error. Unknown fields or a malformed cursor raise ``ValueError``.
+        """
+        listing = self.LISTINGS[table]
+        if fields is None:
+            selected = [column for column in listing["columns"] if column not in listing["json"]]
+        else:
+            unknown = set(fields) - set(listing["columns"])
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+            selected = [column for column in listing["columns"]
+                        if column in fields or column in ("id", "created_at")]
+
+        conditions = [condition for condition, value in filters if value is not None]
+        params = [value for _, value in filters if value is not None]
+        if cursor:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        self._ensure_tables()
+        try:
+            with self._read() as conn:
+                # One row past the page tells whether there is a next one
+                rows = conn.execute(f'''
+                    SELECT {", ".join(selected)} FROM {table}
+                    {"WHERE " + " AND ".join(conditions) if conditions else ""}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?
+                ''', params + [limit + 1]).fetchall()
+        except Exception as e:
+            self.logger.error(f"Error listing {table}: {e}")
+            return None
+
+        items = []
+        for row in rows[:limit]:
+            item = dict(zip(selected, row))
+            for column in listing["json"]:
+                if column in item:
+                    item[column] = PayloadCodec.decode(item[column])
+            if "resolved" in item:
+                item["resolved"] = bool(item["resolved"])
+            items.append(item)
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+        return {"items": items, "next_cursor": next_cursor}
+
+    def search(self, scope, query, limit=20, cursor=None, repository=None, since_days=None, sort="rank"):
+        """Full-text search of commits, alerts or violations
+
+        ``query`` is free text (see ``build_match_query``). Results are the
+        listing columns of the matching rows plus a relevance ``score`` and
+        ``highlights``: the matching part of each indexed column with the
+        terms wrapped in ``<mark>``. ``sort`` is ``rank`` (best match first)
+        or ``newest``, which skips ranking every match and stays fast for
+        very common terms. Pages continue after ``cursor`` as in
+        ``_list_page``; ranks shift slightly as rows are added, so a ranked
+        page may repeat or skip a row written in between. Returns
+        ``{"items", "next_cursor"}``, or None on a database error. An
+        unknown scope or sort, an empty query or a malformed cursor raise
+        ``ValueError``.
+        """
+        if scope not in SEARCH_INDEXES:
+            raise ValueError(f"Unknown search scope: {scope!r}")
+        if sort not in ("rank", "newest"):
+            raise ValueError(f"Unknown sort: {sort!r}")
+        table, index, indexed = SEARCH_INDEXES[scope]
+        listing = self.LISTINGS[table]
+        selected = [column for column in listing["columns"] if column not in listing["json"]]
+
+        conditions = [f"{index} MATCH ?"]
+        params = [build_match_query(query)]
+        for condition, value in (("repository = ?", repository), self._since_filter(since_days)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        if cursor:
+            rank, row_id = decode_cursor(cursor)
+            if sort == "rank":
+                if not isinstance(rank, (int, float)):
+                    raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+                conditions.append(f"({index}.rank, {index}.rowid) > (?, ?)")
+                params.extend((rank, row_id))
+            else:
+                conditions.append(f"{index}.rowid < ?")
+                params.append(row_id)
+        order = f"{index}.rank, {index}.rowid" if sort == "rank" else f"{index}.rowid DESC"
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        highlights = ", ".join(
+            f"snippet({index}, {position}, '<mark>', '</mark>', '…', 32)" for position in range(len(indexed))
+        )
+
+        self._ensure_tables()
+        try:
+            with self._read() as conn:
+                rows = conn.execute(f'''
+                    SELECT {", ".join(f"t.{column}" for column in selected)}, {index}.rank, {highlights}
+                    FROM {index} JOIN {table} t ON t.id = {index}.rowid
+                    WHERE {" AND ".join(conditions)}
+                    ORDER BY {order}
+                    LIMIT ?
+                ''', params + [limit + 1]).fetchall()
+        except Exception as e:
+            self.logger.error(f"Error searching {scope}: {e}")
+            return None
+
+        items = []
+        for row in rows[:limit]:
+            item = dict(zip(selected, row))
+            rank = row[len(selected)]
+            item["score"] = round(-rank, 4)
+            item["highlights"] = {
+                column: text for column, text in zip(indexed, row[len(selected) + 1:]) if text and "<mark>" in text
+            }
+            if "resolved" in item:
+                item["resolved"] = bool(item["resolved"])
+            items.append((rank, item))
+        next_cursor = None
+        if len(rows) > limit:
+            rank, item = items[-1]
+            next_cursor = encode_cursor(rank if sort == "rank" else None, item["id"])
+        return {"items": [item for _, item in items], "next_cursor": next_cursor}
+
+    def get_fraud_stats(self):
+        """Get overall fraud statistics from the trigger-maintained counters"""
+        self._ensure_tables()
+        try:
+            with self._read() as conn:
+                row = conn.execute(f'''
+                    SELECT {", ".join(FRAUD_STATS_COUNTERS)} FROM fraud_stats WHERE id = 1
+                ''').fetchone()
+                return self._fraud_stats_from_counters(dict(zip(FRAUD_STATS_COUNTERS, row)))
         except Exception as e:
             self.logger.error(f"Error getting fraud stats: {e}")
             return {
@@ -215,15 +590,582 @@ class DBService:
                 "average_risk_score": 0.0
             }
 
+    def check_fraud_stats(self, repair=False):
+        """Compare the statistics counters with a full recount of the tables
+
+        Both are read from the same snapshot. With ``repair=True`` the
+        counters are reset to the recount when they disagree.
+        """
+        self._ensure_tables()
+        try:
+            with (self._connect() if repair else self._read()) as conn:
+                conn.execute("BEGIN IMMEDIATE" if repair else "BEGIN")
+                row = conn.execute(f'''
+                    SELECT {", ".join(FRAUD_STATS_COUNTERS)} FROM fraud_stats WHERE id = 1
+                ''').fetchone()
+                counters = dict(zip(FRAUD_STATS_COUNTERS, row))
+                recounted = recount_fraud_stats(conn)
+                stats = self._fraud_stats_from_counters(counters)
+                expected = self._fraud_stats_from_counters(recounted)
+                drift = {
+                    name: counters[name] - recounted[name]
+                    for name in FRAUD_STATS_COUNTERS
+                    if abs(counters[name] - recounted[name]) > 1e-6
+                }
+                consistent = stats == expected and not drift
+                if repair and not consistent:
+                    conn.execute(
+                        f"UPDATE fraud_stats SET {', '.join(f'{name} = ?' for name in recounted)} WHERE id = 1",
+                        list(recounted.values())
+                    )
+                    self.logger.warning(f"Repaired fraud statistics counters (drift: {drift})")
+            return {
+                "consistent": consistent,
+                "counters": stats,
+                "recomputed": expected,
+                "drift": drift,
+                "repaired": repair and not consistent
+            }
+        except Exception as e:
+            self.logger.error(f"Error checking fraud stats: {e}")
+            return None
+
+    @staticmethod
+    def _fraud_stats_from_counters(counters):
+        count = counters["risk_score_count"]
+        return {
+            "total_analyses": counters["total_analyses"],
+            "high_risk_analyses": counters["high_risk_analyses"],
+            "active_alerts": counters["active_alerts"],
+            "average_risk_score": round(counters["risk_score_sum"] / count, 3) if count else 0.0
+        }
+
     def resolve_alert(self, alert_id):
         """Mark an alert as resolved"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('UPDATE alerts SET resolved = TRUE WHERE id = ?', (alert_id,))
                 conn.commit()
                 self.logger.info(f"Resolved alert {alert_id}")
+            self._data_changed()
             return True
         except Exception as e:
             self.logger.error(f"Error resolving alert: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def enqueue_webhook(self, event_type, repository, payload, signature_valid=True, delivery_key=None,
+                        priority=0):
+        """Durably queue a webhook delivery for background processing
+
+        ``delivery_key`` identifies the delivery for deduplication; a key
+        that is already queued is not inserted again. Higher ``priority``
+        entries are claimed first. Returns
+        ``(queue_id, duplicate)``, with ``queue_id`` None if nothing could
+        be written.
+        """
+        self._ensure_tables()
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO webhook_logs
+                    (event_type, repository, payload, signature_valid, delivery_key, priority)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT DO NOTHING
+                ''', (event_type, repository, self.codec.encode(payload), signature_valid, delivery_key, priority))
+                conn.commit()
+                if cursor.rowcount == 0:
+                    row = conn.execute(
+                        'SELECT id FROM webhook_logs WHERE delivery_key = ?', (delivery_key,)
+                    ).fetchone()
+                    return (row[0] if row else None), True
+                return cursor.lastrowid, False
+        except Exception as e:
+            self.logger.error(f"Error queueing webhook: {e}")
+            return None, False
+
+    def release_delivery_keys(self, older_than_seconds):
+        """Forget delivery keys older than the deduplication window"""
+        self._ensure_tables()
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute('''
+                    UPDATE webhook_logs SET delivery_key = NULL
+                    WHERE delivery_key IS NOT NULL AND created_at < datetime('now', ?)
+                ''', (f"-{int(older_than_seconds)} seconds",))
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            self.logger.error(f"Error releasing webhook delivery keys: {e}")
+            return 0
+
+    def claim_webhook(self, worker_id, lease_seconds=300, max_attempts=5):
+        """Claim the highest-priority, oldest pending webhook for processing
+
+        Entries whose lease has expired (e.g. the worker died) are claimed
+        again, which gives at-least-once processing. Failed entries wait
+        until their ``next_attempt_at``, and entries that already used
+        ``max_attempts`` are left alone as dead letters.
+        """
+        self._ensure_tables()
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                # Take the write lock before reading so two workers can't claim the same row
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute('''
+                    SELECT id, event_type, repository, payload, attempts
+                    FROM webhook_logs
+                    WHERE processed = FALSE
+                      AND attempts < ?
+                      AND (claimed_at IS NULL OR claimed_at < ?)
+                      AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                    ORDER BY priority DESC, id
+                    LIMIT 1
+                ''', (max_attempts, now - lease_seconds, now)).fetchone()
+                if row is None:
+                    return None
+                conn.execute('''
+                    UPDATE webhook_logs
+                    SET claimed_at = ?, claimed_by = ?, attempts = attempts + 1
+                    WHERE id = ?
+                ''', (now, worker_id, row[0]))
+            return {
+                "id": row[0],
+                "event_type": row[1],
+                "repository": row[2],
+                "payload": PayloadCodec.decode(row[3]),
+                "attempts": row[4] + 1
+            }
+        except Exception as e:
+            self.logger.error(f"Error claiming webhook: {e}")
+            return None
+
+    def complete_webhook(self, webhook_id, processing_time):
+        """Mark a claimed webhook as processed and record how long it took"""
+        try:
+            with self._connect() as conn:
+                conn.execute('''
+                    UPDATE webhook_logs
+                    SET processed = TRUE, processing_time = ?, processed_at = ?, error = NULL
+                    WHERE id = ?
+                ''', (processing_time, time.time(), webhook_id))
+                conn.commit()
+            return True
+        except Exception as e:
+            self.logger.error(f"Error completing webhook {webhook_id}: {e}")
+            return False
+
+    def fail_webhook(self, webhook_id, error, retry_delay=0):
+        """Release a claimed webhook after a failed attempt so it can be retried
+
+        The delivery is not claimed again for ``retry_delay`` seconds.
+        """
+        try:
+            with self._connect() as conn:
+                conn.execute('''
+                    UPDATE webhook_logs
+                    SET claimed_at = NULL, claimed_by = NULL, error = ?, next_attempt_at = ?
+                    WHERE id = ?
+                ''', (str(error), time.time() + retry_delay, webhook_id))
+                conn.commit()
+            return True
+        except Exception as e:
+            self.logger.error(f"Error releasing webhook {webhook_id}: {e}")
+            return False
+
+    def get_webhook_queue_stats(self, max_attempts=5):
+        """Get pending, in-flight, processed and dead-lettered webhook counts"""
+        self._ensure_tables()
+        try:
+            with self._read() as conn:
+                row = conn.execute('''
+                    SELECT
+                        SUM(CASE WHEN processed = FALSE AND attempts < ? AND claimed_at IS NULL THEN 1 ELSE 0 END),
+                        SUM(CASE WHEN processed = FALSE AND claimed_at IS NOT NULL THEN 1 ELSE 0 END),
+                        SUM(CASE WHEN processed = TRUE THEN 1 ELSE 0 END),
+                        SUM(CASE WHEN processed = FALSE AND attempts >= ? AND claimed_at IS NULL THEN 1 ELSE 0 END),
+                        AVG(processing_time)
+                    FROM webhook_logs
+                ''', (max_attempts, max_attempts)).fetchone()
+                return {
+                    "pending": row[0] or 0,
+                    "in_flight": row[1] or 0,
+                    "processed": row[2] or 0,
+                    "dead_letter": row[3] or 0,
+                    "average_processing_time": round(row[4] or 0.0, 3)
+                }
+        except Exception as e:
+            self.logger.error(f"Error getting webhook queue stats: {e}")
+            return {"pending": 0, "in_flight": 0, "processed": 0, "dead_letter": 0,
+                    "average_processing_time": 0.0}
+
+    def roll_up_expired(self, source, older_than_days, batch_size=500, deadline=None):
+        """Fold one batch of expired analyses into daily rollups and delete them
+
+        ``source`` is "analysis" (analysis_results) or "commit"
+        (commit_analysis). The oldest ``batch_size`` rows created more than
+        ``older_than_days`` ago are added to ``analysis_rollups`` per day and
+        repository, then deleted, in one short transaction. The fraud_stats
+        counters keep counting rolled-up analyses. Returns the number of
+        rows removed; 0 once nothing has expired.
+        """
+        table = ROLLUP_SOURCES[source]
+        self._ensure_tables()
+        expired = f'''
+            SELECT id FROM {table}
+            WHERE created_at < ?
+            ORDER BY created_at, id
+            LIMIT ?
+        '''
+        with self._connect(deadline) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Fixed once so every statement below selects the same rows
+            cutoff = conn.execute("SELECT datetime('now', ?)", (f"-{float(older_than_days)} days",)).fetchone()[0]
+            params = (cutoff, batch_size)
+            totals = conn.execute(f'''
+                SELECT COUNT(*), IFNULL(SUM(risk_score > 0.7), 0), IFNULL(SUM(risk_score), 0.0),
+                       COUNT(risk_score)
+                FROM {table} WHERE id IN ({expired})
+            ''', params).fetchone()
+            if not totals[0]:
+                return 0
+            conn.execute(f'''
+                INSERT INTO analysis_rollups
+                (source, repository, day, analyses, high_risk_analyses, risk_score_sum, risk_score_count,
+                 max_risk_score, last_timestamp)
+                SELECT '{source}', IFNULL(repository, ''), date(created_at), COUNT(*),
+                       IFNULL(SUM(risk_score > 0.7), 0), IFNULL(SUM(risk_score), 0.0), COUNT(risk_score),
+                       MAX(risk_score), {"MAX(timestamp)" if source == "analysis" else "NULL"}
+                FROM {table} WHERE id IN ({expired})
+                GROUP BY 1, 2, 3
+                ON CONFLICT(source, repository, day) DO UPDATE SET
+                    analyses = analyses + excluded.analyses,
+                    high_risk_analyses = high_risk_analyses + excluded.high_risk_analyses,
+                    risk_score_sum = risk_score_sum + excluded.risk_score_sum,
+                    risk_score_count = risk_score_count + excluded.risk_score_count,
+                    max_risk_score = MAX(IFNULL(max_risk_score, excluded.max_risk_score),
+                                         IFNULL(excluded.max_risk_score, max_risk_score)),
+                    last_timestamp = MAX(IFNULL(last_timestamp, excluded.last_timestamp),
+                                         IFNULL(excluded.last_timestamp, last_timestamp))
+            ''', params)
+            conn.execute(f"DELETE FROM {table} WHERE id IN ({expired})", params)
+            if source == "analysis":
+                # The delete triggers took these out of the all-time counters; put them back
+                conn.execute('''
+                    UPDATE fraud_stats SET
+                        total_analyses = total_analyses + ?,
+                        high_risk_analyses = high_risk_analyses + ?,
+                        risk_score_sum = risk_score_sum + ?,
+                        risk_score_count = risk_score_count + ?
+                    WHERE id = 1
+                ''', totals)
+        self._data_changed()
+        return totals[0]
+
+    def delete_expired_webhook_logs(self, older_than_days, batch_size=500, max_attempts=5, deadline=None):
+        """Delete one batch of finished webhook deliveries older than ``older_than_days``
+
+        Only processed deliveries and dead letters (``max_attempts`` used)
+        are removed; pending ones are left to the workers. Returns the
+        number of rows deleted.
+        """
+        self._ensure_tables()
+        with self._connect(deadline) as conn:
+            cursor = conn.execute('''
+                DELETE FROM webhook_logs WHERE id IN (
+                    SELECT id FROM webhook_logs
+                    WHERE created_at < datetime('now', ?)
+                      AND (processed = TRUE OR (attempts >= ? AND claimed_at IS NULL))
+                    ORDER BY created_at
+                    LIMIT ?
+                )
+            ''', (f"-{float(older_than_days)} days", max_attempts, batch_size))
+            return cursor.rowcount
+
+    def delete_expired_events(self, older_than_days, batch_size=500, deadline=None):
+        """Delete one batch of live feed entries older than ``older_than_days``; the number deleted"""
+        self._ensure_tables()
+        with self._connect(deadline) as conn:
+            cursor = conn.execute('''
+                DELETE FROM event_log WHERE id IN (
+                    SELECT id FROM event_log WHERE created_at < ? ORDER BY id LIMIT ?
+                )
+            ''', (time.time() - float(older_than_days) * 86400, batch_size))
+            return cursor.rowcount
+
+    def incremental_vacuum(self, max_pages=None, deadline=None):
+        """Return free pages to the filesystem; the number of pages released
+
+        Needs ``auto_vacuum=INCREMENTAL``, which new databases get and older
+        ones acquire with ``full_vacuum``; otherwise it does nothing.
+        """
+        self._ensure_tables()
+        with self._connect(deadline) as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return 0
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            pages = free_pages if max_pages is None else min(free_pages, max_pages)
+            if pages:
+                conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            return pages
+
+    def full_vacuum(self):
+        """Rewrite the whole database, switching it to incremental auto-vacuum
+
+        Blocks every writer for the duration; meant for a maintenance window.
+        """
+        self._ensure_tables()
+        self.flush()
+        with self._connect() as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+
+    def get_export_watermark(self, table):
+        """Position of the most recently changed row of an exportable table
+
+        An opaque ``(updated_at, id)`` cursor, or None while the table is
+        empty.
+        """
+        if table not in self.EXPORTS:
+            raise ValueError(f"Unknown export table: {table!r}")
+        self._ensure_tables()
+        with self._read() as conn:
+            row = conn.execute(f'''
+                SELECT updated_at, id FROM {table} ORDER BY updated_at DESC, id DESC LIMIT 1
+            ''').fetchone()
+        return encode_cursor(*row) if row else None
+
+    def export_batches(self, table, since=None, until=None, batch_size=1000):
+        """Yield the rows of ``table`` changed after ``since`` up to ``until``
+
+        ``since`` and ``until`` are watermarks from ``get_export_watermark``;
+        rows are ordered by ``(updated_at, id)``, so a row updated in place
+        (a re-analyzed commit, a resolved alert) comes again after its
+        first export. Rows come as lists of at most ``batch_size`` dicts
+        with the JSON documents decoded. Each batch is its own short read
+        that seeks to the position of the previous one, so memory use is
+        constant, the cost of a batch doesn't grow with the table, and a
+        long export never holds back WAL checkpoints. ``until`` defaults to
+        the watermark when the export starts. A malformed watermark raises
+        ``InvalidCursor`` straight away; database errors are logged and
+        raised, so a failed export is never mistaken for a complete one.
+        """
+        if until is None:
+            until = self.get_export_watermark(table)
+        position = decode_cursor(since) if since else None
+        end = decode_cursor(until) if until else None
+        return self._export_batches(table, position, end, batch_size)
+
+    def _export_batches(self, table, position, end, batch_size):
+        columns = self.EXPORTS[table]
+        json_columns = self.LISTINGS[table]["json"]
+        while end is not None:
+            after, params = "", []
+            if position is not None:
+                after, params = "AND (updated_at, id) > (?, ?)", list(position)
+            try:
+                with self._read() as conn:
+                    rows = conn.execute(f'''
+                        SELECT {", ".join(columns)} FROM {table}
+                        WHERE (updated_at, id) <= (?, ?) {after}
+                        ORDER BY updated_at, id
+                        LIMIT ?
+                    ''', [*end, *params, batch_size]).fetchall()
+            except Exception as e:
+                self.logger.error(f"Error exporting {table} after {position}: {e}")
+                raise
+            if not rows:
+                return
+            batch = []
+            for row in rows:
+                item = dict(zip(columns, row))
+                for column in json_columns:
+                    item[column] = PayloadCodec.decode(item[column])
+                if "resolved" in item:
+                    item["resolved"] = bool(item["resolved"])
+                batch.append(item)
+            yield batch
+            position = (batch[-1]["updated_at"], batch[-1]["id"])
+
+    def import_rows(self, table, rows, batch_size=1000):
+        """Write exported rows back into ``table``, one transaction per batch
+
+        ``rows`` is any iterable of dicts as ``export_batches`` produces;
+        it is consumed lazily. Ids are kept. A row whose id already exists
+        replaces it only if its ``updated_at`` is newer, so incremental
+        exports carry re-analyses and resolutions over; otherwise, and for
+        a commit already stored under another id, it is skipped, so an
+        interrupted restore can simply be rerun. The triggers update
+        statistics, violations and search indexes as for any other write.
+        Returns the number of rows written.
+        """
+        if table not in self.EXPORTS:
+            raise ValueError(f"Unknown export table: {table!r}")
+        columns = self.EXPORTS[table]
+        values = ", ".join(
+            f"COALESCE(?, {self.IMPORT_DEFAULTS[column]})" if column in self.IMPORT_DEFAULTS else "?"
+            for column in columns
+        )
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != "id")
+        sql = f'''
+            INSERT INTO {table} ({", ".join(columns)}) VALUES ({values})
+            ON CONFLICT(id) DO UPDATE SET {updates} WHERE excluded.updated_at > {table}.updated_at
+            ON CONFLICT DO NOTHING
+        '''
+        self._ensure_tables()
+        inserted = 0
+        batch = []
+        for row in rows:
+            batch.append(tuple(self._import_value(column, row.get(column)) for column in columns))
+            if len(batch) >= batch_size:
+                inserted += self._insert_batch(sql, batch)
+                batch = []
+        if batch:
+            inserted += self._insert_batch(sql, batch)
+        self.logger.info(f"Imported {inserted} rows into {table}")
+        return inserted
+
+    def _import_value(self, column, value):
+        """Encode an exported value the way the store methods write it"""
+        if value is None:
+            return None
+        if column == "rule_violations":
+            return self._violations_json(value)
+        if column in ("ai_analysis", "recommendations"):
+            return self.codec.encode(value)
+        if column == "resolved":
+            return bool(value)
+        return value
+
+    def _insert_batch(self, sql, batch):
+        with self._connect() as conn:
+            inserted = conn.executemany(sql, batch).rowcount
+        self._data_changed()
+        return inserted
+
+    def get_risk_trend(self, repository, days=30):
+        """Daily risk for ``repository`` over the last ``days`` days
+
+        Days still holding raw analyses are aggregated on the fly; older
+        ones come from the retention rollups.
+        """
+        self._ensure_tables()
+        since = f"-{float(days)} days"
+        try:
+            with self._read() as conn:
+                rows = conn.execute('''
+                    SELECT day, SUM(analyses), SUM(risk_score_sum), SUM(risk_score_count), MAX(max_risk_score),
+                           MAX(last_timestamp)
+                    FROM (
+                        SELECT date(created_at) AS day, COUNT(*) AS analyses, IFNULL(SUM(risk_score), 0.0) AS risk_score_sum,
+                               COUNT(risk_score) AS risk_score_count, MAX(risk_score) AS max_risk_score,
+                               MAX(timestamp) AS last_timestamp
+                        FROM analysis_results
+                        WHERE repository = ? AND created_at >= datetime('now', ?)
+                        GROUP BY day
+                        UNION ALL
+                        SELECT day, analyses, risk_score_sum, risk_score_count, max_risk_score, last_timestamp
+                        FROM analysis_rollups
+                        WHERE source = 'analysis' AND repository = ? AND day >= date('now', ?)
+                    )
+                    GROUP BY day
+                    ORDER BY day
+                ''', (repository, since, repository, since)).fetchall()
+            return [
+                {
+                    "day": row[0],
+                    "analyses": row[1],
+                    "average_risk_score": round(row[2] / row[3], 3) if row[3] else None,
+                    "max_risk_score": row[4],
+                    "last_analysis": row[5]
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            self.logger.error(f"Error getting risk trend for {repository}: {e}")
+            return []
+
+    def get_risk_series(self, repository=None, bucket="hour", since_days=7, source="analysis", points=None):
+        """Risk per minute, hour or day over the last ``since_days`` days, oldest first
+
+        Covers one repository, or all of them when ``repository`` is None.
+        ``source`` is "analysis" (analysis_results) or "commit"
+        (commit_analysis). Raw rows are read through the (repository,
+        created_at) / (created_at) indexes and grouped in SQL. Rolled-up days
+        have no finer resolution, so each adds one point at its midnight
+        whatever the bucket. Each point's ``time`` is the bucket start in
+        epoch seconds (UTC).
+
+        With ``points``, longer series are downsampled to that many buckets
+        with LTTB on the average risk, so the shape survives. A kept point's
+        ``average_risk_score`` is its own, while its analysis counts and max
+        cover the buckets dropped in its place, so totals survive too. Returns
+        ``{"buckets": total buckets, "items": points}``, or None on a
+        database error. An unknown bucket or source, or a range of more than
+        ``SERIES_MAX_BUCKETS`` buckets, raises ``ValueError``.
+        """
+        if bucket not in self.SERIES_BUCKETS:
+            raise ValueError(f"Unknown bucket: {bucket!r}; use one of {', '.join(self.SERIES_BUCKETS)}")
+        if source not in ROLLUP_SOURCES:
+            raise ValueError(f"Unknown source: {source!r}; use one of {', '.join(ROLLUP_SOURCES)}")
+        width = self.SERIES_BUCKETS[bucket]
+        if since_days * 86400 / width > self.SERIES_MAX_BUCKETS:
+            raise ValueError(f"Range too long for {bucket} buckets; use a coarser bucket")
+        since = f"-{float(since_days)} days"
+        repository_filter = "AND repository = ?" if repository is not None else ""
+        params = [width, width, since] + ([repository] if repository is not None else [])
+        params += [source, since] + ([repository] if repository is not None else [])
+
+        self._ensure_tables()
+        try:
+            with self._read() as conn:
+                rows = conn.execute(f'''
+                    SELECT bucket, SUM(analyses), SUM(high_risk), SUM(risk_score_sum), SUM(risk_score_count),
+                           MAX(max_risk_score)
+                    FROM (
+                        SELECT CAST(strftime('%s', created_at) AS INTEGER) / ? * ? AS bucket, COUNT(*) AS analyses,
+                               IFNULL(SUM(risk_score > 0.7), 0) AS high_risk,
+                               IFNULL(SUM(risk_score), 0.0) AS risk_score_sum, COUNT(risk_score) AS risk_score_count,
+                               MAX(risk_score) AS max_risk_score
+                        FROM {ROLLUP_SOURCES[source]}
+                        WHERE created_at >= datetime('now', ?) {repository_filter}
+                        GROUP BY bucket
+                        UNION ALL
+                        SELECT CAST(strftime('%s', day) AS INTEGER), analyses, high_risk_analyses, risk_score_sum,
+                               risk_score_count, max_risk_score
+                        FROM analysis_rollups
+                        WHERE source = ? AND day >= date('now', ?) {repository_filter}
+                    )
+                    GROUP BY bucket
+                    ORDER BY bucket
+                ''', params).fetchall()
+        except Exception as e:
+            self.logger.error(f"Error getting risk series: {e}")
+            return None
+
+        buckets = len(rows)
+        if points is not None:
+            kept = lttb([row[0] for row in rows], [row[3] / row[4] if row[4] else None for row in rows], points)
+            rows = [
+                (rows[i][0],
+                 sum(row[1] for row in rows[start:end]),
+                 sum(row[2] for row in rows[start:end]),
+                 rows[i][3], rows[i][4],
+                 max((row[5] for row in rows[start:end] if row[5] is not None), default=None))
+                for i, (start, end) in zip(kept, lttb_spans(len(rows), points))
+            ]
+        return {
+            "buckets": buckets,
+            "items": [
+                {
+                    "time": row[0],
+                    "analyses": row[1],
+                    "high_risk_analyses": row[2],
+                    "average_risk_score": round(row[3] / row[4], 3) if row[4] else None,
+                    "max_risk_score": row[5]
+                }
+                for row in rows
+            ]
+        }
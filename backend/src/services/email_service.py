@@ -2,7 +2,9 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
+from ..utils.config import Config
 from ..utils.logger import get_logger
+from ..utils.deadline import io_timeout
 
 logger = get_logger(__name__)
 
@@ -13,8 +15,9 @@ class EmailService:
         self.sender_email = os.getenv("SENDER_EMAIL", "")
         self.sender_password = os.getenv("SENDER_PASSWORD", "")
         self.use_tls = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+        self.timeout = Config.SMTP_TIMEOUT_SECONDS
 
-    def send_alert(self, subject, message, recipients):
+    def send_alert(self, subject, message, recipients, deadline=None):
         """Send an alert email"""
         if not self.sender_email or not self.sender_password:
             logger.warning("Email credentials not configured, skipping email alert")
@@ -43,7 +46,8 @@ Security Monitoring System
             msg.attach(MIMEText(body, 'plain'))
 
             # Send email
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port,
+                                  timeout=io_timeout(deadline, self.timeout))
             if self.use_tls:
                 server.starttls()
             server.login(self.sender_email, self.sender_password)
@@ -58,7 +62,7 @@ Security Monitoring System
             logger.error(f"Error sending email alert: {e}")
             return False
 
-    def send_report(self, subject, report_data, recipients):
+    def send_report(self, subject, report_data, recipients, deadline=None):
         """Send a detailed security report"""
         try:
             message = f"""
@@ -72,7 +76,7 @@ Summary:
 
 Please review the dashboard for detailed information.
 """
-            return self.send_alert(subject, message, recipients)
+            return self.send_alert(subject, message, recipients, deadline)
 
         except Exception as e:
             logger.error(f"Error sending report email: {e}")
@@ -81,7 +85,7 @@ Please review the dashboard for detailed information.
     def test_connection(self):
         """Test email server connection"""
         try:
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
             if self.use_tls:
                 server.starttls()
             if self.sender_email and self.sender_password:
@@ -0,0 +1,148 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+
+class EventBus:
+    """In-process fan-out of fraud events to live subscribers (SSE, WebSocket)
+
+    ``publish`` may be called from any thread. Events get increasing ids
+    and go into one shared log of the last ``history`` events; subscribers
+    don't have queues of their own but read the log from their position,
+    and a publish wakes each subscribing event loop once, however many
+    clients it serves. DBService feeds its bus from the database's event
+    log (see ``EventFeed``), whose ids the events keep; ids of a bus
+    published to directly start from the clock, so an id from before a
+    restart is recognised as stale rather than confused with a new event.
+
+    A subscriber more than ``client_buffer`` events behind (a slow client,
+    or a ``Last-Event-ID`` that has left the log) skips to the newest
+    events and gets a single ``resync`` event in place of the dropped
+    ones, telling it to reload its state over the REST API.
+    """
+
+    def __init__(self, history=None, client_buffer=None, heartbeat_seconds=None):
+        self.history = history or int(os.getenv("EVENT_HISTORY", "1000"))
+        self.client_buffer = min(client_buffer or int(os.getenv("EVENT_CLIENT_BUFFER", "256")), self.history)
+        self.heartbeat_seconds = heartbeat_seconds or float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+        self._events = deque(maxlen=self.history)
+        self._first_id = self._last_id = int(time.time() * 1000)
+        self._lock = threading.Lock()
+        # Subscribing event loop -> (subscriber count, future resolved on the next publish)
+        self._loops = {}
+        self.stats = {"published": 0, "delivered": 0, "resyncs": 0, "dropped": 0}
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def reset(self, last_id):
+        """Continue from ``last_id`` (the source's newest id), dropping held events"""
+        with self._lock:
+            self._events.clear()
+            self._first_id = self._last_id = last_id
+
+    def publish(self, event_type, data, event_id=None, event_time=None):
+        """Append an event to the log and wake the subscribers; returns its id
+
+        ``event_id`` keeps the id given by the source, which must be higher
+        than any before it.
+        """
+        with self._lock:
+            self._last_id = event_id if event_id is not None else self._last_id + 1
+            self._events.append({"id": self._last_id, "type": event_type,
+                                 "time": event_time if event_time is not None else time.time(), "data": data})
+            self.stats["published"] += 1
+            loops = list(self._loops)
+            event_id = self._last_id
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                # The loop has closed under its last subscriber
+                pass
+        return event_id
+
+    def _wake(self, loop):
+        entry = self._loops.get(loop)
+        if entry is not None and entry[1] is not None and not entry[1].done():
+            entry[1].set_result(None)
+
+    def _after(self, cursor):
+        """(events after ``cursor``, how many before them were skipped), at most ``client_buffer`` events"""
+        with self._lock:
+            behind = self._last_id - cursor
+            if behind <= 0:
+                return [], 0
+            deliver = min(behind, len(self._events), self.client_buffer)
+            return list(itertools.islice(self._events, len(self._events) - deliver, None)), behind - deliver
+
+    async def _next_publish(self, loop):
+        """Wait for a publish; False if ``heartbeat_seconds`` passed without one"""
+        with self._lock:
+            count, signal = self._loops[loop]
+            if signal is None or signal.done():
+                signal = loop.create_future()
+                self._loops[loop] = (count, signal)
+        try:
+            await asyncio.wait_for(asyncio.shield(signal), self.heartbeat_seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def subscribe(self, last_event_id=None, types=None):
+        """Yield events as they are published; ``None`` every ``heartbeat_seconds`` of quiet
+
+        Starts after ``last_event_id`` (replaying what is still in the log),
+        or with the next event. ``types`` limits the event types delivered;
+        ``resync`` events are always sent.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            count, signal = self._loops.get(loop, (0, None))
+            self._loops[loop] = (count + 1, signal)
+            cursor = self._last_id
+            # An id from another process, or from before a restart
+            stale = last_event_id is not None and not self._first_id <= last_event_id <= cursor
+            if last_event_id is not None and not stale:
+                cursor = last_event_id
+        try:
+            if stale:
+                yield self._resync(cursor, None)
+            while True:
+                events, skipped = self._after(cursor)
+                if not events:
+                    if not await self._next_publish(loop):
+                        yield None
+                    # A wake-up can be for events already read along with an earlier one
+                    continue
+                if skipped:
+                    yield self._resync(events[0]["id"] - 1, skipped)
+                for event in events:
+                    cursor = event["id"]
+                    if types is None or event["type"] in types:
+                        with self._lock:
+                            self.stats["delivered"] += 1
+                        yield event
+        finally:
+            with self._lock:
+                count, signal = self._loops[loop]
+                if count > 1:
+                    self._loops[loop] = (count - 1, signal)
+                else:
+                    del self._loops[loop]
+
+    def _resync(self, event_id, dropped):
+        """Stands in for ``dropped`` missed events (None: unknown how many)"""
+        with self._lock:
+            self.stats["resyncs"] += 1
+            self.stats["dropped"] += dropped or 0
+        return {"id": event_id, "type": "resync", "time": time.time(), "data": {"dropped": dropped}}
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, subscribers=sum(count for count, _ in self._loops.values()),
+                        last_id=self._last_id, buffered=len(self._events))
@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class EventFeed:
+    """Feeds an EventBus from the database's ``event_log``
+
+    Triggers append to ``event_log`` whichever process commits a write,
+    so the API processes of a pre-forking server and separate webhook
+    worker processes all reach every subscriber. A background thread
+    checks ``PRAGMA data_version`` on a connection of its own every
+    ``poll_interval`` seconds; the value changes when any other
+    connection commits, and only then are the entries after the last id
+    read and published under their log ids. ``wake`` checks at once,
+    which this process's own writes use to skip the wait.
+    """
+
+    def __init__(self, db_service, bus, poll_interval=None, batch_size=500):
+        self.db_service = db_service
+        self.bus = bus
+        self.poll_interval = poll_interval or float(os.getenv("EVENT_POLL_SECONDS", "0.25"))
+        self.batch_size = batch_size
+        self.last_id = None
+        self._conn = None
+        self._data_version = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self.stats = {"polls": 0, "published": 0, "errors": 0}
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start tailing from the newest entry (no-op if already running)"""
+        with self._lock:
+            if self.running:
+                return
+            self.db_service._ensure_tables()
+            self._conn = self.db_service.pool.dedicated_reader()
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            self.last_id = self._conn.execute("SELECT IFNULL(MAX(id), 0) FROM event_log").fetchone()[0]
+            self.bus.reset(self.last_id)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event-feed", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self):
+        """Check for new entries now rather than at the next poll"""
+        self._wakeup.set()
+
+    def poll(self):
+        """Publish the entries committed since the last poll; returns how many"""
+        published = 0
+        while True:
+            rows = self._conn.execute('''
+                SELECT id, type, data, created_at FROM event_log
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', (self.last_id, self.batch_size)).fetchall()
+            for event_id, event_type, data, created_at in rows:
+                self.bus.publish(event_type, json.loads(data), event_id=event_id, event_time=created_at)
+                self.last_id = event_id
+            published += len(rows)
+            if len(rows) < self.batch_size:
+                break
+        self.stats["polls"] += 1
+        self.stats["published"] += published
+        return published
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            try:
+                data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version != self._data_version:
+                    self._data_version = data_version
+                    self.poll()
+            except Exception as e:
+                # Read the log again on the next poll
+                self._data_version = None
+                self.stats["errors"] += 1
+                logger.error(f"Event feed poll failed: {e}")
+
+    def get_stats(self):
+        return dict(self.stats, running=self.running, last_id=self.last_id, poll_interval=self.poll_interval)
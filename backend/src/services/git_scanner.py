@@ -0,0 +1,251 @@
+import os
+import subprocess
+import time
+from ..utils.config import Config
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_READ_CHUNK_SIZE = 256 * 1024
+
+# Every field is NUL-terminated and parsed by position. Git refuses NUL in
+# commit messages and never prints it in a text patch, so no commit content
+# can forge a field boundary.
+_HEADER_FIELDS = ("%H", "%an", "%ae", "%at", "%B")
+_LOG_FORMAT = "%x00" + "%x00".join(_HEADER_FIELDS) + "%x00"
+
+
+class LocalGitScanner:
+    """Offline commit source reading a local (bare or mirror) clone
+
+    Streams ``git log --numstat --patch`` and parses it incrementally into
+    the commit dicts produced by ``GitLabService.get_commit_details``, so
+    full-history audits need no GitLab API calls. ``timestamp`` is the author
+    time in epoch seconds, which is what the analyzers expect.
+    """
+
+    def __init__(self, repo_path, diff_max_bytes=None, git_binary="git"):
+        self.repo_path = os.path.abspath(repo_path)
+        self.git_binary = git_binary
+        self.diff_max_bytes = diff_max_bytes or Config.GIT_SCAN_DIFF_MAX_BYTES
+
+    def is_repository(self):
+        """Check that ``repo_path`` is a git repository (bare or not)"""
+        try:
+            result = subprocess.run(
+                [self.git_binary, "-C", self.repo_path, "rev-parse", "--git-dir"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            return result.returncode == 0
+        except OSError as e:
+            logger.error(f"Could not run git: {e}")
+            return False
+
+    def iter_commits(self, rev="--all", since=None, max_count=None):
+        """Yield commit dicts newest first without loading the log into memory"""
+        args = [
+            self.git_binary, "-C", self.repo_path, "log", rev,
+            f"--format={_LOG_FORMAT}", "--numstat", "--patch", "-z", "--no-color", "--no-ext-diff"
+        ]
+        if since:
+            args.append(f"--since={since}")
+        if max_count:
+            args.append(f"--max-count={int(max_count)}")
+
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            for record in _iter_records(process.stdout, self.diff_max_bytes):
+                commit = _parse_record(*record)
+                if commit:
+                    yield commit
+        finally:
+            # The consumer may stop early; don't leave git blocked on a full pipe
+            if process.poll() is None:
+                process.terminate()
+            process.stdout.close()
+            stderr = process.stderr.read().decode("utf-8", errors="replace")
+            process.stderr.close()
+            if process.wait() > 0:
+                logger.error(f"git log failed for {self.repo_path}: {stderr.strip()}")
+
+    def iter_batches(self, batch_size=500, **kwargs):
+        """Yield lists of at most ``batch_size`` commits"""
+        batch = []
+        for commit in self.iter_commits(**kwargs):
+            batch.append(commit)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def scan(self, fraud_engine, batch_size=500, repository=None, **kwargs):
+        """Feed the repository history to ``fraud_engine`` in batches
+
+        Each batch is analyzed (and stored) as one repository analysis.
+        Returns aggregate statistics for the whole scan.
+        """
+        name = repository or os.path.basename(self.repo_path.rstrip(os.sep))
+        started = time.time()
+        summary = {
+            "repository": name,
+            "commits_scanned": 0,
+            "batches": 0,
+            "high_risk_batches": 0,
+            "max_risk_score": 0.0,
+            "rule_violations": 0,
+            "truncated_diffs": 0
+        }
+
+        for batch in self.iter_batches(batch_size=batch_size, **kwargs):
+            repo_data = {
+                "name": name,
+                "id": self.repo_path,
+                "url": self.repo_path,
+                "timestamp": time.time(),
+                "commits": batch
+            }
+            result = fraud_engine.analyze_repository(repo_data, batch)
+
+            summary["commits_scanned"] += len(batch)
+            summary["batches"] += 1
+            summary["rule_violations"] += len(result["rule_violations"])
+            summary["truncated_diffs"] += len(result.get("truncated_diffs", []))
+            summary["max_risk_score"] = max(summary["max_risk_score"], result["risk_score"])
+            if result["risk_score"] > 0.7:
+                summary["high_risk_batches"] += 1
+
+        summary["duration_seconds"] = round(time.time() - started, 3)
+        logger.info(f"Local scan of {name} finished: {summary['commits_scanned']} commits "
+                    f"in {summary['batches']} batches")
+        return summary
+
+
+def _iter_tokens(stream, max_bytes):
+    """Yield the NUL-terminated tokens of a stream as ``(token, cut)``
+
+    At most ``max_bytes`` of each token are kept; ``cut`` tells whether the
+    rest was skipped while reading.
+    """
+    token = bytearray()
+    cut = False
+    while True:
+        chunk = stream.read(_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        start = 0
+        while True:
+            idx = chunk.find(b"\x00", start)
+            end = len(chunk) if idx == -1 else idx
+            room = max_bytes - len(token)
+            if end - start > room:
+                token.extend(chunk[start:start + max(room, 0)])
+                cut = True
+            else:
+                token.extend(chunk[start:end])
+            if idx == -1:
+                break
+            yield bytes(token), cut
+            token = bytearray()
+            cut = False
+            start = idx + 1
+    if token or cut:
+        yield bytes(token), cut
+
+
+def _iter_records(stream, max_bytes):
+    """Split a ``git log -z`` stream into per-commit records by position
+
+    Each record is the five header fields, followed by an empty token and
+    then either another empty token (no changes, e.g. merges) or the
+    numstat entries, an empty token and the patch. Yields
+    ``(header, numstat, patch, truncated)``; records larger than
+    ``max_bytes`` are cut and yielded with ``truncated=True``.
+    """
+    state = "sha"
+    header, numstat, patch = [], [], b""
+    size = 0
+    truncated = False
+
+    for token, cut in _iter_tokens(stream, max_bytes):
+        if state == "sha":
+            if not token:
+                # Leading separator of the record
+                continue
+            header, numstat, patch = [], [], b""
+            size = 0
+            truncated = False
+            state = "header"
+
+        room = max_bytes - size
+        if cut or len(token) > room:
+            truncated = True
+            token = token[:max(room, 0)]
+        size += len(token)
+
+        if state == "header":
+            header.append(token)
+            if len(header) == len(_HEADER_FIELDS):
+                state = "separator"
+        elif state == "separator":
+            state = "changes"
+        elif state == "changes":
+            if not token:
+                yield header, numstat, patch, truncated
+                state = "sha"
+            else:
+                numstat.append(token.lstrip(b"\n"))
+                state = "numstat"
+        elif state == "numstat":
+            if token:
+                numstat.append(token)
+            else:
+                state = "patch"
+        elif state == "patch":
+            patch = token
+            yield header, numstat, patch, truncated
+            state = "sha"
+
+    if state != "sha":
+        yield header, numstat, patch, truncated
+
+
+def _parse_record(header, numstat, patch, truncated):
+    """Turn one ``git log`` record into a commit dict"""
+    if len(header) < len(_HEADER_FIELDS):
+        return None
+
+    sha, author, _email, author_time, message = (f.decode("utf-8", errors="replace") for f in header)
+
+    files_changed = []
+    lines_added = 0
+    lines_deleted = 0
+
+    i = 0
+    while i < len(numstat):
+        parts = numstat[i].split(b"\t", 2)
+        i += 1
+        if len(parts) != 3:
+            continue
+        added, deleted, path = parts
+        if not path:
+            # Renames: "added\tdeleted\t\0old\0new"
+            if i + 1 >= len(numstat):
+                break
+            path = numstat[i + 1]
+            i += 2
+        files_changed.append(path.decode("utf-8", errors="replace"))
+        lines_added += int(added) if added.isdigit() else 0
+        lines_deleted += int(deleted) if deleted.isdigit() else 0
+
+    return {
+        "id": sha,
+        "message": message.rstrip("\n"),
+        "author": author,
+        "timestamp": int(author_time) if author_time.isdigit() else None,
+        "files_changed": files_changed,
+        "lines_added": lines_added,
+        "lines_deleted": lines_deleted,
+        "diff": patch.decode("utf-8", errors="replace"),
+        "diff_truncated": truncated
+    }
@@ -1,9 +1,105 @@
 import requests
+import json
 import os
+import threading
+from ..utils.config import Config
 from ..utils.logger import get_logger
+from ..utils.deadline import io_timeout
 
 logger = get_logger(__name__)
 
+# Each chunk read blocks until it is full, so this also bounds how long a
+# slowly trickling server can hold a read past the deadline
+_DIFF_CHUNK_SIZE = 8 * 1024
+
+
+class LazyCommit(dict):
+    """Commit dict whose diff-derived fields are fetched on first access
+
+    Metadata and line stats are set eagerly. Reading any of ``LAZY_FIELDS``
+    that is not already present calls ``loader`` once and caches its result
+    on the instance. Serialising the dict (``json.dumps``, ``dict(commit)``)
+    does not trigger the fetch.
+    """
+
+    LAZY_FIELDS = ("files_changed", "diff", "diff_truncated")
+
+    def __init__(self, data, loader):
+        super().__init__(data)
+        self._loader = loader
+        self._lock = threading.Lock()
+
+    @property
+    def diff_loaded(self):
+        return self._loader is None
+
+    def _load(self, key):
+        if key not in self.LAZY_FIELDS or self._loader is None or dict.__contains__(self, key):
+            return
+        with self._lock:
+            if self._loader is None:
+                return
+            loaded = self._loader()
+            for field, value in loaded.items():
+                self.setdefault(field, value)
+            self._loader = None
+
+    def __getitem__(self, key):
+        self._load(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._load(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        if key in self.LAZY_FIELDS and self._loader is not None:
+            return True
+        return super().__contains__(key)
+
+
+def _read_limited(response, max_bytes, deadline=None):
+    """Read a streamed response body up to ``max_bytes``
+
+    Returns ``(body, truncated)``; the connection is abandoned as soon as the
+    limit is exceeded so oversized bodies are never fully downloaded. The
+    socket timeout only bounds each read, so a server trickling bytes could
+    outlast the deadline: it is checked between chunks and, once expired,
+    the stream is closed and what was read so far is returned as truncated.
+    """
+    buffer = bytearray()
+    for chunk in response.iter_content(chunk_size=_DIFF_CHUNK_SIZE):
+        if deadline is not None and deadline.expired():
+            response.close()
+            return bytes(buffer), True
+        if len(buffer) + len(chunk) > max_bytes:
+            buffer.extend(chunk[:max(max_bytes - len(buffer), 0)])
+            return bytes(buffer), True
+        buffer.extend(chunk)
+    return bytes(buffer), False
+
+
+def _iter_json_array(body):
+    """Yield the complete objects of a (possibly truncated) JSON array"""
+    text = body.decode("utf-8", errors="ignore")
+    decoder = json.JSONDecoder()
+    pos = text.find("[") + 1
+    if pos == 0:
+        return
+    length = len(text)
+    while pos < length:
+        while pos < length and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= length or text[pos] == "]":
+            return
+        try:
+            entry, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            # Cut off mid-object by the size limit
+            return
+        yield entry
+
+
 class GitLabService:
     def __init__(self):
         self.base_url = os.getenv("GITLAB_URL", "https://gitlab.com/api/v4")
@@ -12,8 +108,11 @@ class GitLabService:
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
         }
+        self.diff_max_bytes = Config.GITLAB_DIFF_MAX_BYTES
+        self.compare_max_bytes = Config.GITLAB_COMPARE_MAX_BYTES
+        self.timeout = Config.HTTP_TIMEOUT_SECONDS
 
-    def get_project_commits(self, project_id, since=None, until=None, ref_name="main"):
+    def get_project_commits(self, project_id, since=None, until=None, ref_name="main", deadline=None):
         """Fetch commits for a GitLab project"""
         try:
             url = f"{self.base_url}/projects/{project_id}/repository/commits"
@@ -26,7 +125,8 @@ class GitLabService:
             if until:
                 params["until"] = until
 
-            response = requests.get(url, headers=self.headers, params=params)
+            response = requests.get(url, headers=self.headers, params=params,
+                                    timeout=io_timeout(deadline, self.timeout))
             response.raise_for_status()
 
             commits = response.json()
@@ -49,55 +149,146 @@ class GitLabService:
             logger.error(f"Error fetching commits for project {project_id}: {e}")
             return []
 
-    def get_commit_details(self, project_id, commit_id):
-        """Get detailed information about a specific commit"""
+    def get_commit_details(self, project_id, commit_id, files_changed=None, deadline=None):
+        """Get metadata and line stats for a commit; the diff is loaded lazily
+
+        Only one request is made up front. ``files_changed``, ``diff`` and
+        ``diff_truncated`` are fetched on first access (see ``LazyCommit``).
+        Callers that already know the changed paths (e.g. from a push payload)
+        can pass ``files_changed`` so that only content rules trigger a fetch.
+        """
         try:
             url = f"{self.base_url}/projects/{project_id}/repository/commits/{commit_id}"
-            response = requests.get(url, headers=self.headers)
+            response = requests.get(url, headers=self.headers, params={"stats": "true"},
+                                    timeout=io_timeout(deadline, self.timeout))
             response.raise_for_status()
 
             commit = response.json()
+            stats = commit.get("stats") or {}
 
-            # Get diff for the commit
-            diff_url = f"{self.base_url}/projects/{project_id}/repository/commits/{commit_id}/diff"
-            diff_response = requests.get(diff_url, headers=self.headers)
-            diff_response.raise_for_status()
-            diffs = diff_response.json()
-
-            # Extract file changes
-            files_changed = []
-            lines_added = 0
-            lines_deleted = 0
-
-            for diff in diffs:
-                files_changed.append(diff["new_path"])
-                # Simple line counting (not perfect but good enough)
-                diff_content = diff["diff"]
-                added = diff_content.count("\n+") if diff_content else 0
-                deleted = diff_content.count("\n-") if diff_content else 0
-                lines_added += added
-                lines_deleted += deleted
-
-            return {
+            data = {
                 "id": commit["id"],
                 "message": commit["message"],
                 "author": commit["author_name"],
                 "timestamp": commit["created_at"],
-                "files_changed": files_changed,
-                "lines_added": lines_added,
-                "lines_deleted": lines_deleted,
-                "diff": "\n".join([d["diff"] for d in diffs])
+                "lines_added": stats.get("additions", 0),
+                "lines_deleted": stats.get("deletions", 0)
             }
+            if files_changed is not None:
+                data["files_changed"] = list(files_changed)
+
+            return LazyCommit(data, lambda: self.get_commit_diff(project_id, commit_id, deadline))
 
         except Exception as e:
             logger.error(f"Error fetching commit details {commit_id}: {e}")
             return None
 
-    def get_project_info(self, project_id):
+    def get_commit_diff(self, project_id, commit_id, deadline=None):
+        """Stream the diff of a commit, stopping at ``diff_max_bytes``
+
+        Returns the changed paths, the joined diff text and whether the diff
+        was cut short by the size limit, the deadline or an error part way
+        through.
+        """
+        url = f"{self.base_url}/projects/{project_id}/repository/commits/{commit_id}/diff"
+        files_changed = []
+        chunks = []
+        truncated = False
+        budget = self.diff_max_bytes
+        page = "1"
+
+        try:
+            while page:
+                params = {"per_page": 100, "page": page}
+                with requests.get(url, headers=self.headers, params=params, stream=True,
+                                  timeout=io_timeout(deadline, self.timeout)) as response:
+                    response.raise_for_status()
+                    body, truncated = _read_limited(response, budget, deadline)
+                    page = response.headers.get("X-Next-Page")
+
+                for entry in _iter_json_array(body):
+                    files_changed.append(entry["new_path"])
+                    chunks.append(entry.get("diff") or "")
+
+                budget -= len(body)
+                if page and budget <= 0:
+                    truncated = True
+                if truncated:
+                    break
+
+        except Exception as e:
+            logger.error(f"Error fetching diff for commit {commit_id}: {e}")
+            truncated = True
+
+        if truncated:
+            logger.warning(f"Diff for commit {commit_id} truncated at {self.diff_max_bytes} bytes")
+
+        return {
+            "files_changed": files_changed,
+            "diff": "\n".join(chunks),
+            "diff_truncated": truncated
+        }
+
+    def get_range_commits(self, project_id, from_sha, to_sha, commit_files=None, deadline=None):
+        """Fetch every commit between two SHAs with a single compare request
+
+        The compare endpoint returns one combined diff for the range, so each
+        changed file is attributed to the last commit that touched it
+        according to ``commit_files`` ({commit_id: [paths]}, e.g. from a push
+        payload). When every commit is listed (or the range is one commit),
+        files no commit claims go to the head. Otherwise the unlisted
+        commits are fetched with ``get_commit_details`` instead, so each
+        keeps its own line stats, and unclaimed files are not guessed at.
+        Returns commit dicts shaped like ``get_commit_details`` or None.
+        """
+        try:
+            url = f"{self.base_url}/projects/{project_id}/repository/compare"
+            params = {"from": from_sha, "to": to_sha}
+            with requests.get(url, headers=self.headers, params=params, stream=True,
+                              timeout=io_timeout(deadline, self.timeout)) as response:
+                response.raise_for_status()
+                body, truncated = _read_limited(response, self.compare_max_bytes, deadline)
+
+            commits, diffs = _parse_compare(body, truncated)
+            logger.info(f"Fetched {len(commits)} commits and {len(diffs)} diffs "
+                        f"for {project_id} {from_sha[:8]}..{to_sha[:8]}")
+            if truncated:
+                logger.warning(f"Compare {from_sha[:8]}..{to_sha[:8]} truncated at {self.compare_max_bytes} bytes")
+
+            commit_files = commit_files or {}
+            # One commit owns the whole diff, listed or not
+            unlisted = {c["id"] for c in commits if c["id"] not in commit_files} if len(commits) > 1 else set()
+            result = _attribute_range(commits, diffs, to_sha, commit_files, truncated, not unlisted)
+            for i, commit in enumerate(result):
+                if commit["id"] in unlisted and not (deadline is not None and deadline.expired()):
+                    result[i] = self.get_commit_details(project_id, commit["id"], deadline=deadline) or commit
+            return result
+
+        except Exception as e:
+            logger.error(f"Error comparing {from_sha}..{to_sha} for project {project_id}: {e}")
+            return None
+
+    def get_merge_request_refs(self, project_id, merge_request_iid, deadline=None):
+        """Get the base and head SHAs of a merge request"""
+        try:
+            url = f"{self.base_url}/projects/{project_id}/merge_requests/{merge_request_iid}"
+            response = requests.get(url, headers=self.headers, timeout=io_timeout(deadline, self.timeout))
+            response.raise_for_status()
+
+            diff_refs = response.json().get("diff_refs") or {}
+            if not diff_refs.get("base_sha") or not diff_refs.get("head_sha"):
+                return None
+            return diff_refs["base_sha"], diff_refs["head_sha"]
+
+        except Exception as e:
+            logger.error(f"Error fetching merge request {merge_request_iid} for project {project_id}: {e}")
+            return None
+
+    def get_project_info(self, project_id, deadline=None):
         """Get basic project information"""
         try:
             url = f"{self.base_url}/projects/{project_id}"
-            response = requests.get(url, headers=self.headers)
+            response = requests.get(url, headers=self.headers, timeout=io_timeout(deadline, self.timeout))
             response.raise_for_status()
 
             project = response.json()
@@ -115,11 +306,11 @@ class GitLabService:
             logger.error(f"Error fetching project info {project_id}: {e}")
             return None
 
-    def get_project_contributors(self, project_id):
+    def get_project_contributors(self, project_id, deadline=None):
         """Get project contributors statistics"""
         try:
             url = f"{self.base_url}/projects/{project_id}/repository/contributors"
-            response = requests.get(url, headers=self.headers)
+            response = requests.get(url, headers=self.headers, timeout=io_timeout(deadline, self.timeout))
             response.raise_for_status()
 
             contributors = response.json()
@@ -143,10 +334,88 @@ class GitLabService:
         try:
             url = f"{self.base_url}/projects"
             params = {"per_page": 1}
-            response = requests.get(url, headers=self.headers, params=params)
+            response = requests.get(url, headers=self.headers, params=params, timeout=self.timeout)
             response.raise_for_status()
             logger.info("GitLab API connection test successful")
             return True
         except Exception as e:
             logger.error(f"GitLab API connection test failed: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+def _parse_compare(body, truncated):
+    """Split a compare response into its commit and diff lists
+
+    GitLab emits ``commits`` before ``diffs``, so a body cut at the size
+    limit still yields every commit plus the diffs that arrived in full.
+    """
+    if not truncated:
+        data = json.loads(body)
+        return data.get("commits") or [], data.get("diffs") or []
+
+    text = body.decode("utf-8", errors="ignore")
+    decoder = json.JSONDecoder()
+    commits = []
+    start = text.find('"commits":')
+    if start != -1:
+        try:
+            commits, _ = decoder.raw_decode(text, text.index("[", start))
+        except ValueError:
+            commits = []
+    start = text.find('"diffs":')
+    diffs = list(_iter_json_array(text[start:].encode())) if start != -1 else []
+    return commits, diffs
+
+
+def _count_diff_lines(diff):
+    added = deleted = 0
+    for line in diff.splitlines():
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            deleted += 1
+    return added, deleted
+
+
+def _attribute_range(commits, diffs, head_sha, commit_files, truncated, unclaimed_to_head=True):
+    """Build per-commit dicts from a compare response"""
+    if not commits:
+        return []
+
+    head_id = next((c["id"] for c in commits if c["id"] == head_sha), commits[-1]["id"])
+    owner = {}
+    for commit in commits:
+        for path in commit_files.get(commit["id"], []):
+            owner[path] = commit["id"]
+
+    per_commit = {c["id"]: {"files": [], "diffs": []} for c in commits}
+    for entry in diffs:
+        path = entry.get("new_path") or entry.get("old_path")
+        target_id = owner.get(path, head_id if unclaimed_to_head else None)
+        if target_id is None:
+            continue
+        target = per_commit[target_id]
+        target["files"].append(path)
+        target["diffs"].append(entry.get("diff") or "")
+
+    result = []
+    for commit in commits:
+        attributed = per_commit[commit["id"]]
+        diff = "\n".join(attributed["diffs"])
+        lines_added, lines_deleted = _count_diff_lines(diff)
+        files_changed = list(commit_files.get(commit["id"]) or attributed["files"])
+        for path in attributed["files"]:
+            if path not in files_changed:
+                files_changed.append(path)
+        result.append({
+            "id": commit["id"],
+            "message": commit["message"],
+            "author": commit["author_name"],
+            "timestamp": commit["created_at"],
+            "files_changed": files_changed,
+            "lines_added": lines_added,
+            "lines_deleted": lines_deleted,
+            "diff": diff,
+            "diff_truncated": truncated
+        })
+    return result
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RetentionManager:
+    """Keeps the fraud database from growing without bound
+
+    Each run folds analyses older than their retention period into daily
+    per-repository rollups and deletes them, deletes finished webhook
+    deliveries and live feed entries past theirs, then hands the freed
+    pages back to the filesystem with an incremental vacuum. Work is done
+    in batches of ``batch_size`` rows, each its own short write
+    transaction, with ``pause`` seconds between them so webhook and API
+    writes are never locked out for long.
+
+    Retention periods are in days; 0 keeps rows forever. ``start`` runs the
+    retention every ``interval`` seconds in a background thread (0 disables
+    it, e.g. when a cron job runs scripts/run_retention.py instead).
+    """
+
+    def __init__(self, db_service, analysis_days=None, commit_days=None, webhook_log_days=None,
+                 batch_size=None, pause=None, interval=None, vacuum_pages=None, max_attempts=None,
+                 event_log_days=None):
+        self.db_service = db_service
+        self.analysis_days = self._setting(analysis_days, "RETENTION_ANALYSIS_DAYS", "365")
+        self.commit_days = self._setting(commit_days, "RETENTION_COMMIT_ANALYSIS_DAYS", "365")
+        self.webhook_log_days = self._setting(webhook_log_days, "RETENTION_WEBHOOK_LOG_DAYS", "30")
+        self.event_log_days = self._setting(event_log_days, "RETENTION_EVENT_LOG_DAYS", "1")
+        self.batch_size = batch_size or int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+        self.pause = self._setting(pause, "RETENTION_BATCH_PAUSE_SECONDS", "0.05")
+        self.interval = self._setting(interval, "RETENTION_INTERVAL_SECONDS", "3600")
+        self.vacuum_pages = vacuum_pages or int(os.getenv("RETENTION_VACUUM_PAGES", "2000"))
+        self.max_attempts = max_attempts or int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_run = None
+
+    @staticmethod
+    def _setting(value, env_name, default):
+        return float(value) if value is not None else float(os.getenv(env_name, default))
+
+    def run_once(self):
+        """Apply every retention policy until nothing more has expired"""
+        started = time.monotonic()
+        result = {"analysis": 0, "commit": 0, "webhook_logs": 0, "event_log": 0, "vacuumed_pages": 0}
+        for source, days in (("analysis", self.analysis_days), ("commit", self.commit_days)):
+            if days > 0:
+                result[source] = self._drain(
+                    lambda: self.db_service.roll_up_expired(source, days, self.batch_size)
+                )
+        if self.webhook_log_days > 0:
+            result["webhook_logs"] = self._drain(
+                lambda: self.db_service.delete_expired_webhook_logs(self.webhook_log_days, self.batch_size,
+                                                                    self.max_attempts)
+            )
+        if self.event_log_days > 0:
+            result["event_log"] = self._drain(
+                lambda: self.db_service.delete_expired_events(self.event_log_days, self.batch_size)
+            )
+        if any(result.values()):
+            result["vacuumed_pages"] = self._drain(
+                lambda: self.db_service.incremental_vacuum(self.vacuum_pages)
+            )
+        result["duration"] = round(time.monotonic() - started, 3)
+        self.last_run = dict(result, finished_at=time.time())
+        logger.info(f"Retention run finished: {result}")
+        return result
+
+    def _drain(self, batch):
+        """Repeat ``batch`` until it reports no rows, pausing between batches"""
+        total = 0
+        while not self._stop.is_set():
+            count = batch()
+            total += count
+            if not count:
+                break
+            time.sleep(self.pause)
+        return total
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Run retention periodically in the background (no-op if disabled)"""
+        if self.running or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="db-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=30):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Retention run failed: {e}")
+
+    def get_stats(self):
+        return {
+            "analysis_days": self.analysis_days,
+            "commit_days": self.commit_days,
+            "webhook_log_days": self.webhook_log_days,
+            "event_log_days": self.event_log_days,
+            "interval": self.interval,
+            "running": self.running,
+            "last_run": self.last_run
+        }
@@ -1,7 +1,9 @@
 import requests
 import json
 import os
+from ..utils.config import Config
 from ..utils.logger import get_logger
+from ..utils.deadline import io_timeout
 
 logger = get_logger(__name__)
 
@@ -9,8 +11,9 @@ class SlackService:
     def __init__(self):
         self.webhook_url = os.getenv("SLACK_WEBHOOK_URL", "")
         self.channel = os.getenv("SLACK_CHANNEL", "#security-alerts")
+        self.timeout = Config.HTTP_TIMEOUT_SECONDS
 
-    def send_alert(self, message, severity="medium"):
+    def send_alert(self, message, severity="medium", deadline=None):
         """Send an alert to Slack"""
         if not self.webhook_url:
             logger.warning("Slack webhook URL not configured, skipping Slack alert")
@@ -57,7 +60,8 @@ class SlackService:
             response = requests.post(
                 self.webhook_url,
                 data=json.dumps(payload),
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                timeout=io_timeout(deadline, self.timeout)
             )
             response.raise_for_status()
 
@@ -68,7 +72,7 @@ class SlackService:
             logger.error(f"Error sending Slack alert: {e}")
             return False
 
-    def send_report(self, title, stats):
+    def send_report(self, title, stats, deadline=None):
         """Send a daily/weekly security report to Slack"""
         try:
             message = f"""
@@ -96,7 +100,8 @@ class SlackService:
             response = requests.post(
                 self.webhook_url,
                 data=json.dumps(payload),
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                timeout=io_timeout(deadline, self.timeout)
             )
             response.raise_for_status()
 
@@ -120,7 +125,8 @@ class SlackService:
             response = requests.post(
                 self.webhook_url,
                 data=json.dumps(payload),
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout
             )
             response.raise_for_status()
 
@@ -0,0 +1,144 @@
+import fnmatch
+import math
+import os
+import threading
+import time
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PRIORITY_LOW = 0
+PRIORITY_HIGH = 1
+
+
+class AdmissionDecision:
+    """Outcome of an admission check"""
+
+    def __init__(self, admitted, status_code=None, retry_after=None, reason=None):
+        self.admitted = admitted
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class WebhookAdmissionController:
+    """Queue-depth-aware admission control for webhook ingest
+
+    Above ``high_water`` pending deliveries only high-priority events
+    (pushes to the default or a protected branch, merges into one) are
+    queued and the rest are refused with 429; at ``max_depth`` everything
+    is refused with 503. Both carry a ``Retry-After`` estimated from the
+    backlog and the average processing time, so senders back off instead
+    of the queue growing without bound.
+
+    The depth is read from the database at most every ``refresh_interval``
+    seconds, through ``async_db`` so the aggregate never runs on the event
+    loop, and advanced locally for each admitted delivery in between.
+    """
+
+    def __init__(self, async_db, high_water=None, max_depth=None, protected_branches=None,
+                 refresh_interval=None, workers=None, max_attempts=None):
+        self.async_db = async_db
+        self.high_water = high_water or int(os.getenv("WEBHOOK_QUEUE_HIGH_WATER", "500"))
+        self.max_depth = max_depth or int(os.getenv("WEBHOOK_QUEUE_MAX_DEPTH", "2000"))
+        if protected_branches is None:
+            protected_branches = os.getenv("PROTECTED_BRANCHES", "main,master,release/*")
+        if isinstance(protected_branches, str):
+            protected_branches = [b.strip() for b in protected_branches.split(",") if b.strip()]
+        self.protected_branches = list(protected_branches)
+        self.refresh_interval = refresh_interval if refresh_interval is not None else \
+            float(os.getenv("WEBHOOK_QUEUE_DEPTH_REFRESH_SECONDS", "1.0"))
+        self.workers = workers or int(os.getenv("WEBHOOK_WORKERS", "2"))
+        self.max_attempts = max_attempts or int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+        self.min_retry_after = int(os.getenv("WEBHOOK_RETRY_AFTER_MIN_SECONDS", "5"))
+        self.max_retry_after = int(os.getenv("WEBHOOK_RETRY_AFTER_MAX_SECONDS", "300"))
+
+        self._depth = 0
+        self._depth_read_at = None
+        self._avg_processing_time = None
+        self._lock = threading.Lock()
+        self.shed = {"low_priority": 0, "overloaded": 0}
+        self.admitted = {"high": 0, "low": 0}
+
+    def is_protected(self, branch, default_branch=None):
+        if not branch:
+            return False
+        if default_branch and branch == default_branch:
+            return True
+        return any(fnmatch.fnmatchcase(branch, pattern) for pattern in self.protected_branches)
+
+    def priority_for(self, event_type, payload):
+        """High for pushes to, or merges into, the default or a protected branch"""
+        repo = payload.get("project") or payload.get("repository") or {}
+        default_branch = repo.get("default_branch")
+
+        if event_type == "push":
+            ref = payload.get("ref") or ""
+            if ref.startswith("refs/tags/"):
+                return PRIORITY_HIGH
+            branch = ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref
+        elif "object_attributes" in payload:
+            branch = payload["object_attributes"].get("target_branch")
+        else:
+            branch = ((payload.get("pull_request") or {}).get("base") or {}).get("ref")
+
+        return PRIORITY_HIGH if self.is_protected(branch, default_branch) else PRIORITY_LOW
+
+    async def depth(self):
+        """Approximate number of deliveries waiting or in flight"""
+        now = time.monotonic()
+        with self._lock:
+            fresh = self._depth_read_at is not None and now - self._depth_read_at < self.refresh_interval
+            if fresh:
+                return self._depth
+            # Claim the refresh so concurrent requests keep using the cached value
+            self._depth_read_at = now
+
+        stats = await self.async_db.get_webhook_queue_stats(self.max_attempts)
+        with self._lock:
+            self._depth = stats.get("pending", 0) + stats.get("in_flight", 0)
+            self._avg_processing_time = stats.get("average_processing_time")
+            return self._depth
+
+    def retry_after(self, depth):
+        """Seconds until the backlog above the high-water mark should have drained"""
+        per_delivery = self._avg_processing_time or 1.0
+        backlog = max(depth - self.high_water, 1)
+        estimate = math.ceil(backlog * per_delivery / max(self.workers, 1))
+        return int(min(max(estimate, self.min_retry_after), self.max_retry_after))
+
+    async def check(self, priority=None):
+        """Decide whether a delivery may be queued
+
+        ``priority=None`` applies only the hard limit, which lets the
+        handler refuse deliveries before parsing them.
+        """
+        depth = await self.depth()
+        if depth >= self.max_depth:
+            with self._lock:
+                self.shed["overloaded"] += 1
+            logger.warning(f"Webhook queue at {depth} (limit {self.max_depth}); shedding delivery")
+            return AdmissionDecision(False, 503, self.retry_after(depth), "Webhook queue is full")
+        if priority is not None and priority < PRIORITY_HIGH and depth >= self.high_water:
+            with self._lock:
+                self.shed["low_priority"] += 1
+            logger.info(f"Webhook queue at {depth} (high water {self.high_water}); "
+                        "shedding low-priority delivery")
+            return AdmissionDecision(False, 429, self.retry_after(depth),
+                                     "Webhook queue is busy; only protected-branch events are accepted")
+        return AdmissionDecision(True)
+
+    def record_admitted(self, priority):
+        with self._lock:
+            self._depth += 1
+            self.admitted["high" if priority >= PRIORITY_HIGH else "low"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "depth": self._depth,
+                "high_water": self.high_water,
+                "max_depth": self.max_depth,
+                "shed": dict(self.shed),
+                "admitted": dict(self.admitted)
+            }
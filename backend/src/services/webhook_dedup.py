@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from ..utils.logger import get_logger
+from ..utils.ttl_cache import TTLCache
+
+logger = get_logger(__name__)
+
+# Per-delivery IDs that stay the same when the sender retries
+DELIVERY_ID_HEADERS = ("X-Gitlab-Event-UUID", "X-GitHub-Delivery")
+
+
+class WebhookDeduplicator:
+    """Recognises retried webhook deliveries
+
+    Keys live in an in-memory TTL cache for the fast path. The
+    ``webhook_logs.delivery_key`` unique index is the durable backstop that
+    catches retries landing on another worker process or after a restart;
+    keys older than the window are released there periodically by the
+    queue workers (``release_expired``).
+    """
+
+    def __init__(self, db_service, ttl_seconds=None, max_entries=None):
+        self.db_service = db_service
+        self.ttl_seconds = ttl_seconds or float(os.getenv("WEBHOOK_DEDUP_TTL_SECONDS", "86400"))
+        max_entries = max_entries or int(os.getenv("WEBHOOK_DEDUP_MAX_ENTRIES", "50000"))
+        self.cache = TTLCache(max_entries=max_entries, ttl_seconds=self.ttl_seconds)
+        self.duplicates = 0
+        self._last_release = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def delivery_id_key(headers):
+        """Key from the sender's delivery ID header, if present"""
+        for header in DELIVERY_ID_HEADERS:
+            value = headers.get(header)
+            if value:
+                return f"delivery:{value}"
+        return None
+
+    @staticmethod
+    def payload_key(event_type, payload):
+        """Fallback key for deliveries without a delivery ID
+
+        Pushes are keyed by (repository, after SHA) and merges by
+        (repository, MR, action or state, head SHA), so opening, updating
+        and merging one MR are separate deliveries.
+        """
+        repo = payload.get("repository") or payload.get("project") or {}
+        repo_id = repo.get("full_name") or repo.get("id") or repo.get("name") or payload.get("project_id")
+        if not repo_id:
+            return None
+        if event_type == "push":
+            after = payload.get("after")
+            return f"push:{repo_id}:{after}" if after else None
+        merge = payload.get("object_attributes") or payload.get("pull_request") or {}
+        number = merge.get("iid") or merge.get("number")
+        if not number:
+            return None
+        state = merge.get("action") or payload.get("action") or merge.get("state")
+        if merge.get("merged"):
+            state = "merged"
+        head = ((merge.get("last_commit") or {}).get("id") or (merge.get("diff_refs") or {}).get("head_sha")
+                or (merge.get("head") or {}).get("sha"))
+        return f"merge:{repo_id}:{number}:{state}:{head}"
+
+    def seen(self, key):
+        """Fast in-memory check for a key accepted within the TTL"""
+        if key and key in self.cache:
+            self.record_duplicate(key)
+            return True
+        return False
+
+    def remember(self, key):
+        if key:
+            self.cache.set(key)
+
+    def record_duplicate(self, key):
+        with self._lock:
+            self.duplicates += 1
+        logger.info(f"Duplicate webhook delivery ignored: {key}")
+
+    def release_expired(self):
+        """Drop durable keys past the TTL (at most every tenth of the window)"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_release < self.ttl_seconds / 10:
+                return 0
+            self._last_release = now
+        return self.db_service.release_delivery_keys(self.ttl_seconds)
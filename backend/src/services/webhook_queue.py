@@ -0,0 +1,106 @@
+import os
+import socket
+import threading
+import time
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class WebhookWorkerPool:
+    """Background workers draining the durable webhook queue
+
+    Deliveries are claimed from ``webhook_logs`` with a lease, handed to the
+    handler registered for their event type and then marked processed with
+    their processing time. A worker that crashes mid-delivery simply lets
+    the lease expire, so every delivery is processed at least once. Failed
+    deliveries are retried after an exponentially growing delay, so an
+    outage does not use up all ``max_attempts`` within seconds.
+
+    ``maintenance`` is called by the workers before each claim, for
+    self-throttling housekeeping (such as releasing expired delivery keys)
+    that should stay off the request path.
+    """
+
+    def __init__(self, db_service, handlers, workers=None, poll_interval=None,
+                 lease_seconds=None, max_attempts=None, retry_base_seconds=None, retry_max_seconds=None,
+                 maintenance=None):
+        self.db_service = db_service
+        self.handlers = handlers
+        self.maintenance = maintenance
+        self.workers = workers if workers is not None else int(os.getenv("WEBHOOK_WORKERS", "2"))
+        self.poll_interval = poll_interval or float(os.getenv("WEBHOOK_POLL_INTERVAL", "1.0"))
+        self.lease_seconds = lease_seconds or float(os.getenv("WEBHOOK_LEASE_SECONDS", "300"))
+        self.max_attempts = max_attempts or int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+        self.retry_base_seconds = retry_base_seconds or float(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", "10"))
+        self.retry_max_seconds = retry_max_seconds or float(os.getenv("WEBHOOK_RETRY_MAX_SECONDS", "600"))
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        """Start the worker threads (no-op if already running)"""
+        if self.running or self.workers <= 0:
+            return
+        self._stop.clear()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads = [
+            threading.Thread(target=self._run, args=(f"{prefix}:{i}",),
+                             name=f"webhook-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Started {self.workers} webhook workers")
+
+    def stop(self, timeout=30):
+        """Stop claiming new deliveries and wait for in-flight ones to finish"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        logger.info("Webhook workers stopped")
+
+    def wake(self):
+        """Signal idle workers that a new delivery was queued"""
+        self._wakeup.set()
+
+    def process_next(self, worker_id="inline"):
+        """Claim and process a single delivery; returns False if none was pending"""
+        job = self.db_service.claim_webhook(worker_id, self.lease_seconds, self.max_attempts)
+        if job is None:
+            return False
+
+        handler = self.handlers.get(job["event_type"])
+        started = time.monotonic()
+        try:
+            if handler is None:
+                logger.info(f"No handler for queued event type {job['event_type']}")
+            else:
+                handler(job["payload"])
+            self.db_service.complete_webhook(job["id"], time.monotonic() - started)
+        except Exception as e:
+            logger.error(f"Webhook {job['id']} failed on attempt {job['attempts']}: {e}")
+            self.db_service.fail_webhook(job["id"], e, self.retry_delay(job["attempts"]))
+        return True
+
+    def retry_delay(self, attempts):
+        """Seconds to wait before retrying a delivery that failed ``attempts`` times"""
+        return min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+
+    def _run(self, worker_id):
+        while not self._stop.is_set():
+            try:
+                if self.maintenance is not None:
+                    self.maintenance()
+                if self.process_next(worker_id):
+                    continue
+            except Exception as e:
+                logger.error(f"Webhook worker {worker_id} error: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
@@ -0,0 +1,186 @@
+import atexit
+import os
+import sqlite3
+import threading
+from ..utils.deadline import io_timeout
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Longest a caller waits for someone else's flush to finish
+DEFAULT_FLUSH_TIMEOUT = 30.0
+
+
+class WriteTicket:
+    """Completion handle for one buffered row"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.error = None
+
+    def _set(self, error=None):
+        self.error = error
+        self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the row is flushed; True if it was written"""
+        return self._done.wait(timeout) and self.error is None
+
+
+class WriteBehindBuffer:
+    """Group-commit buffer for single-row inserts
+
+    Rows are collected and written with one ``executemany`` per statement
+    inside a single transaction, so a burst of inserts costs one commit
+    instead of one each. A background thread flushes once ``max_rows`` are
+    pending or every ``flush_interval`` seconds.
+
+    ``add(..., wait=True)`` flushes straight away and returns once the row
+    is committed, taking any rows other threads have buffered along with
+    it; ``wait=False`` returns immediately and leaves the row to the next
+    flush. ``close`` drains whatever is left. ``on_flush`` is called after
+    each commit.
+
+    If a batch is rejected because of its data, such as a CHECK or NOT
+    NULL violation, it is written again one row at a time, each under a
+    savepoint, so only the offending rows' tickets fail.
+    """
+
+    def __init__(self, pool, max_rows=None, flush_interval=None, on_flush=None):
+        self.pool = pool
+        self.on_flush = on_flush
+        self.max_rows = max_rows or int(os.getenv("WRITE_BUFFER_MAX_ROWS", "200"))
+        self.flush_interval = flush_interval or float(os.getenv("WRITE_BUFFER_FLUSH_SECONDS", "0.5"))
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._exit_hook = False
+        self.stats = {"rows_buffered": 0, "rows_written": 0, "rows_failed": 0, "flushes": 0}
+
+    def add(self, sql, params, wait=True, deadline=None):
+        """Buffer one row for ``sql``; returns its ``WriteTicket``"""
+        ticket = WriteTicket()
+        with self._lock:
+            self._pending.append((sql, params, ticket))
+            self.stats["rows_buffered"] += 1
+            pending = len(self._pending)
+
+        if wait:
+            self.flush(deadline)
+            ticket.wait(io_timeout(deadline, DEFAULT_FLUSH_TIMEOUT))
+        else:
+            self._ensure_thread()
+            if pending >= self.max_rows:
+                self._wakeup.set()
+        return ticket
+
+    def flush(self, deadline=None):
+        """Write every pending row in one transaction; returns the number written"""
+        if not self._flush_lock.acquire(timeout=io_timeout(deadline, DEFAULT_FLUSH_TIMEOUT)):
+            return 0
+        try:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            # One executemany per statement, in first-seen order
+            statements = {}
+            for sql, params, _ in batch:
+                statements.setdefault(sql, []).append(params)
+            try:
+                with self.pool.writer(deadline) as conn:
+                    for sql, rows in statements.items():
+                        conn.executemany(sql, rows)
+                errors = [None] * len(batch)
+            except sqlite3.OperationalError as e:
+                # Locked, missing table and the like: no row would get in
+                errors = [e] * len(batch)
+            except Exception as e:
+                logger.warning(f"Batch of {len(batch)} buffered rows rejected ({e}); writing rows one at a time")
+                try:
+                    errors = self._write_rows(batch, deadline)
+                except Exception as retry_error:
+                    errors = [retry_error] * len(batch)
+
+            failed = [error for error in errors if error is not None]
+            if failed:
+                logger.error(f"Error flushing {len(failed)} of {len(batch)} buffered rows: {failed[0]}")
+            written = len(batch) - len(failed)
+            with self._lock:
+                self.stats["rows_written"] += written
+                self.stats["rows_failed"] += len(failed)
+                if written:
+                    self.stats["flushes"] += 1
+            if written and self.on_flush is not None:
+                self.on_flush()
+            for (_, _, ticket), error in zip(batch, errors):
+                ticket._set(error)
+            return written
+        finally:
+            self._flush_lock.release()
+
+    def _write_rows(self, batch, deadline=None):
+        """Write ``batch`` row by row in one transaction; returns each row's error"""
+        errors = []
+        with self.pool.writer(deadline) as conn:
+            conn.execute("BEGIN")
+            for sql, params, _ in batch:
+                conn.execute("SAVEPOINT buffered_row")
+                try:
+                    conn.execute(sql, params)
+                    errors.append(None)
+                except sqlite3.OperationalError:
+                    raise
+                except Exception as e:
+                    conn.execute("ROLLBACK TO buffered_row")
+                    errors.append(e)
+                conn.execute("RELEASE buffered_row")
+        return errors
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending))
+
+    def close(self, timeout=10):
+        """Stop the background flusher and write out anything still buffered"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="db-write-buffer", daemon=True)
+            self._thread.start()
+            register_hook, self._exit_hook = not self._exit_hook, True
+        if register_hook:
+            # Don't lose fire-and-forget rows if the process exits without close()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Write buffer flush error: {e}")
@@ -16,6 +16,11 @@ class Config:
     # GitLab settings
     GITLAB_URL = os.getenv("GITLAB_URL", "https://gitlab.com/api/v4")
     GITLAB_TOKEN = os.getenv("GITLAB_TOKEN", "")
+    GITLAB_DIFF_MAX_BYTES = int(os.getenv("GITLAB_DIFF_MAX_BYTES", str(1024 * 1024)))  # per commit
+    GITLAB_COMPARE_MAX_BYTES = int(os.getenv("GITLAB_COMPARE_MAX_BYTES", str(8 * 1024 * 1024)))  # per range
+
+    # Local git scanner settings
+    GIT_SCAN_DIFF_MAX_BYTES = int(os.getenv("GIT_SCAN_DIFF_MAX_BYTES", str(1024 * 1024)))  # per commit
 
     # Slack settings
     SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "")
@@ -30,6 +35,7 @@ class Config:
 
     # Security settings
     WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    MAX_WEBHOOK_BODY_BYTES = int(os.getenv("MAX_WEBHOOK_BODY_BYTES", str(5 * 1024 * 1024)))
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
 
     # ML settings
@@ -44,6 +50,12 @@ class Config:
     HIGH_RISK_THRESHOLD = float(os.getenv("HIGH_RISK_THRESHOLD", "0.7"))
     CRITICAL_RISK_THRESHOLD = float(os.getenv("CRITICAL_RISK_THRESHOLD", "0.9"))
 
+    # Timeouts and analysis budgets (seconds)
+    HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+    SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "10"))
+    ANALYZE_SLA_SECONDS = float(os.getenv("ANALYZE_SLA_SECONDS", "20"))
+    WEBHOOK_ANALYSIS_BUDGET_SECONDS = float(os.getenv("WEBHOOK_ANALYSIS_BUDGET_SECONDS", "120"))
+
     # API rate limiting
     RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
     RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "60"))  # seconds
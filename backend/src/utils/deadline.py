@@ -0,0 +1,43 @@
+import time
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an operation is attempted after its deadline has passed"""
+
+
+class Deadline:
+    """Request-level time budget shared by every stage of an analysis
+
+    Stages check ``expired()`` before starting and I/O calls use
+    ``timeout()`` so that no single call can outlive the overall budget.
+    """
+
+    def __init__(self, seconds):
+        self.budget = float(seconds)
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.budget
+
+    def remaining(self):
+        """Seconds left in the budget (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self):
+        """Seconds spent since the deadline was created"""
+        return time.monotonic() - self.started_at
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap=None):
+        """Timeout for the next I/O call, bounded by ``cap`` when given"""
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline of {self.budget:.1f}s exceeded")
+        return min(remaining, cap) if cap else remaining
+
+
+def io_timeout(deadline, default):
+    """Timeout for an I/O call: the remaining budget if a deadline is set, else ``default``"""
+    if deadline is None:
+        return default
+    return deadline.timeout(cap=default)
@@ -0,0 +1,56 @@
+def lttb(xs, ys, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of ``threshold``
+
+    The first and last points are always kept. The points in between are
+    split into ``threshold - 2`` equal buckets, and from each the point
+    forming the largest triangle with the point kept before it and the
+    average of the next bucket is chosen, which preserves the peaks and
+    troughs a chart shows. Series no longer than ``threshold`` are kept
+    whole. ``ys`` may hold None, which counts as 0.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    ys = [0.0 if y is None else y for y in ys]
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i, (start, end) in enumerate(_buckets(n, threshold)[1:-1]):
+        # Average of the following bucket (just the last point for the final one)
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if next_start >= n - 1:
+            next_start, next_end = n - 1, n
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def lttb_spans(n, threshold):
+    """``(start, end)`` index range each point kept by ``lttb`` stands for
+
+    One range per kept point, in order, covering all ``n`` points, so
+    callers can fold the counts of dropped points into the point kept from
+    their bucket.
+    """
+    if threshold >= n or threshold < 3:
+        return [(i, i + 1) for i in range(n)]
+    return _buckets(n, threshold)
+
+
+def _buckets(n, threshold):
+    """The LTTB buckets: the first point, ``threshold - 2`` even splits, the last point"""
+    every = (n - 2) / (threshold - 2)
+    return ([(0, 1)]
+            + [(int(i * every) + 1, int((i + 1) * every) + 1) for i in range(threshold - 2)]
+            + [(n - 1, n)])
@@ -0,0 +1,34 @@
+import base64
+import json
+
+# Largest page any listing endpoint returns
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised for a pagination cursor that was not issued by this API"""
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque cursor pointing just past the row ``(created_at, row_id)``"""
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return the ``(created_at, id)`` keyset position stored in ``cursor``"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(row_id, int) or not isinstance(created_at, (str, int, float, type(None))):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return created_at, row_id
+
+
+def parse_fields(fields):
+    """Split a comma-separated ``fields`` query parameter; None means the defaults"""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
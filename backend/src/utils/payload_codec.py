@@ -0,0 +1,233 @@
+"""Compact storage encoding for analysis documents and webhook payloads
+
+Values are JSON-shaped (dicts, lists, strings, numbers, booleans, None) and
+are written as a tagged binary format instead of JSON text:
+
+- strings listed in ``INTERNED`` (field names, severities, violation types
+  and the fixed descriptions and recommendations) take one or two bytes;
+- lowercase hex strings such as commit SHAs are stored as raw bytes;
+- small integers take one byte, other integers a zigzag varint and floats
+  eight bytes.
+
+Encodings of at least ``compress_min_bytes`` are compressed with zstd when
+the ``zstandard`` package is installed, zlib otherwise. The first byte of
+every encoded value names its format. ``decode`` also accepts the JSON text
+written before this codec existed.
+"""
+import json
+import os
+import re
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is used otherwise
+    zstandard = None
+
+FORMAT_BINARY = 1
+FORMAT_ZLIB = 2
+FORMAT_ZSTD = 3
+
+# Strings stored by position. Append only: stored rows refer to these indexes.
+INTERNED = (
+    # AI analysis
+    "anomaly_score", "is_anomaly", "details", "total_commits", "anomalous_commits", "error",
+    # Rule violations
+    "type", "commit_id", "severity", "description", "files",
+    "low", "medium", "high", "critical",
+    "suspicious_commit_message", "large_file_changes", "sensitive_file_modification",
+    "potential_code_injection", "suspicious_timing", "rapid_contributor_changes",
+    "branch_protection_bypass",
+    "Commit message contains suspicious patterns",
+    "Unusually large number of files changed",
+    "Detected potential code injection patterns",
+    "Commit made at unusual time",
+    "Unusual number of contributor changes",
+    "Potential branch protection bypass detected",
+    # Recommendations
+    "Immediate code review required",
+    "Consider rolling back recent commits",
+    "Enhanced monitoring recommended",
+    "Review contributor access permissions",
+    "Investigate unusual commit frequency",
+    "Review large code changes for malicious content",
+    # Queued webhook payloads
+    "repository", "project", "project_id", "before", "after", "ref", "timestamp", "commits",
+    "id", "name", "full_name", "url", "html_url", "web_url", "default_branch",
+    "message", "added", "modified", "removed", "author", "email",
+    "object_attributes", "state", "iid", "title", "target_project_id", "target_branch", "diff_refs",
+    "pull_request", "merged", "number", "base", "head", "sha",
+    "main", "master", "refs/heads/main", "refs/heads/master", "opened", "closed",
+    "base_sha", "head_sha", "start_sha",
+)
+_INTERNED_INDEX = {string: index for index, string in enumerate(INTERNED)}
+
+# Tags; small integers and interned indexes below 64 are packed into the tag
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _INTERNED, _LIST, _DICT, _HEX = range(10)
+_SMALL_INT = 0x40
+_SMALL_INTERNED = 0x80
+_FLOAT_STRUCT = struct.Struct("<d")
+_HEX_STRING = re.compile(r"(?:[0-9a-f]{2}){8,}")
+
+
+def _write_varint(value, out):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _encode(value, out):
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        if 0 <= value < 0x40:
+            out.append(_SMALL_INT | value)
+        else:
+            out.append(_INT)
+            _write_varint(value * 2 if value >= 0 else -value * 2 - 1, out)
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _FLOAT_STRUCT.pack(value)
+    elif isinstance(value, str):
+        index = _INTERNED_INDEX.get(value)
+        if index is not None and index < 0x40:
+            out.append(_SMALL_INTERNED | index)
+        elif index is not None:
+            out.append(_INTERNED)
+            _write_varint(index, out)
+        elif _HEX_STRING.fullmatch(value):
+            raw = bytes.fromhex(value)
+            out.append(_HEX)
+            _write_varint(len(raw), out)
+            out += raw
+        else:
+            raw = value.encode("utf-8")
+            out.append(_STR)
+            _write_varint(len(raw), out)
+            out += raw
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        _write_varint(len(value), out)
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        _write_varint(len(value), out)
+        for key, item in value.items():
+            _encode(key if isinstance(key, str) else _json_key(key), out)
+            _encode(item, out)
+    else:
+        raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _json_key(key):
+    """The string json.dumps would use for a non-string dict key"""
+    if key is None or isinstance(key, bool):
+        return json.dumps(key)
+    if isinstance(key, (int, float)):
+        return json.dumps(key) if isinstance(key, float) else str(key)
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+
+
+def _decode(data, pos):
+    tag = data[pos]
+    pos += 1
+    if tag >= _SMALL_INTERNED:
+        return INTERNED[tag - _SMALL_INTERNED], pos
+    if tag >= _SMALL_INT:
+        return tag - _SMALL_INT, pos
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _INT:
+        value, pos = _read_varint(data, pos)
+        return (value >> 1) ^ -(value & 1), pos
+    if tag == _FLOAT:
+        return _FLOAT_STRUCT.unpack_from(data, pos)[0], pos + 8
+    if tag == _INTERNED:
+        index, pos = _read_varint(data, pos)
+        return INTERNED[index], pos
+    if tag in (_STR, _HEX):
+        length, pos = _read_varint(data, pos)
+        raw = bytes(data[pos:pos + length])
+        return (raw.decode("utf-8") if tag == _STR else raw.hex()), pos + length
+    if tag == _LIST:
+        count, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == _DICT:
+        count, pos = _read_varint(data, pos)
+        result = {}
+        for _ in range(count):
+            key, pos = _decode(data, pos)
+            result[key], pos = _decode(data, pos)
+        return result, pos
+    raise ValueError(f"Unknown payload tag {tag}")
+
+
+class PayloadCodec:
+    """Encodes values for storage and decodes both encoded and legacy JSON values"""
+
+    def __init__(self, compression=None, compress_min_bytes=None):
+        compression = compression or os.getenv("PAYLOAD_COMPRESSION", "zstd" if zstandard else "zlib")
+        if compression == "zstd" and zstandard is None:
+            compression = "zlib"
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes or int(os.getenv("PAYLOAD_COMPRESS_MIN_BYTES", "512"))
+        self._zstd_compressor = zstandard.ZstdCompressor(level=3) if compression == "zstd" else None
+
+    def encode(self, value):
+        """Encode ``value`` to bytes, compressing it when large enough to pay off"""
+        body = bytearray()
+        _encode(value, body)
+        if self.compression != "none" and len(body) >= self.compress_min_bytes:
+            if self._zstd_compressor is not None:
+                compressed, fmt = self._zstd_compressor.compress(bytes(body)), FORMAT_ZSTD
+            else:
+                compressed, fmt = zlib.compress(bytes(body), 6), FORMAT_ZLIB
+            if len(compressed) < len(body):
+                return bytes([fmt]) + compressed
+        return bytes([FORMAT_BINARY]) + bytes(body)
+
+    @staticmethod
+    def decode(stored):
+        """Decode a stored value; JSON text written by older versions is accepted"""
+        if stored is None:
+            return None
+        if isinstance(stored, str):
+            return json.loads(stored) if stored else None
+        data = memoryview(stored)
+        fmt, body = data[0], data[1:]
+        if fmt == FORMAT_ZLIB:
+            body = zlib.decompress(body)
+        elif fmt == FORMAT_ZSTD:
+            if zstandard is None:
+                raise ValueError("Payload is zstd-compressed but the zstandard package is not installed")
+            body = zstandard.ZstdDecompressor().decompress(bytes(body))
+        elif fmt != FORMAT_BINARY:
+            raise ValueError(f"Unknown payload format {fmt}")
+        value, _ = _decode(body, 0)
+        return value
@@ -0,0 +1,38 @@
+import re
+
+# A "quoted phrase" or a run of non-space characters
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class InvalidSearchQuery(ValueError):
+    """Raised for a search query without any terms"""
+
+
+def build_match_query(text):
+    """FTS5 MATCH expression for a free-text search query
+
+    Every term must match. ``"quoted phrases"`` match as a phrase, a
+    trailing ``*`` matches a prefix (``auth*``) and ``OR`` between two terms
+    matches either of them (``disable auth OR login`` needs ``disable``).
+    Anything else is quoted, so user input can never be a malformed FTS5
+    query.
+    """
+    groups = []
+    pending_or = False
+    for phrase, word in _TERM.findall(text or ""):
+        if word == "OR":
+            pending_or = bool(groups)
+            continue
+        prefix = word.endswith("*")
+        term = (phrase or word).replace('"', "").strip("* ")
+        if not term:
+            continue
+        term = f'"{term}"' + ("*" if prefix else "")
+        if pending_or:
+            groups[-1].append(term)
+            pending_or = False
+        else:
+            groups.append([term])
+    if not groups:
+        raise InvalidSearchQuery(f"Search query has no terms: {text!r}")
+    return " AND ".join(group[0] if len(group) == 1 else f"({' OR '.join(group)})" for group in groups)
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe, size-bounded mapping whose entries expire after ``ttl_seconds``
+
+    Once ``max_entries`` is reached the least recently written entry is
+    evicted. Expired entries are dropped lazily on access and on insert.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[key]
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return default
+            return entry[1]
+
+    def set(self, key, value=True):
+        with self._lock:
+            now = time.monotonic()
+            self._data.pop(key, None)
+            self._data[key] = (now + self.ttl_seconds, value)
+            self._expire(now)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def add(self, key, value=True):
+        """Insert ``key`` unless it is already present; returns True if it was added"""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self._data.pop(key, None)
+            self._data[key] = (now + self.ttl_seconds, value)
+            self._expire(now)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
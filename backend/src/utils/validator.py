@@ -32,11 +32,11 @@ class WebhookValidator:
             elif signature.startswith('X-Gitlab-Token:'):
                 # GitLab token format (simpler)
                 token = signature.replace('X-Gitlab-Token:', '').strip()
-                return token == self.secret
+                return hmac.compare_digest(token, self.secret)
 
             else:
                 # Raw token comparison
-                return signature == self.secret
+                return hmac.compare_digest(signature, self.secret)
 
         except Exception as e:
             logger.error(f"Error verifying webhook signature: {e}")
@@ -177,8 +177,3 @@ class RateLimiter:
             return True
 
         return False
-
-# Global instances
-webhook_validator = WebhookValidator()
-input_validator = InputValidator()
-rate_limiter = RateLimiter()
\ No newline at end of file
@@ -0,0 +1,83 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used otherwise
+    orjson = None
+
+
+class PayloadTooLarge(Exception):
+    """Raised when a webhook body exceeds the configured size limit"""
+
+
+async def read_limited_body(request, max_bytes):
+    """Read a request body, refusing anything larger than ``max_bytes``
+
+    The declared Content-Length is checked before reading and the streamed
+    size is enforced chunk by chunk, so oversized bodies are never buffered.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise PayloadTooLarge(f"Body of {declared} bytes exceeds {max_bytes}")
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            raise PayloadTooLarge(f"Body exceeds {max_bytes} bytes")
+    return bytes(body)
+
+
+def loads(body):
+    """Decode a JSON body with orjson when available; raises ValueError on bad input"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+_REPOSITORY_FIELDS = ("id", "name", "full_name", "url", "html_url", "web_url", "default_branch")
+_COMMIT_FIELDS = ("id", "message", "timestamp", "added", "modified", "removed")
+_AUTHOR_FIELDS = ("name", "email")
+_MERGE_REQUEST_FIELDS = ("state", "action", "iid", "title", "target_project_id", "target_branch", "diff_refs")
+_PULL_REQUEST_FIELDS = ("state", "merged", "number", "title")
+_REF_FIELDS = ("sha", "ref")
+
+
+def _pick(data, fields):
+    if not isinstance(data, dict):
+        return {}
+    return {key: data[key] for key in fields if key in data}
+
+
+def extract_event_fields(event_type, payload):
+    """Reduce a webhook payload to the fields the analysis pipeline reads
+
+    Keeps the queued payload small so storing and re-decoding it in the
+    workers stays cheap regardless of what else the sender included.
+    """
+    compact = {
+        "repository": _pick(payload.get("repository"), _REPOSITORY_FIELDS),
+        "project": _pick(payload.get("project"), _REPOSITORY_FIELDS)
+    }
+
+    if event_type == "push":
+        compact.update(_pick(payload, ("project_id", "before", "after", "ref", "timestamp")))
+        compact["commits"] = [
+            dict(_pick(commit, _COMMIT_FIELDS), author=_pick(commit.get("author"), _AUTHOR_FIELDS))
+            for commit in payload.get("commits") or []
+            if isinstance(commit, dict)
+        ]
+    elif "object_attributes" in payload:
+        attributes = payload["object_attributes"]
+        compact["object_attributes"] = dict(_pick(attributes, _MERGE_REQUEST_FIELDS),
+                                            last_commit=_pick(attributes.get("last_commit"), ("id",)))
+    else:
+        pull_request = payload.get("pull_request") or {}
+        compact.update(_pick(payload, ("action",)))
+        compact["pull_request"] = dict(
+            _pick(pull_request, _PULL_REQUEST_FIELDS),
+            base=_pick(pull_request.get("base"), _REF_FIELDS),
+            head=_pick(pull_request.get("head"), _REF_FIELDS)
+        )
+
+    return compact
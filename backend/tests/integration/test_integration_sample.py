@@ -1,17 +1,57 @@
 import pytest
 import sys
 import os
+import io
 import json
 import tempfile
 import sqlite3
+import subprocess
 
 # Add the src directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from src.services.db_service import DBService
+from src.services.db_migrations import MIGRATIONS, SCHEMA_VERSION
 from src.core.fraud_engine import FraudEngine
+from src.api import webhook_handler
+from src.services.git_scanner import LocalGitScanner
+from src.services.webhook_queue import WebhookWorkerPool
+from src.services.webhook_dedup import WebhookDeduplicator
+from src.services.webhook_admission import WebhookAdmissionController
+from src.services.retention import RetentionManager
+from src.services.data_export import DataExporter
+from src.utils.pagination import encode_cursor
+from src.services.async_db import AsyncDBService
+from src.services.event_bus import EventBus
+from src.api.dependencies import AppContainer, get_container
+from fastapi import Response
+from starlette.requests import Request
+import asyncio
+import time
 from src.api.webhook_handler import process_push_event
 
+def remove_database(path):
+    """Delete a test database along with its WAL side files"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+def query_plans(db_service, call):
+    """EXPLAIN QUERY PLAN for every SELECT ``call`` issues through ``db_service``"""
+    statements = []
+    with db_service.pool.reader() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        with db_service.pool.reader() as conn:
+            conn.set_trace_callback(None)
+            return [
+                " | ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql))
+                for sql in statements if sql.lstrip().upper().startswith("SELECT")
+            ]
+
+
 class TestDatabaseIntegration:
     """Integration tests for database operations"""
 
@@ -22,8 +62,9 @@ class TestDatabaseIntegration:
 
     def teardown_method(self):
         """Cleanup test database"""
+        self.db_service.close()
         os.close(self.db_fd)
-        os.unlink(self.db_path)
+        remove_database(self.db_path)
 
     def test_store_and_retrieve_analysis(self):
         """Test storing and retrieving analysis results"""
@@ -71,6 +112,1261 @@ class TestDatabaseIntegration:
         updated_alerts = self.db_service.get_recent_alerts()
         assert len(updated_alerts) == 0  # Should not return resolved alerts
 
+class TestSQLitePoolIntegration:
+    """Integration tests for pooled SQLite connections"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def test_wal_and_tuned_pragmas(self):
+        self.db_service.store_alert("test", "low", "msg")
+        with self.db_service.pool.writer() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] < 0
+
+        health = self.db_service.health_check()
+        assert health["status"] == "healthy"
+        assert health["journal_mode"] == "wal"
+
+    def test_connections_reused(self):
+        """Repeated calls reuse one writer per thread and a bounded reader pool"""
+        for i in range(20):
+            self.db_service.store_alert("test", "low", f"alert {i}")
+            self.db_service.get_recent_alerts()
+
+        stats = self.db_service.pool.get_stats()
+        assert stats["connections_opened"] == 2
+        assert stats["writer_checkouts"] >= 20
+        assert stats["reader_checkouts"] == 20
+
+    def test_one_writer_per_thread(self):
+        import threading
+        self.db_service.store_alert("test", "low", "main thread")
+        worker = threading.Thread(target=self.db_service.store_alert, args=("test", "low", "worker"))
+        worker.start()
+        worker.join()
+
+        assert self.db_service.pool.get_stats()["connections_opened"] == 2
+        assert len(self.db_service.get_recent_alerts()) == 2
+
+    def test_reads_proceed_during_open_write(self):
+        """Readers see the last committed state while a write transaction is open"""
+        self.db_service.store_alert("test", "low", "committed")
+        with self.db_service.pool.writer() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO alerts (type, severity, message) VALUES ('test', 'low', 'pending')")
+            started = time.monotonic()
+            alerts = self.db_service.get_recent_alerts()
+            assert time.monotonic() - started < 1
+            assert [a["message"] for a in alerts] == ["committed"]
+        assert len(self.db_service.get_recent_alerts()) == 2
+
+    def test_readers_are_read_only(self):
+        self.db_service.get_recent_alerts()
+        with pytest.raises(sqlite3.OperationalError):
+            with self.db_service.pool.reader() as conn:
+                conn.execute("DELETE FROM alerts")
+
+class TestSchemaMigrationsIntegration:
+    """Integration tests for versioned schema migrations and query plans"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def test_legacy_database_upgraded(self):
+        """Databases created by the old DBService get the schema.sql columns and constraints"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE commit_analysis (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "commit_id TEXT NOT NULL, risk_score REAL, ai_analysis TEXT, rule_violations TEXT, "
+                     "created_at REAL DEFAULT (datetime('now')))")
+        conn.execute("CREATE TABLE alerts (id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL, "
+                     "severity TEXT, message TEXT, repository TEXT, commit_id TEXT, "
+                     "resolved BOOLEAN DEFAULT FALSE, created_at REAL DEFAULT (datetime('now')))")
+        conn.executemany("INSERT INTO commit_analysis (commit_id, risk_score) VALUES (?, ?)",
+                         [("abc", 0.1), ("abc", 0.9), ("def", 0.2)])
+        conn.commit()
+        conn.close()
+
+        self.db_service.store_commit_analysis({"commit_id": "def", "risk_score": 0.5})
+
+        with self.db_service.pool.reader() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(alerts)")}
+            rows = dict(conn.execute("SELECT commit_id, risk_score FROM commit_analysis"))
+        assert {"resolved_at", "updated_at"} <= columns
+        assert rows == {"abc": 0.9, "def": 0.5}
+
+    def test_schema_sql_database_migrates_cleanly(self):
+        schema_path = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'schema.sql')
+        with open(schema_path) as f:
+            conn = sqlite3.connect(self.db_path)
+            conn.executescript(f.read())
+            conn.close()
+
+        self.db_service.get_fraud_stats()
+        with self.db_service.pool.reader() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+            unique_indexes = [row for row in conn.execute("PRAGMA index_list(commit_analysis)") if row[2]]
+        assert len(unique_indexes) == 1
+
+    def test_hot_queries_use_indexes(self):
+        for i in range(300):
+            self.db_service.store_alert("test", "low", f"alert {i}", wait=False)
+            self.db_service.store_analysis_result({"repository": "r", "risk_score": i / 300}, wait=False)
+        self.db_service.flush()
+
+        recent = query_plans(self.db_service, self.db_service.get_recent_alerts)
+        assert recent == ["SEARCH alerts USING INDEX idx_alerts_active (resolved=?)"]
+
+        stats = query_plans(self.db_service, self.db_service.get_fraud_stats)
+        assert stats == ["SEARCH fraud_stats USING INTEGER PRIMARY KEY (rowid=?)"]
+
+        queue = query_plans(self.db_service, self.db_service.get_webhook_queue_stats)
+        assert queue == ["SCAN webhook_logs USING COVERING INDEX idx_webhook_logs_state"]
+
+class TestAlertsSummaryIntegration:
+    """Integration tests for alert aggregates and lookup by ID"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def test_summary_counts_every_alert(self, monkeypatch):
+        from src.api import alerts_controller
+        for i in range(1200):
+            self.db_service.store_alert("fraud" if i % 3 else "rule", "high" if i % 2 else "low",
+                                        f"alert {i}", wait=False)
+        self.db_service.flush()
+        self.db_service.resolve_alert(1)
+        self.db_service.resolve_alert(2)
+        monkeypatch.setattr(alerts_controller, "container", AppContainer(db_service=self.db_service))
+
+        response = asyncio.run(alerts_controller.get_alerts_summary(make_request(b"", {})))
+        summary = json.loads(response.body)["summary"]
+
+        assert summary["total_alerts"] == 1200
+        assert summary["active_alerts"] == 1198
+        assert summary["severity_breakdown"] == {"high": 600, "low": 600}
+        assert summary["type_breakdown"] == {"fraud": 800, "rule": 400}
+
+    def test_alert_fetched_by_id(self, monkeypatch):
+        from fastapi import HTTPException
+        from src.api import alerts_controller
+        self.db_service.store_alert("fraud", "critical", "suspicious commit", "repo", "abc")
+        with self.db_service.pool.reader() as conn:
+            alert_id = conn.execute("SELECT MAX(id) FROM alerts").fetchone()[0]
+        self.db_service.resolve_alert(alert_id)
+        monkeypatch.setattr(alerts_controller, "container", AppContainer(db_service=self.db_service))
+
+        alert = asyncio.run(alerts_controller.get_alert(alert_id))["alert"]
+        assert alert["commit_id"] == "abc" and alert["resolved"] is True
+        assert self.db_service.get_alert(alert_id + 1) is None
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(alerts_controller.get_alert(alert_id + 1))
+        assert exc.value.status_code == 404
+
+
+class TestFraudStatsIntegration:
+    """Integration tests for the trigger-maintained statistics counters"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def test_counters_track_every_write(self):
+        for i in range(50):
+            self.db_service.store_analysis_result({"repository": "r", "risk_score": i / 50}, wait=False)
+            self.db_service.store_alert("fraud", "high", f"alert {i}", wait=False)
+        self.db_service.store_analysis_result({"repository": "r", "risk_score": None})
+        self.db_service.resolve_alert(1)
+        self.db_service.resolve_alert(1)
+        with self.db_service.pool.writer() as conn:
+            conn.execute("UPDATE analysis_results SET risk_score = 0.95 WHERE id = 2")
+            conn.execute("DELETE FROM analysis_results WHERE id = 50")
+            conn.execute("DELETE FROM alerts WHERE id IN (1, 2)")
+
+        stats = self.db_service.get_fraud_stats()
+        check = self.db_service.check_fraud_stats()
+
+        assert check["consistent"] and check["drift"] == {}
+        assert stats == check["recomputed"]
+        assert stats["total_analyses"] == 50
+        assert stats["active_alerts"] == 48
+
+    def test_existing_rows_counted_by_migration(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE analysis_results (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "repository TEXT NOT NULL, timestamp REAL, risk_score REAL, ai_analysis TEXT, "
+                     "rule_violations TEXT, recommendations TEXT, created_at REAL)")
+        conn.executemany("INSERT INTO analysis_results (repository, risk_score) VALUES ('r', ?)",
+                         [(0.2,), (0.8,), (0.9,)])
+        conn.commit()
+        conn.close()
+
+        assert self.db_service.get_fraud_stats() == {
+            "total_analyses": 3, "high_risk_analyses": 2, "active_alerts": 0, "average_risk_score": 0.633
+        }
+
+    def test_drift_detected_and_repaired(self):
+        self.db_service.store_alert("fraud", "high", "alert")
+        with self.db_service.pool.writer() as conn:
+            conn.execute("UPDATE fraud_stats SET active_alerts = 7, risk_score_sum = 3.5")
+
+        check = self.db_service.check_fraud_stats()
+        assert not check["consistent"] and not check["repaired"]
+        assert check["drift"] == {"active_alerts": 6, "risk_score_sum": 3.5}
+
+        assert self.db_service.check_fraud_stats(repair=True)["repaired"]
+        assert self.db_service.check_fraud_stats()["consistent"]
+        assert self.db_service.get_fraud_stats()["active_alerts"] == 1
+
+
+class TestListingIntegration:
+    """Integration tests for keyset-paginated listings"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def test_pages_cover_every_row_once(self):
+        # One flush: most rows share a created_at second, so only the id breaks ties
+        for i in range(120):
+            self.db_service.store_alert("fraud", "high" if i % 2 else "low", f"alert {i}", wait=False)
+        self.db_service.flush()
+
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = self.db_service.list_alerts(limit=50, cursor=cursor)
+            ids.extend(alert["id"] for alert in page["items"])
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert pages == 3
+        assert ids == sorted(range(1, 121), reverse=True)
+
+        high = self.db_service.list_alerts(limit=200, severity="high", resolved=False)
+        assert len(high["items"]) == 60 and high["next_cursor"] is None
+
+    def test_deep_pages_seek_through_index(self):
+        for i in range(300):
+            self.db_service.store_alert("fraud", "high", f"alert {i}", repository="repo", wait=False)
+        self.db_service.flush()
+        cursor = self.db_service.list_alerts(limit=200)["next_cursor"]
+
+        plans = query_plans(self.db_service, lambda: (
+            self.db_service.list_alerts(limit=50, cursor=cursor),
+            self.db_service.list_alerts(limit=50, cursor=cursor, repository="repo"),
+            self.db_service.list_analysis_results(limit=50, cursor=cursor, repository="repo")
+        ))
+        assert plans == [
+            "SEARCH alerts USING INDEX idx_alerts_created_at (created_at<?)",
+            "SEARCH alerts USING INDEX idx_alerts_repository (repository=? AND created_at<?)",
+            "SEARCH analysis_results USING INDEX idx_analysis_results_repository (repository=? AND created_at<?)"
+        ]
+
+    def test_json_columns_decoded_only_on_request(self, monkeypatch):
+        from fastapi import HTTPException
+        from src.api import fraud_controller
+        for score in (0.1, 0.5, 0.9):
+            self.db_service.store_analysis_result({"repository": "repo", "risk_score": score,
+                                                   "ai_analysis": {"score": score}}, wait=False)
+        self.db_service.flush()
+        monkeypatch.setattr(fraud_controller, "container", AppContainer(db_service=self.db_service))
+
+        default = asyncio.run(fraud_controller.list_analyses(limit=50, cursor=None, repository=None,
+                                                             min_risk=0.4, max_risk=None, fields=None))
+        assert [item["risk_score"] for item in default["items"]] == [0.9, 0.5]
+        assert "ai_analysis" not in default["items"][0]
+
+        page = self.db_service.list_analysis_results(fields=["risk_score", "ai_analysis"])
+        assert set(page["items"][0]) == {"id", "created_at", "risk_score", "ai_analysis"}
+        assert page["items"][0]["ai_analysis"] == {"score": 0.9}
+
+        for bad in ({"fields": "risk_score,payload", "cursor": None}, {"fields": None, "cursor": "not-a-cursor"}):
+            with pytest.raises(HTTPException) as exc:
+                asyncio.run(fraud_controller.list_analyses(limit=50, repository=None, min_risk=None,
+                                                           max_risk=None, **bad))
+            assert exc.value.status_code == 400
+
+
+class TestViolationsIntegration:
+    """Integration tests for the normalized violations table"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def store_samples(self):
+        sensitive = {"type": "sensitive_file_modification", "severity": "high", "commit_id": "a1",
+                     "files": [".env", "id_rsa"]}
+        timing = {"type": "suspicious_timing", "severity": "medium", "commit_id": "b2"}
+        self.db_service.store_analysis_result({"repository": "payments", "rule_violations": [sensitive, timing]},
+                                              wait=False)
+        self.db_service.store_analysis_result({"repository": "docs", "rule_violations": [timing]}, wait=False)
+        self.db_service.store_commit_analysis({"commit_id": "b2", "rule_violations": [timing]}, wait=False)
+        self.db_service.flush()
+
+    def test_violations_written_with_each_analysis(self):
+        self.store_samples()
+
+        page = self.db_service.list_violations(violation_type="sensitive_file_modification", since_days=7)
+        assert {(v["repository"], v["file"]) for v in page["items"]} == {("payments", ".env"), ("payments", "id_rsa")}
+
+        summary = self.db_service.get_violation_summary(since_days=7, violation_type="suspicious_timing")
+        assert summary["by_type"][0]["occurrences"] == 3
+        assert {r["repository"] for r in summary["by_repository"]} == {"payments", "docs", None}
+
+        # Re-analyzing a commit replaces its violations
+        self.db_service.store_commit_analysis({"commit_id": "b2", "rule_violations": []})
+        page = self.db_service.list_violations(commit_id="b2", fields=["source"])
+        assert [v["source"] for v in page["items"]] == ["analysis", "analysis"]
+
+    def test_filters_use_indexes(self):
+        self.store_samples()
+        plans = query_plans(self.db_service, lambda: (
+            self.db_service.list_violations(violation_type="suspicious_timing"),
+            self.db_service.get_violation_summary(violation_type="suspicious_timing", since_days=7)
+        ))
+        assert all("idx_violations_type (type=?" in plan for plan in plans)
+
+    def test_backfill_normalizes_existing_rows(self):
+        self.store_samples()
+        with self.db_service.pool.writer() as conn:
+            conn.execute("DELETE FROM violations WHERE source = 'analysis' AND source_id = 1")
+        # Also fill in a malformed document, which is skipped
+        with self.db_service.pool.writer() as conn:
+            conn.execute("INSERT INTO analysis_results (repository, rule_violations) VALUES ('x', '{oops')")
+
+        assert self.db_service.backfill_violations(batch_size=1) == {"analysis": 3, "commit": 0}
+        assert self.db_service.backfill_violations() == {"analysis": 0, "commit": 0}
+        assert self.db_service.get_violation_summary()["by_type"][0] == {
+            "type": "suspicious_timing", "severity": "medium", "occurrences": 3, "repositories": 2,
+            "last_seen": self.db_service.list_violations(limit=1)["items"][0]["created_at"]
+        }
+
+
+class TestRetentionIntegration:
+    """Integration tests for retention, rollups and incremental vacuum"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        os.unlink(self.db_path)  # let SQLite create it, so auto_vacuum applies
+        self.db_service = DBService(db_path=self.db_path)
+        self.retention = RetentionManager(self.db_service, analysis_days=365, commit_days=365,
+                                          webhook_log_days=30, batch_size=2, pause=0, interval=0)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def insert_analyses(self, rows):
+        """Insert (repository, risk_score, days_ago) analyses"""
+        self.db_service._ensure_tables()
+        with self.db_service.pool.writer() as conn:
+            conn.executemany('''
+                INSERT INTO analysis_results (repository, timestamp, risk_score, rule_violations, created_at)
+                VALUES (?, ?, ?, '[]', datetime('now', ?))
+            ''', [(repo, time.time() - days * 86400, score, f"-{days} days") for repo, score, days in rows])
+
+    def test_expired_analyses_rolled_up(self, monkeypatch):
+        from src.api import fraud_controller
+        self.insert_analyses([("repo", 0.2, 400), ("repo", 0.9, 400), ("repo", None, 400),
+                              ("repo", 0.8, 380), ("other", 0.1, 400), ("repo", 0.1, 1)])
+        stats = self.db_service.get_fraud_stats()
+
+        result = self.retention.run_once()
+
+        assert result["analysis"] == 5
+        assert [item["risk_score"] for item in self.db_service.list_analysis_results()["items"]] == [0.1]
+        # All-time statistics still include the rolled-up analyses
+        assert self.db_service.get_fraud_stats() == stats
+        assert self.db_service.check_fraud_stats()["consistent"]
+
+        monkeypatch.setattr(fraud_controller, "container", AppContainer(db_service=self.db_service))
+        risk = asyncio.run(fraud_controller.get_repository_risk("repo", days=500))
+        assert [(day["analyses"], day["average_risk_score"], day["max_risk_score"]) for day in risk["daily"]] == [
+            (3, 0.55, 0.9), (1, 0.8, 0.8), (1, 0.1, 0.1)
+        ]
+        assert risk["current_risk_score"] == 0.1 and risk["trend"] == "falling"
+        assert [day["analyses"] for day in self.db_service.get_risk_trend("repo", 30)] == [1]
+
+        with self.db_service.pool.writer() as conn:
+            conn.execute("INSERT INTO repositories (name) VALUES ('repo')")
+        with self.db_service.pool.reader() as conn:
+            assert conn.execute("SELECT analysis_count, round(avg_risk_score, 3) FROM repository_stats").fetchone() == (
+                5, 0.5
+            )
+
+    def test_finished_webhook_logs_deleted(self):
+        self.db_service._ensure_tables()
+        with self.db_service.pool.writer() as conn:
+            conn.executemany('''
+                INSERT INTO webhook_logs (event_type, payload, processed, attempts, created_at)
+                VALUES (?, '{}', ?, ?, datetime('now', ?))
+            ''', [("processed", True, 1, "-40 days"), ("dead", False, 5, "-40 days"),
+                  ("pending", False, 0, "-40 days"), ("recent", True, 1, "-1 days")])
+
+        assert self.retention.run_once()["webhook_logs"] == 2
+        with self.db_service.pool.reader() as conn:
+            remaining = [row[0] for row in conn.execute("SELECT event_type FROM webhook_logs ORDER BY id")]
+        assert remaining == ["pending", "recent"]
+
+    def test_old_feed_entries_deleted(self):
+        self.db_service.store_alert("fraud_detected", "high", "old", "repo")
+        self.db_service.store_alert("fraud_detected", "high", "new", "repo")
+        with self.db_service.pool.writer() as conn:
+            conn.execute("UPDATE event_log SET created_at = created_at - 2 * 86400 WHERE id = 1")
+
+        assert self.retention.run_once()["event_log"] == 1
+        with self.db_service.pool.reader() as conn:
+            assert conn.execute("SELECT json_extract(data, '$.message') FROM event_log").fetchall() == [("new",)]
+
+    def test_freed_pages_reclaimed(self):
+        self.db_service._ensure_tables()
+        with self.db_service.pool.writer() as conn:
+            conn.executemany(
+                "INSERT INTO webhook_logs (payload, processed, created_at) VALUES (?, TRUE, datetime('now', '-60 days'))",
+                [("x" * 4000,) for _ in range(200)]
+            )
+        self.retention.batch_size = 500
+
+        result = self.retention.run_once()
+
+        assert result["webhook_logs"] == 200 and result["vacuumed_pages"] > 100
+        with self.db_service.pool.reader() as conn:
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+            assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+    def test_full_vacuum_enables_incremental_mode(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE legacy (id INTEGER PRIMARY KEY)")
+        conn.close()
+
+        self.db_service.full_vacuum()
+
+        with self.db_service.pool.reader() as conn:
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+class TestPayloadStorageIntegration:
+    """Integration tests for the compact payload encoding"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def test_analysis_stored_compactly(self):
+        violations = [{"type": "suspicious_commit_message", "commit_id": "ab" * 20, "severity": "medium",
+                       "description": "Commit message contains suspicious patterns"}]
+        result = {
+            "repository": "repo", "timestamp": time.time(), "risk_score": 0.6,
+            "ai_analysis": {"anomaly_score": 0.6, "is_anomaly": True,
+                            "details": {"total_commits": 3, "anomalous_commits": 1}},
+            "rule_violations": violations,
+            "recommendations": ["Immediate code review required", "Enhanced monitoring recommended"],
+        }
+        self.db_service.store_analysis_result(result)
+
+        with self.db_service.pool.reader() as conn:
+            ai_analysis, recommendations = conn.execute(
+                "SELECT ai_analysis, recommendations FROM analysis_results"
+            ).fetchone()
+        assert isinstance(ai_analysis, bytes)
+        assert len(ai_analysis) + len(recommendations) < len(json.dumps(result["ai_analysis"])) // 2
+        fields = ["ai_analysis", "rule_violations", "recommendations"]
+        item = self.db_service.list_analysis_results(fields=fields)["items"][0]
+        assert item["ai_analysis"] == result["ai_analysis"]
+        assert item["recommendations"] == result["recommendations"]
+        assert item["rule_violations"] == violations
+        # Rule violations stay JSON for the triggers that normalize them
+        assert self.db_service.list_violations()["items"][0]["type"] == "suspicious_commit_message"
+
+    def test_legacy_json_rows_readable(self):
+        self.db_service._ensure_tables()
+        with self.db_service.pool.writer() as conn:
+            conn.execute('''
+                INSERT INTO analysis_results (repository, risk_score, ai_analysis, rule_violations, recommendations)
+                VALUES ('repo', 0.4, '{"anomaly_score": 0.4}', '[]', '["Review contributor access permissions"]')
+            ''')
+            conn.execute("INSERT INTO webhook_logs (event_type, payload) VALUES ('push', '{\"ref\": \"main\"}')")
+
+        fields = ["ai_analysis", "rule_violations", "recommendations"]
+        item = self.db_service.list_analysis_results(fields=fields)["items"][0]
+        assert item["ai_analysis"] == {"anomaly_score": 0.4}
+        assert item["recommendations"] == ["Review contributor access permissions"]
+        assert self.db_service.claim_webhook("worker-1")["payload"] == {"ref": "main"}
+
+    def test_queued_webhook_round_trip(self):
+        payload = {"ref": "refs/heads/main", "after": "cd" * 20,
+                   "commits": [{"id": "cd" * 20, "message": "Fix ✓", "added": [], "modified": ["a.py"]}]}
+        self.db_service.enqueue_webhook("push", "repo", payload)
+
+        assert self.db_service.claim_webhook("worker-1")["payload"] == payload
+
+
+class TestSearchIntegration:
+    """Integration tests for full-text search"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def store_commits(self, commits):
+        """Store (commit_id, repository, author, message) commit analyses"""
+        for commit_id, repository, author, message in commits:
+            self.db_service.store_commit_analysis({"commit_id": commit_id, "repository": repository,
+                                                   "author": author, "message": message}, wait=False)
+        self.db_service.flush()
+
+    def assert_indexes_consistent(self):
+        with self.db_service.pool.writer() as conn:
+            for index in ("commit_search", "alert_search", "violation_search"):
+                conn.execute(f"INSERT INTO {index} ({index}) VALUES ('integrity-check')")
+
+    def test_commit_search_ranked_and_highlighted(self):
+        self.store_commits([
+            ("c1", "payments", "mallory", "Disable auth checks for the admin API"),
+            ("c2", "payments", "alice", "Fix typo in README"),
+            ("c3", "docs", "bob", "Temporarily disabled authentication; disable auth in staging"),
+            ("c4", "payments", "alice", "Refactor auth module"),
+        ] + [(f"x{i}", "docs", "bob", f"Update changelog {i}") for i in range(6)])
+
+        page = self.db_service.search("commits", "disable auth")
+        assert [item["commit_id"] for item in page["items"]] == ["c3", "c1"]
+        assert page["items"][0]["score"] > page["items"][1]["score"] > 0
+        assert page["items"][1]["highlights"]["message"] == "<mark>Disable</mark> <mark>auth</mark> checks for the admin API"
+        assert page["items"][1]["author"] == "mallory" and page["next_cursor"] is None
+
+        payments = self.db_service.search("commits", "auth", repository="payments")["items"]
+        assert {item["commit_id"] for item in payments} == {"c1", "c4"}
+        assert [i["commit_id"] for i in self.db_service.search("commits", "alice", sort="newest")["items"]] == ["c4", "c2"]
+        with self.db_service.pool.writer() as conn:
+            conn.execute("UPDATE commit_analysis SET created_at = datetime('now', '-30 days') WHERE commit_id = 'c3'")
+        recent = self.db_service.search("commits", "disabled OR typo", since_days=7)["items"]
+        assert {item["commit_id"] for item in recent} == {"c1", "c2"}
+
+    def test_reanalysis_and_deletes_keep_index_in_step(self):
+        self.store_commits([("c1", "repo", "dev", "Disable auth"), ("c2", "repo", "dev", "Disable auth too")])
+        self.db_service.store_commit_analysis({"commit_id": "c1", "repository": "repo", "author": "dev",
+                                               "message": "Update changelog"})
+        with self.db_service.pool.writer() as conn:
+            conn.execute("DELETE FROM commit_analysis WHERE commit_id = 'c2'")
+
+        assert self.db_service.search("commits", "auth")["items"] == []
+        assert [i["commit_id"] for i in self.db_service.search("commits", "changelog")["items"]] == ["c1"]
+        self.assert_indexes_consistent()
+
+    def test_pages_cover_every_match_once(self):
+        self.store_commits([(f"c{i}", "repo", "dev", "auth " * (i % 5 + 1) + f"change {i}") for i in range(45)])
+
+        for sort in ("rank", "newest"):
+            ids, cursor = [], None
+            while True:
+                page = self.db_service.search("commits", "auth", limit=10, cursor=cursor, sort=sort)
+                ids += [item["id"] for item in page["items"]]
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert sorted(ids) == list(range(1, 46))
+        with pytest.raises(ValueError):
+            self.db_service.search("commits", "auth", cursor=page["next_cursor"] or "bm90LWEtY3Vyc29y")
+
+    def test_alert_and_violation_search(self):
+        self.db_service.store_alert("fraud_detected", "high", "Credential leak detected in payments", "payments")
+        self.db_service.store_commit_analysis({"commit_id": "c1", "repository": "payments", "rule_violations": [
+            {"type": "sensitive_file_modification", "severity": "high", "commit_id": "c1",
+             "description": "Sensitive files were modified", "files": ["config/secrets.yml"]}
+        ]})
+
+        alerts = self.db_service.search("alerts", "credential* leak")["items"]
+        assert [(a["type"], a["resolved"]) for a in alerts] == [("fraud_detected", False)]
+        violations = self.db_service.search("violations", "secrets")["items"]
+        assert violations[0]["file"] == "config/secrets.yml"
+        assert violations[0]["highlights"] == {"file": "config/<mark>secrets</mark>.yml"}
+
+        # Re-analysis replaces the violations, and their index entries
+        self.db_service.store_commit_analysis({"commit_id": "c1", "repository": "payments", "rule_violations": []})
+        assert self.db_service.search("violations", "secrets")["items"] == []
+        self.assert_indexes_consistent()
+
+    def test_existing_rows_indexed_on_upgrade(self):
+        conn = sqlite3.connect(self.db_path)
+        for version, _, migration in MIGRATIONS:
+            if version < 8:
+                migration(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {version}")
+        conn.execute("INSERT INTO alerts (type, severity, message) VALUES ('fraud', 'low', 'Force push to main')")
+        conn.commit()
+        conn.close()
+
+        assert [a["message"] for a in self.db_service.search("alerts", "force push")["items"]] == ["Force push to main"]
+        self.assert_indexes_consistent()
+
+    def test_search_endpoint(self, monkeypatch):
+        from src.api import search_controller
+        from fastapi import HTTPException
+        self.store_commits([("c1", "repo", "dev", "Disable auth")])
+        monkeypatch.setattr(search_controller, "container", AppContainer(db_service=self.db_service))
+
+        def search(q, scope="commits", sort="rank"):
+            return asyncio.run(search_controller.search(q=q, scope=scope, repository=None, since_days=None,
+                                                        sort=sort, limit=20, cursor=None))
+
+        response = search("auth")
+        assert response["count"] == 1 and response["results"][0]["commit_id"] == "c1"
+        for q, scope, sort in (('""', "commits", "rank"), ("auth", "repositories", "rank"),
+                               ("auth", "commits", "oldest")):
+            with pytest.raises(HTTPException) as exc:
+                search(q, scope, sort)
+            assert exc.value.status_code == 400
+
+
+class TestExportIntegration:
+    """Integration tests for streaming export and import"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.restore_fd, self.restore_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+        self.restore_service = DBService(db_path=self.restore_path)
+        self.exporter = DataExporter(self.db_service, batch_size=7)
+
+    def teardown_method(self):
+        for service, fd, path in ((self.db_service, self.db_fd, self.db_path),
+                                  (self.restore_service, self.restore_fd, self.restore_path)):
+            service.close()
+            os.close(fd)
+            remove_database(path)
+
+    def store_samples(self, count=20):
+        for i in range(count):
+            self.db_service.store_analysis_result({
+                "repository": "payments", "timestamp": 1704067200.0 + i, "risk_score": i / count,
+                "ai_analysis": {"anomaly_score": 0.5, "details": {"note": "ünïcode, \"quoted\"\nnewline"}},
+                "rule_violations": [{"type": "suspicious_timing", "severity": "medium", "commit_id": "ab" * 20}],
+                "recommendations": ["Enhanced monitoring recommended"]
+            }, wait=False)
+            self.db_service.store_commit_analysis({"commit_id": f"c{i}", "repository": "payments",
+                                                   "author": "dev", "message": f"Disable auth, step {i}"},
+                                                  wait=False)
+            self.db_service.store_alert("fraud_detected", "high", f"Alert {i}", "payments", wait=False)
+        self.db_service.flush()
+        self.db_service.resolve_alert(3)
+
+    def export(self, exporter, table, fmt="ndjson", since=None, compress=False):
+        out = io.BytesIO()
+        rows, watermark = exporter.export(table, out, fmt, since, compress)
+        return out.getvalue(), rows, watermark
+
+    def test_round_trip_restores_rows(self):
+        self.store_samples()
+        restorer = DataExporter(self.restore_service, batch_size=7)
+
+        for table in DBService.EXPORTS:
+            for fmt, compress in (("ndjson", True), ("csv", False)):
+                data, rows, watermark = self.export(self.exporter, table, fmt, compress=compress)
+                assert rows == 20
+                assert restorer.import_file(table, io.BytesIO(data), fmt) == (20 if fmt == "ndjson" else 0)
+            # Both formats restore exactly what was exported
+            assert self.export(restorer, table)[0] == self.export(self.exporter, table)[0]
+
+        assert self.restore_service.get_fraud_stats() == self.db_service.get_fraud_stats()
+        assert self.restore_service.get_violation_summary() == self.db_service.get_violation_summary()
+        assert len(self.restore_service.search("commits", "disable auth")["items"]) == 20
+
+    def test_csv_keeps_types(self):
+        self.store_samples(3)
+        data = self.export(self.exporter, "alerts", "csv")[0]
+        restorer = DataExporter(self.restore_service)
+        restorer.import_file("alerts", io.BytesIO(data), "csv")
+
+        alerts = self.restore_service.list_alerts(fields=["resolved", "commit_id", "message"])["items"]
+        assert [(a["resolved"], a["commit_id"], a["message"]) for a in alerts] == [
+            (True, None, "Alert 2"), (False, None, "Alert 1"), (False, None, "Alert 0")
+        ]
+
+    def test_incremental_exports(self):
+        self.store_samples(5)
+        first, rows, watermark = self.export(self.exporter, "alerts")
+        self.db_service.store_alert("fraud_detected", "low", "Later alert")
+
+        data, rows, next_watermark = self.export(self.exporter, "alerts", since=watermark)
+        assert rows == 1 and next_watermark != watermark
+        assert json.loads(data)["message"] == "Later alert"
+        assert self.export(self.exporter, "alerts", since=next_watermark)[1] == 0
+
+    def test_updated_rows_exported_again(self):
+        """Re-analyzed commits and resolved alerts reach incremental exports and restores"""
+        self.store_samples(5)
+        watermarks = {table: self.export(self.exporter, table)[2] for table in ("commit_analysis", "alerts")}
+        restorer = DataExporter(self.restore_service)
+        for table in watermarks:
+            restorer.import_file(table, io.BytesIO(self.export(self.exporter, table)[0]))
+
+        self.db_service.store_commit_analysis({"commit_id": "c1", "risk_score": 0.95, "message": "Re-analyzed"})
+        self.db_service.resolve_alert(2)
+
+        data, rows, _ = self.export(self.exporter, "commit_analysis", since=watermarks["commit_analysis"])
+        assert rows == 1
+        assert (json.loads(data)["commit_id"], json.loads(data)["risk_score"]) == ("c1", 0.95)
+        data, rows, _ = self.export(self.exporter, "alerts", since=watermarks["alerts"])
+        assert rows == 1 and json.loads(data)["id"] == 2 and json.loads(data)["resolved"] is True
+
+        # Newer versions replace the restored rows; re-importing them changes nothing
+        for table in watermarks:
+            data = self.export(self.exporter, table, since=watermarks[table])[0]
+            assert restorer.import_file(table, io.BytesIO(data)) == 1
+            assert restorer.import_file(table, io.BytesIO(data)) == 0
+            assert self.export(restorer, table)[0] == self.export(self.exporter, table)[0]
+        assert self.restore_service.get_fraud_stats()["active_alerts"] == 3
+
+    def test_batches_are_bounded(self):
+        self.store_samples(20)
+        batches = list(self.db_service.export_batches("alerts", batch_size=6))
+        assert [len(batch) for batch in batches] == [6, 6, 6, 2]
+        ids = [row["id"] for batch in batches for row in batch]
+        assert sorted(ids) == list(range(1, 21))
+
+        position = encode_cursor(batches[0][-1]["updated_at"], batches[0][-1]["id"])
+        until = encode_cursor(batches[2][-1]["updated_at"], batches[2][-1]["id"])
+        bounded = list(self.db_service.export_batches("alerts", position, until, batch_size=5))
+        assert [row["id"] for batch in bounded for row in batch] == ids[6:18]
+
+    def test_export_seeks_through_index(self):
+        self.store_samples(3)
+        watermark = self.db_service.get_export_watermark("alerts")
+        plans = query_plans(self.db_service, lambda: list(self.db_service.export_batches("alerts", watermark)))
+        assert any("idx_alerts_updated_at" in plan for plan in plans)
+
+    def test_export_endpoint_streams(self, monkeypatch):
+        from src.api import export_controller
+        from fastapi import HTTPException
+        import gzip
+        self.store_samples(3)
+        monkeypatch.setattr(export_controller, "container", AppContainer(db_service=self.db_service))
+
+        async def download(table, fmt="ndjson", compress=False):
+            response = await export_controller.export_table(table, format=fmt, gzip=compress, since=None)
+            return response, b"".join([chunk async for chunk in response.body_iterator])
+
+        response, body = asyncio.run(download("commit_analysis", compress=True))
+        assert response.headers["x-export-watermark"] == self.db_service.get_export_watermark("commit_analysis")
+        assert response.headers["content-disposition"] == 'attachment; filename="commit_analysis.ndjson.gz"'
+        lines = gzip.decompress(body).decode().splitlines()
+        assert [json.loads(line)["commit_id"] for line in lines] == ["c0", "c1", "c2"]
+
+        response, body = asyncio.run(download("alerts", "csv"))
+        assert response.media_type == "text/csv" and body.decode().count("\n") == 4
+
+        for table, fmt, status in (("webhook_logs", "ndjson", 404), ("alerts", "xml", 400)):
+            with pytest.raises(HTTPException) as exc:
+                asyncio.run(download(table, fmt))
+            assert exc.value.status_code == status
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(export_controller.export_table("alerts", format="ndjson", gzip=False, since="not-a-cursor"))
+        assert exc.value.status_code == 400
+
+
+class TestAsyncDBIntegration:
+    """Integration tests for the awaitable database facade"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+        self.async_db = AsyncDBService(self.db_service, threads=1)
+
+    def teardown_method(self):
+        self.async_db.close()
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def test_same_methods_as_db_service(self):
+        async def calls():
+            await self.async_db.store_alert("fraud_detected", "high", "Alert", "repo")
+            stats = await self.async_db.get_fraud_stats()
+            with pytest.raises(ValueError):
+                await self.async_db.search("repositories", "auth")
+            return stats
+
+        assert asyncio.run(calls()) == self.db_service.get_fraud_stats()
+        assert self.async_db.EXPORTS is DBService.EXPORTS
+        assert self.async_db.get_fraud_stats.__doc__ == DBService.get_fraud_stats.__doc__
+        stats = self.async_db.get_stats()
+        assert (stats["threads"], stats["calls"], stats["failed"], stats["queued"]) == (1, 3, 1, 0)
+
+    def test_slow_query_does_not_delay_webhook_ack(self, monkeypatch):
+        monkeypatch.setattr(webhook_handler, "container",
+                            AppContainer(db_service=self.db_service, async_db=self.async_db))
+        get_fraud_stats = self.db_service.get_fraud_stats
+
+        def slow_stats():
+            time.sleep(0.3)
+            return get_fraud_stats()
+        monkeypatch.setattr(self.db_service, "get_fraud_stats", slow_stats)
+        body = json.dumps({"repository": {"name": "test-repo"}, "commits": []}).encode()
+
+        async def scenario():
+            # Two slow queries saturate the single database thread
+            queries = [asyncio.create_task(self.async_db.get_fraud_stats()) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            ack = await webhook_handler.handle_webhook(make_request(body, {"X-Gitlab-Event": "Push Hook"}),
+                                                       Response())
+            ack_seconds = time.monotonic() - started
+            assert self.async_db.get_stats()["queued"] == 1
+            await asyncio.gather(*queries)
+            return ack, ack_seconds, time.monotonic() - started
+
+        ack, ack_seconds, total_seconds = asyncio.run(scenario())
+        assert ack["status"] == "accepted"
+        assert ack_seconds < 0.2 < total_seconds
+        assert self.async_db.get_stats()["peak_queued"] >= 1
+
+    def test_slow_analysis_does_not_delay_webhook_ack(self, monkeypatch):
+        """Manual /analyze runs its GitLab calls in the threadpool, not on the event loop"""
+        from fastapi import FastAPI
+        from src.api import fraud_controller
+
+        class SlowGitLab:
+            token = ""
+
+            def get_project_info(self, project_id, deadline=None):
+                time.sleep(0.5)
+                return {"name": "slow-repo", "web_url": "https://gitlab.example/slow-repo"}
+
+            def get_project_commits(self, project_id, deadline=None):
+                return []
+
+        container = AppContainer(db_service=self.db_service, async_db=self.async_db, gitlab_service=SlowGitLab())
+        monkeypatch.setattr(fraud_controller, "container", container)
+        monkeypatch.setattr(webhook_handler, "container", container)
+        app = FastAPI()
+        app.include_router(fraud_controller.router, prefix="/api/fraud")
+        app.include_router(webhook_handler.router, prefix="/api")
+        body = json.dumps({"repository": {"name": "test-repo"}, "commits": []}).encode()
+
+        async def scenario():
+            started = time.monotonic()
+            analysis = asyncio.create_task(call_app(app, "POST", "/api/fraud/analyze", query="project_id=1"))
+            await asyncio.sleep(0.1)
+            ack = await call_app(app, "POST", "/api/webhook", body, {"X-Gitlab-Event": "Push Hook"})
+            ack_seconds = time.monotonic() - started
+            return ack, ack_seconds, await analysis, time.monotonic() - started
+
+        (ack_status, ack), ack_seconds, (status, analysis), total_seconds = asyncio.run(scenario())
+        assert ack_status == 202 and ack["status"] == "accepted"
+        # Acknowledged while the analysis was still waiting on GitLab
+        assert ack_seconds < 0.3 < 0.5 <= total_seconds
+        assert status == 200 and analysis["status"] == "no_commits"
+
+    def test_health_reports_executor(self, monkeypatch):
+        from src.api import fraud_controller
+        monkeypatch.setattr(fraud_controller, "container",
+                            AppContainer(db_service=self.db_service, async_db=self.async_db))
+
+        health = asyncio.run(fraud_controller.check_db_health())
+
+        assert health["executor"]["threads"] == 1 and health["executor"]["calls"] == 1
+
+
+class TestResponseCacheIntegration:
+    """Integration tests for the cached dashboard endpoints"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+        self.async_db = AsyncDBService(self.db_service, threads=2)
+        self.container = AppContainer(db_service=self.db_service, async_db=self.async_db)
+
+    def teardown_method(self):
+        self.async_db.close()
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def test_concurrent_misses_run_one_query(self, monkeypatch):
+        from src.api import fraud_controller
+        monkeypatch.setattr(fraud_controller, "container", self.container)
+        calls = []
+        get_fraud_stats = self.db_service.get_fraud_stats
+
+        def slow_stats():
+            calls.append(1)
+            time.sleep(0.1)
+            return get_fraud_stats()
+        monkeypatch.setattr(self.db_service, "get_fraud_stats", slow_stats)
+
+        async def viewers():
+            return await asyncio.gather(*(fraud_controller.get_fraud_stats(make_request(b"", {}))
+                                          for _ in range(100)))
+
+        responses = asyncio.run(viewers())
+        assert len(calls) == 1
+        assert len({response.body for response in responses}) == 1
+        stats = self.container.response_cache.get_stats()
+        assert (stats["misses"], stats["coalesced"], stats["inflight"]) == (1, 99, 0)
+
+        asyncio.run(fraud_controller.get_fraud_stats(make_request(b"", {})))
+        assert len(calls) == 1 and self.container.response_cache.stats["hits"] == 1
+
+    def test_writes_invalidate_and_etag_revalidates(self, monkeypatch):
+        from src.api import alerts_controller
+        monkeypatch.setattr(alerts_controller, "container", self.container)
+        self.db_service.store_alert("fraud_detected", "high", "first", "repo")
+
+        first = asyncio.run(alerts_controller.get_recent_alerts(make_request(b"", {}), limit=10))
+        etag = first.headers["etag"]
+        unchanged = asyncio.run(alerts_controller.get_recent_alerts(
+            make_request(b"", {"If-None-Match": f"W/{etag}"}), limit=10))
+        assert unchanged.status_code == 304 and unchanged.body == b""
+
+        # A buffered write invalidates once it is flushed
+        self.db_service.store_alert("fraud_detected", "high", "second", "repo", wait=False)
+        self.db_service.flush()
+        changed = asyncio.run(alerts_controller.get_recent_alerts(
+            make_request(b"", {"If-None-Match": etag}), limit=10))
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+        assert json.loads(changed.body)["count"] == 2
+
+        alert_id = json.loads(changed.body)["alerts"][0]["id"]
+        self.db_service.resolve_alert(alert_id)
+        resolved = asyncio.run(alerts_controller.get_recent_alerts(make_request(b"", {}), limit=10))
+        assert json.loads(resolved.body)["count"] == 1
+
+    def test_failures_and_verify_bypass_the_cache(self, monkeypatch):
+        from fastapi import HTTPException
+        from src.api import alerts_controller, fraud_controller
+        monkeypatch.setattr(alerts_controller, "container", self.container)
+        monkeypatch.setattr(fraud_controller, "container", self.container)
+        get_alerts_summary = self.db_service.get_alerts_summary
+        monkeypatch.setattr(self.db_service, "get_alerts_summary", lambda: None)
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(alerts_controller.get_alerts_summary(make_request(b"", {})))
+        assert error.value.status_code == 500
+
+        monkeypatch.setattr(self.db_service, "get_alerts_summary", get_alerts_summary)
+        response = asyncio.run(alerts_controller.get_alerts_summary(make_request(b"", {})))
+        assert json.loads(response.body)["summary"]["total_alerts"] == 0
+
+        verified = asyncio.run(fraud_controller.get_fraud_stats(make_request(b"", {}), verify=True))
+        assert verified["consistency"]["consistent"] is True
+        assert "fraud_stats" not in self.container.response_cache._entries
+
+
+class TestEventStreamIntegration:
+    """Integration tests for the live event feed"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    @staticmethod
+    async def take(events, count):
+        return [await asyncio.wait_for(events.__anext__(), 2) for _ in range(count)]
+
+    def test_committed_writes_reach_every_subscriber(self):
+        async def scenario():
+            subscribers = [self.db_service.subscribe_events(types={"alert", "alert_resolved"})
+                           for _ in range(200)]
+            readers = [asyncio.ensure_future(self.take(events, 2)) for events in subscribers]
+            await asyncio.sleep(0.05)
+            await asyncio.to_thread(self.db_service.store_alert, "fraud_detected", "high", "Alert", "repo",
+                                    wait=False)
+            await asyncio.sleep(0.05)
+            # Buffered rows are only announced once committed
+            assert not any(reader.done() for reader in readers)
+            await asyncio.to_thread(self.db_service.flush)
+            await asyncio.to_thread(self.db_service.store_analysis_result, {"repository": "repo", "risk_score": 0.2})
+            await asyncio.to_thread(self.db_service.resolve_alert, 1)
+            received = await asyncio.gather(*readers)
+            assert self.db_service.events.get_stats()["subscribers"] == 200
+            for events in subscribers:
+                await events.aclose()
+            return received
+
+        received = asyncio.run(scenario())
+        assert all([e["type"] for e in events] == ["alert", "alert_resolved"] for events in received)
+        assert received[0][0]["data"]["message"] == "Alert"
+        stats = self.db_service.events.get_stats()
+        assert (stats["published"], stats["subscribers"]) == (3, 0)
+
+    def test_writes_from_another_process_reach_subscribers(self):
+        """The feed tails the database, so writes by other processes are streamed too"""
+        # A second service on the same file stands in for another worker process
+        other = DBService(db_path=self.db_path)
+
+        async def scenario():
+            events = self.db_service.subscribe_events()
+            try:
+                reader = asyncio.ensure_future(self.take(events, 3))
+                await asyncio.sleep(0.05)
+                await asyncio.to_thread(other.store_alert, "fraud_detected", "high", "From another worker", "repo")
+                await asyncio.to_thread(other.store_commit_analysis, {"commit_id": "abc", "risk_score": 0.9,
+                                                                      "rule_violations": [{"type": "x"}]})
+                await asyncio.to_thread(other.resolve_alert, 1)
+                return await reader
+            finally:
+                await events.aclose()
+
+        try:
+            received = asyncio.run(scenario())
+        finally:
+            other.close()
+        assert [event["type"] for event in received] == ["alert", "commit_analysis", "alert_resolved"]
+        assert received[0]["data"]["message"] == "From another worker" and received[0]["data"]["id"] == 1
+        assert received[1]["data"]["violations"] == 1
+        with sqlite3.connect(self.db_path) as conn:
+            log_ids = [row[0] for row in conn.execute("SELECT id FROM event_log ORDER BY id")]
+        # Ids are the event log's, the same in every process
+        assert [event["id"] for event in received] == log_ids
+
+    def test_resume_from_last_event_id(self):
+        bus = EventBus(history=10, client_buffer=4)
+        ids = [bus.publish("alert", {"n": n}) for n in range(6)]
+
+        async def resume(last_event_id, count):
+            events = bus.subscribe(last_event_id)
+            try:
+                return await self.take(events, count)
+            finally:
+                await events.aclose()
+
+        replayed = asyncio.run(resume(ids[3], 2))
+        assert [event["data"]["n"] for event in replayed] == [4, 5]
+
+        # More missed events than a client may buffer: one resync, then the newest
+        lagged = asyncio.run(resume(ids[0], 5))
+        assert lagged[0]["type"] == "resync" and lagged[0]["data"]["dropped"] == 1
+        assert lagged[0]["id"] == ids[1]
+        assert [event["data"]["n"] for event in lagged[1:]] == [2, 3, 4, 5]
+
+        stale = asyncio.run(resume(ids[0] - 10 ** 6, 1))
+        assert stale[0]["type"] == "resync" and stale[0]["data"]["dropped"] is None
+
+    def test_heartbeat_and_sse_encoding(self, monkeypatch):
+        from src.api import events_controller
+        bus = EventBus(heartbeat_seconds=0.05)
+        self.db_service.events = bus
+        monkeypatch.setattr(events_controller, "container", AppContainer(db_service=self.db_service))
+        first = bus.publish("alert", {"severity": "high"})
+        bus.publish("analysis", {"risk_score": 0.1})
+
+        async def read():
+            response = await events_controller.stream_events(types="alert", last_event_id=None,
+                                                              last_event_id_header=str(first - 1))
+            body = response.body_iterator
+            try:
+                return response, await self.take(body, 3)
+            finally:
+                await body.aclose()
+
+        response, chunks = asyncio.run(read())
+        assert response.media_type == "text/event-stream"
+        assert chunks[0] == b"retry: 3000\n\n"
+        lines = chunks[1].decode().splitlines()
+        assert lines[:2] == [f"id: {first}", "event: alert"]
+        assert json.loads(lines[2][len("data: "):])["severity"] == "high"
+        assert chunks[2] == b": keep-alive\n\n"
+        assert bus.get_stats()["subscribers"] == 0
+
+
+class TestRiskSeriesIntegration:
+    """Integration tests for the bucketed, downsampled risk series"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+        self.async_db = AsyncDBService(self.db_service, threads=1)
+
+    def teardown_method(self):
+        self.async_db.close()
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def insert(self, rows):
+        """(repository, risk_score, minutes after yesterday 00:00) analyses"""
+        self.db_service._ensure_tables()
+        with self.db_service.pool.writer() as conn:
+            conn.executemany('''
+                INSERT INTO analysis_results (repository, risk_score, created_at)
+                VALUES (?, ?, datetime('now', 'start of day', '-1 day', ?))
+            ''', [(repository, risk, f"{minutes} minutes") for repository, risk, minutes in rows])
+
+    def test_buckets_and_rollups(self):
+        self.insert([("repo", 0.2, 0), ("repo", 0.8, 30), ("other", 0.5, 90), ("repo", 0.4, -9 * 1440)])
+        assert self.db_service.roll_up_expired("analysis", 5) == 1
+
+        hourly = self.db_service.get_risk_series("repo", "hour", 30)
+        assert hourly["buckets"] == 2
+        rolled_up, first_hour = hourly["items"]
+        assert rolled_up["time"] % 86400 == 0 and rolled_up["average_risk_score"] == 0.4
+        assert (first_hour["analyses"], first_hour["high_risk_analyses"], first_hour["max_risk_score"]) == (2, 1, 0.8)
+        assert first_hour["average_risk_score"] == 0.5
+
+        overall = self.db_service.get_risk_series(None, "minute", 2)["items"]
+        assert [point["time"] - overall[0]["time"] for point in overall] == [0, 1800, 5400]
+        assert self.db_service.get_risk_series(None, "day", 30, source="commit")["items"] == []
+        for bad in ({"bucket": "week"}, {"source": "alerts"}, {"bucket": "minute", "since_days": 365}):
+            with pytest.raises(ValueError):
+                self.db_service.get_risk_series(**bad)
+
+    def test_endpoint_downsamples_to_a_small_payload(self, monkeypatch):
+        from fastapi import HTTPException
+        from src.api import fraud_controller
+        monkeypatch.setattr(fraud_controller, "container",
+                            AppContainer(db_service=self.db_service, async_db=self.async_db))
+        self.insert([("repo", (minutes % 97) / 100, -minutes) for minutes in range(0, 1440 * 5, 2)])
+
+        async def series(**params):
+            query = {"repository": None, "bucket": "minute", "since_days": 7, "source": "analysis", "points": 200}
+            query.update(params)
+            return await fraud_controller.get_risk_series(make_request(b"", {}), **query)
+
+        response = asyncio.run(series())
+        body = json.loads(response.body)
+        assert (body["buckets"], body["points"]) == (3600, 200)
+        assert len(body["series"]["time"]) == len(body["series"]["average_risk_score"]) == 200
+        assert body["series"]["time"] == sorted(body["series"]["time"])
+        assert max(body["series"]["max_risk_score"]) == 0.96
+        assert sum(body["series"]["analyses"]) == 3600
+        assert len(response.body) < 8 * 1024
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(series(bucket="fortnight"))
+        assert error.value.status_code == 400
+
+
+class TestWriteBufferIntegration:
+    """Integration tests for group-committed inserts"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def count(self, table):
+        with self.db_service.pool.reader() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_fire_and_forget_rows_committed_in_one_flush(self):
+        """A 50-commit scan is written with a single transaction"""
+        for i in range(50):
+            self.db_service.store_commit_analysis({"commit_id": f"c{i}", "risk_score": 0.1}, wait=False)
+        self.db_service.store_alert("scan", "low", "done", wait=False)
+
+        assert self.count("commit_analysis") == 0
+        assert self.db_service.flush() == 51
+        assert self.count("commit_analysis") == 50
+        assert self.count("alerts") == 1
+        assert self.db_service.write_buffer.get_stats()["flushes"] == 1
+
+    def test_waiting_insert_visible_on_return(self):
+        self.db_service.store_commit_analysis({"commit_id": "a"}, wait=False)
+        self.db_service.store_alert("test", "high", "urgent")
+
+        # The waiting insert carried the buffered row with it
+        assert self.count("alerts") == 1
+        assert self.count("commit_analysis") == 1
+
+    def test_background_flush_after_interval(self):
+        self.db_service.write_buffer.flush_interval = 0.05
+        self.db_service.store_alert("test", "low", "later", wait=False)
+
+        for _ in range(100):
+            if self.count("alerts"):
+                break
+            time.sleep(0.01)
+        assert self.count("alerts") == 1
+
+    def test_close_drains_buffer(self):
+        self.db_service.write_buffer.flush_interval = 60
+        self.db_service.store_alert("test", "low", "pending", wait=False)
+        self.db_service.close()
+
+        with sqlite3.connect(self.db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM alerts").fetchone()[0] == 1
+
+    def test_failed_flush_reported_on_ticket(self):
+        self.db_service.get_recent_alerts()
+        ticket = self.db_service.write_buffer.add("INSERT INTO missing_table VALUES (?)", (1,))
+
+        assert ticket.done
+        assert isinstance(ticket.error, sqlite3.OperationalError)
+        assert self.db_service.write_buffer.get_stats()["rows_failed"] == 1
+
+    def test_bad_row_fails_only_its_own_ticket(self):
+        self.db_service.store_commit_analysis({"commit_id": "a"}, wait=False)
+        self.db_service.store_commit_analysis({"commit_id": "b"}, wait=False)
+        self.db_service.store_alert("test", "low", "good", wait=False)
+        bad = self.db_service.write_buffer.add('''
+            INSERT INTO alerts (type, severity, message) VALUES (?, ?, ?)
+        ''', ("test", "unknown", "bad"), wait=False)
+
+        assert self.db_service.flush() == 3
+        assert isinstance(bad.error, sqlite3.IntegrityError)
+        assert self.count("commit_analysis") == 2
+        assert self.count("alerts") == 1
+        stats = self.db_service.write_buffer.get_stats()
+        assert stats["rows_written"] == 3
+        assert stats["rows_failed"] == 1
+
 class TestFraudEngineIntegration:
     """Integration tests for fraud engine with database"""
 
@@ -84,8 +1380,9 @@ class TestFraudEngineIntegration:
 
     def teardown_method(self):
         """Cleanup test database"""
+        self.db_service.close()
         os.close(self.db_fd)
-        os.unlink(self.db_path)
+        remove_database(self.db_path)
 
     def test_full_analysis_workflow(self):
         """Test complete analysis workflow"""
@@ -123,6 +1420,86 @@ class TestFraudEngineIntegration:
         stats = self.db_service.get_fraud_stats()
         assert stats["total_analyses"] == 1
 
+class TestLocalGitScannerIntegration:
+    """Integration tests for scanning a local clone into the fraud engine"""
+
+    def setup_method(self):
+        self.repo_dir = tempfile.mkdtemp()
+        self.db_fd, self.db_path = tempfile.mkstemp()
+
+        def git(*args):
+            subprocess.run(["git", "-C", self.repo_dir, *args], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        git("init", "-q")
+        git("config", "user.email", "dev@example.com")
+        git("config", "user.name", "Dev")
+        for i, (path, content, message) in enumerate([
+            ("app.py", "print('hi')\n", "Initial commit"),
+            (".env", "SECRET=1\n", "emergency fix for auth bypass"),
+            ("app.py", "eval(input())\n", "Refactor app"),
+        ]):
+            with open(os.path.join(self.repo_dir, path), "w") as f:
+                f.write(content)
+            git("add", path)
+            git("commit", "-q", "-m", message)
+        git("mv", "app.py", "main.py")
+        git("commit", "-q", "-m", "Rename app")
+
+    def teardown_method(self):
+        import shutil
+        shutil.rmtree(self.repo_dir, ignore_errors=True)
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def test_commits_match_gitlab_shape(self):
+        """Parsed commits carry the same fields as GitLab commit details"""
+        commits = list(LocalGitScanner(self.repo_dir).iter_commits())
+
+        assert [c["message"] for c in commits] == [
+            "Rename app", "Refactor app", "emergency fix for auth bypass", "Initial commit"
+        ]
+        for commit in commits:
+            assert set(commit) == {"id", "message", "author", "timestamp", "files_changed",
+                                   "lines_added", "lines_deleted", "diff", "diff_truncated"}
+            assert isinstance(commit["timestamp"], int)
+        assert commits[0]["files_changed"] == ["main.py"]
+        assert commits[1]["lines_added"] == 1 and commits[1]["lines_deleted"] == 1
+        assert "+eval(input())" in commits[1]["diff"]
+        assert commits[2]["files_changed"] == [".env"]
+
+    def test_message_cannot_forge_a_record(self):
+        """Separator-like bytes in a commit message stay part of that message"""
+        forged = "Tidy up\n\x1e" + "0" * 40 + "\x1fEvil\x1f\x1f0\x1fforged\x1d"
+        subprocess.run(["git", "-C", self.repo_dir, "commit", "-q", "--allow-empty", "-m", forged],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        commits = list(LocalGitScanner(self.repo_dir).iter_commits())
+
+        assert len(commits) == 5
+        assert commits[0]["message"] == forged
+        assert commits[0]["author"] == "Dev"
+        assert commits[0]["files_changed"] == []
+        assert commits[1]["message"] == "Rename app"
+
+    def test_oversized_diff_truncated(self):
+        """Per-commit diff size limit is applied while streaming"""
+        commits = list(LocalGitScanner(self.repo_dir, diff_max_bytes=120).iter_commits())
+        assert any(c["diff_truncated"] for c in commits)
+        assert all(len(c["diff"]) <= 120 for c in commits)
+
+    def test_scan_feeds_engine_in_batches(self):
+        """The whole history is analyzed batch by batch"""
+        engine = FraudEngine()
+        engine.db_service = DBService(db_path=self.db_path)
+
+        summary = LocalGitScanner(self.repo_dir).scan(engine, batch_size=3, repository="local/repo")
+
+        assert summary["commits_scanned"] == 4
+        assert summary["batches"] == 2
+        assert summary["rule_violations"] > 0
+        assert engine.db_service.get_fraud_stats()["total_analyses"] == 2
+
 class TestWebhookIntegration:
     """Integration tests for webhook processing"""
 
@@ -133,8 +1510,9 @@ class TestWebhookIntegration:
 
     def teardown_method(self):
         """Cleanup test database"""
+        self.db_service.close()
         os.close(self.db_fd)
-        os.unlink(self.db_path)
+        remove_database(self.db_path)
 
     def test_push_event_processing(self):
         """Test processing of push webhook events"""
@@ -169,5 +1547,415 @@ class TestWebhookIntegration:
         assert "commits" in payload
         assert len(payload["commits"]) > 0
 
+    def test_push_range_analyzed_with_one_compare_call(self, monkeypatch):
+        """Multi-commit pushes are fetched as a range and analyzed once"""
+        sample_payload_path = os.path.join(os.path.dirname(__file__), '..', 'test_data', 'sample_payload.json')
+        with open(sample_payload_path, 'r') as f:
+            payload = json.load(f)
+        payload["before"] = "1" * 40
+
+        service = webhook_handler.container.gitlab_service
+        calls = {"range": [], "details": 0, "analyses": []}
+
+        def fake_range(project_id, from_sha, to_sha, commit_files=None, deadline=None):
+            calls["range"].append((project_id, from_sha, to_sha))
+            return [
+                {"id": cid, "message": "m", "author": "a", "timestamp": 0,
+                 "files_changed": files, "lines_added": 1, "lines_deleted": 0,
+                 "diff": "", "diff_truncated": False}
+                for cid, files in commit_files.items()
+            ]
+
+        def fake_details(*args, **kwargs):
+            calls["details"] += 1
+
+        monkeypatch.setattr(service, "token", "token")
+        monkeypatch.setattr(service, "get_range_commits", fake_range)
+        monkeypatch.setattr(service, "get_commit_details", fake_details)
+        monkeypatch.setattr(webhook_handler.container.fraud_engine, "analyze_repository",
+                            lambda repo_data, commits, deadline=None: calls["analyses"].append(commits))
+
+        process_push_event(payload)
+
+        assert calls["range"] == [(456, "1" * 40, payload["after"])]
+        assert calls["details"] == 0
+        assert len(calls["analyses"]) == 1
+        assert calls["analyses"][0][1]["files_changed"] == [
+            "src/auth.py", "src/validator.py", "src/old_auth.py"
+        ]
+
+class TestAppContainerIntegration:
+    """Integration tests for the shared application container"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.container = AppContainer(db_service=DBService(db_path=self.db_path))
+
+    def teardown_method(self):
+        self.container.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    def test_components_built_once_and_shared(self):
+        """The engine is wired from the container's own DB service and rule engine"""
+        engine = self.container.fraud_engine
+        assert engine is self.container.fraud_engine
+        assert engine.db_service is self.container.db_service
+        assert engine.rule_engine.threat_signatures is self.container.threat_signatures
+        assert self.container.webhook_workers.db_service is self.container.db_service
+
+    def test_warm_up_marks_ready(self):
+        """Warm-up builds the tables before the first request"""
+        assert self.container.ready is False
+        self.container.warm_up()
+        self.container.warm_up()
+
+        assert self.container.ready is True
+        assert {"database", "threat_signatures", "fraud_engine"} <= set(self.container.startup_timings)
+        with sqlite3.connect(self.db_path) as conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"analysis_results", "alerts", "webhook_logs"} <= tables
+
+    def test_routers_share_process_container(self):
+        from src.api import fraud_controller, alerts_controller
+        assert fraud_controller.container is alerts_controller.container
+        assert fraud_controller.container is get_container()
+
+class TestAppStartupIntegration:
+    """Cold-start checks for the API module"""
+
+    IMPORT_SCRIPT = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import main\n"
+        "print(json.dumps({'seconds': time.perf_counter() - started, 'modules': sorted(sys.modules)}))\n"
+    )
+
+    def test_import_within_budget_and_lazy(self):
+        """Importing the app stays under budget and builds no heavy subsystem"""
+        budget = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "1.0"))
+        backend_dir = os.path.join(os.path.dirname(__file__), '..', '..')
+        output = subprocess.run(
+            [sys.executable, "-c", self.IMPORT_SCRIPT], cwd=backend_dir,
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        assert result["seconds"] < budget
+        for module in ("src.core.fraud_engine", "src.utils.threat_signatures",
+                       "src.services.db_service", "requests", "slack_sdk"):
+            assert module not in result["modules"]
+
+def make_request(body, headers):
+    """Build a Starlette request carrying a raw webhook body"""
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/webhook",
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+    }
+    return Request(scope, receive)
+
+async def call_app(app, method, path, body=b"", headers=None, query=""):
+    """Send one HTTP request through an ASGI app; returns (status, JSON body)"""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Only reached when listening for a disconnect
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "server": ("testserver", 80),
+        "client": ("testclient", 50000),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    }
+    await app(scope, receive, send)
+    payload = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return sent[0]["status"], json.loads(payload)
+
+class TestWebhookQueueIntegration:
+    """Integration tests for the durable webhook ingest queue"""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db_service = DBService(db_path=self.db_path)
+
+    def teardown_method(self):
+        self.db_service.close()
+        os.close(self.db_fd)
+        remove_database(self.db_path)
+
+    @pytest.fixture(autouse=True)
+    def fresh_container(self, monkeypatch):
+        async_db = AsyncDBService(self.db_service, threads=1)
+        monkeypatch.setattr(webhook_handler, "container", AppContainer(
+            db_service=self.db_service,
+            async_db=async_db,
+            admission=WebhookAdmissionController(async_db, high_water=2, max_depth=4, refresh_interval=0)
+        ))
+        yield
+        async_db.close()
+
+    def test_webhook_acknowledged_with_202_and_queued(self, monkeypatch):
+        """The handler only enqueues; nothing is analyzed on the request path"""
+        body = json.dumps({"repository": {"name": "test-repo"}, "commits": []}).encode()
+        response = Response()
+
+        result = asyncio.run(webhook_handler.handle_webhook(
+            make_request(body, {"X-Gitlab-Event": "Push Hook"}), response
+        ))
+
+        assert result["status"] == "accepted"
+        assert self.db_service.get_webhook_queue_stats()["pending"] == 1
+        job = self.db_service.claim_webhook("worker-1")
+        assert job["event_type"] == "push"
+        assert job["repository"] == "test-repo"
+
+    def test_unsigned_delivery_rejected_before_parsing(self, monkeypatch):
+        """With a secret configured, bad or missing signatures never reach the parser"""
+        from fastapi import HTTPException
+        monkeypatch.setattr(webhook_handler.container.webhook_validator, "secret", "s3cret")
+        parsed = []
+        monkeypatch.setattr(webhook_handler, "loads", lambda body: parsed.append(body))
+
+        for headers in ({"X-Gitlab-Event": "Push Hook"},
+                        {"X-Gitlab-Event": "Push Hook", "X-Gitlab-Token": "wrong"}):
+            with pytest.raises(HTTPException) as exc:
+                asyncio.run(webhook_handler.handle_webhook(make_request(b"{not json", headers), Response()))
+            assert exc.value.status_code == 401
+        assert parsed == []
+
+    def test_oversized_body_rejected(self, monkeypatch):
+        """Bodies above the size limit get 413"""
+        from fastapi import HTTPException
+        monkeypatch.setattr(webhook_handler.Config, "MAX_WEBHOOK_BODY_BYTES", 16)
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(webhook_handler.handle_webhook(
+                make_request(b"x" * 64, {"X-Gitlab-Event": "Push Hook"}), Response()
+            ))
+        assert exc.value.status_code == 413
+
+    def test_queued_payload_keeps_only_analysis_fields(self, monkeypatch):
+        """Queued push payloads are reduced to what the pipeline reads"""
+        sample_payload_path = os.path.join(os.path.dirname(__file__), '..', 'test_data', 'sample_payload.json')
+        with open(sample_payload_path, 'rb') as f:
+            body = f.read()
+
+        asyncio.run(webhook_handler.handle_webhook(
+            make_request(body, {"X-Gitlab-Event": "Push Hook"}), Response()
+        ))
+        payload = self.db_service.claim_webhook("worker-1")["payload"]
+
+        assert payload["after"] == "abc123def456789abcdef123456789abcdef1234"
+        assert payload["project_id"] == 456
+        assert "user_avatar" not in payload
+        assert set(payload["commits"][0]) == {"id", "message", "timestamp", "added", "modified", "removed", "author"}
+        assert payload["commits"][0]["author"] == {"name": "Test User", "email": "test@example.com"}
+
+    def test_retried_delivery_deduplicated(self, monkeypatch):
+        """A retry with the same delivery ID is acknowledged without queueing"""
+        body = json.dumps({"repository": {"name": "repo"}, "after": "a" * 40}).encode()
+        headers = {"X-Gitlab-Event": "Push Hook", "X-Gitlab-Event-UUID": "1b9c-retry"}
+
+        first = asyncio.run(webhook_handler.handle_webhook(make_request(body, headers), Response()))
+        response = Response()
+        second = asyncio.run(webhook_handler.handle_webhook(make_request(body, headers), response))
+
+        assert first["status"] == "accepted"
+        assert second["status"] == "duplicate"
+        assert response.status_code == 200
+        assert self.db_service.get_webhook_queue_stats()["pending"] == 1
+
+    def test_duplicate_caught_by_durable_backstop(self, monkeypatch):
+        """Another process (empty memory cache) still sees the earlier delivery"""
+        body = json.dumps({"repository": {"name": "repo"}, "after": "b" * 40}).encode()
+        headers = {"X-Gitlab-Event": "Push Hook"}
+
+        asyncio.run(webhook_handler.handle_webhook(make_request(body, headers), Response()))
+        monkeypatch.setattr(webhook_handler.container, "deduplicator", WebhookDeduplicator(self.db_service))
+        result = asyncio.run(webhook_handler.handle_webhook(make_request(body, headers), Response()))
+
+        assert result["status"] == "duplicate"
+        assert result["delivery_key"] == "push:repo:" + "b" * 40
+        assert self.db_service.get_webhook_queue_stats()["pending"] == 1
+
+    def test_merge_after_open_is_not_a_duplicate(self, monkeypatch):
+        """Opening and then merging one MR queues both events; a retry of either does not"""
+        def merge_request(action, state):
+            return json.dumps({
+                "project": {"id": 7, "name": "repo"},
+                "object_attributes": {"iid": 3, "action": action, "state": state, "target_branch": "main",
+                                      "last_commit": {"id": "f" * 40, "message": "Add login"}}
+            }).encode()
+        headers = {"X-Gitlab-Event": "Merge Request Hook"}
+
+        opened = asyncio.run(webhook_handler.handle_webhook(make_request(merge_request("open", "opened"), headers),
+                                                            Response()))
+        merged = asyncio.run(webhook_handler.handle_webhook(make_request(merge_request("merge", "merged"), headers),
+                                                            Response()))
+        retried = asyncio.run(webhook_handler.handle_webhook(make_request(merge_request("merge", "merged"), headers),
+                                                             Response()))
+
+        assert opened["status"] == "accepted"
+        assert merged["status"] == "accepted"
+        assert retried["status"] == "duplicate"
+        assert retried["delivery_key"] == "merge:7:3:merge:" + "f" * 40
+        assert self.db_service.get_webhook_queue_stats()["pending"] == 2
+
+    def test_expired_delivery_keys_released(self):
+        """Keys past the window no longer block a delivery"""
+        self.db_service.enqueue_webhook("push", "repo", {}, delivery_key="delivery:x")
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE webhook_logs SET created_at = datetime('now', '-2 days')")
+
+        assert self.db_service.release_delivery_keys(86400) == 1
+        queue_id, duplicate = self.db_service.enqueue_webhook("push", "repo", {}, delivery_key="delivery:x")
+        assert duplicate is False
+
+    def test_workers_release_expired_keys_off_the_request_path(self):
+        """The queue workers, not the webhook handler, release expired keys"""
+        self.db_service.enqueue_webhook("push", "repo", {}, delivery_key="delivery:y")
+        self.db_service.complete_webhook(self.db_service.claim_webhook("worker-1")["id"], 0.1)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE webhook_logs SET created_at = datetime('now', '-2 days')")
+        deduplicator = WebhookDeduplicator(self.db_service, ttl_seconds=86400)
+        deduplicator._last_release -= 86400
+        pool = WebhookWorkerPool(self.db_service, {}, workers=1, poll_interval=0.01,
+                                 maintenance=deduplicator.release_expired)
+
+        pool.start()
+        try:
+            for _ in range(100):
+                with sqlite3.connect(self.db_path) as conn:
+                    if conn.execute("SELECT delivery_key FROM webhook_logs").fetchone()[0] is None:
+                        break
+                time.sleep(0.01)
+        finally:
+            pool.stop()
+        _, duplicate = self.db_service.enqueue_webhook("push", "repo", {}, delivery_key="delivery:y")
+        assert duplicate is False
+
+    def test_feature_branch_shed_above_high_water(self, monkeypatch):
+        """Past the high-water mark only protected-branch pushes are queued"""
+        from fastapi import HTTPException
+        for i in range(2):
+            self.db_service.enqueue_webhook("push", "repo", {}, delivery_key=f"delivery:{i}")
+
+        def push(ref, after):
+            body = json.dumps({"repository": {"name": "repo", "default_branch": "trunk"},
+                               "ref": ref, "after": after}).encode()
+            return asyncio.run(webhook_handler.handle_webhook(
+                make_request(body, {"X-Gitlab-Event": "Push Hook"}), Response()
+            ))
+
+        with pytest.raises(HTTPException) as exc:
+            push("refs/heads/feature/login", "c" * 40)
+        assert exc.value.status_code == 429
+        assert int(exc.value.headers["Retry-After"]) >= 1
+
+        assert push("refs/heads/trunk", "d" * 40)["status"] == "accepted"
+        assert push("refs/heads/release/1.2", "e" * 40)["status"] == "accepted"
+
+        # Hard limit: everything is refused, before the body is parsed
+        monkeypatch.setattr(webhook_handler, "loads", lambda body: pytest.fail("parsed"))
+        with pytest.raises(HTTPException) as exc:
+            push("refs/heads/trunk", "f" * 40)
+        assert exc.value.status_code == 503
+        assert "Retry-After" in exc.value.headers
+
+        stats = asyncio.run(webhook_handler.get_webhook_queue_stats())["admission"]
+        assert stats["shed"] == {"low_priority": 1, "overloaded": 1}
+        assert stats["admitted"] == {"high": 2, "low": 0}
+
+    def test_protected_deliveries_claimed_first(self):
+        """Workers drain high-priority deliveries ahead of older feature-branch ones"""
+        self.db_service.enqueue_webhook("push", "feature", {})
+        self.db_service.enqueue_webhook("push", "main", {}, priority=1)
+
+        assert self.db_service.claim_webhook("worker-1")["repository"] == "main"
+        assert self.db_service.claim_webhook("worker-1")["repository"] == "feature"
+
+    def test_worker_processes_and_records_time(self):
+        """Workers run the handler and record processing time"""
+        handled = []
+        pool = WebhookWorkerPool(self.db_service, {"push": handled.append}, workers=0)
+        self.db_service.enqueue_webhook("push", "repo", {"n": 1})
+
+        assert pool.process_next() is True
+        assert pool.process_next() is False
+        assert handled == [{"n": 1}]
+
+        stats = self.db_service.get_webhook_queue_stats()
+        assert stats["processed"] == 1
+        assert stats["pending"] == 0
+        with sqlite3.connect(self.db_path) as conn:
+            processing_time = conn.execute("SELECT processing_time FROM webhook_logs").fetchone()[0]
+        assert processing_time is not None
+
+    def test_failed_delivery_retried_then_dead_lettered(self):
+        """Failures release the claim until max_attempts is reached"""
+        def failing(payload):
+            raise RuntimeError("upstream down")
+
+        pool = WebhookWorkerPool(self.db_service, {"push": failing}, workers=0, max_attempts=2,
+                                 retry_base_seconds=0.01)
+        self.db_service.enqueue_webhook("push", "repo", {})
+
+        assert pool.process_next() is True
+        time.sleep(0.02)
+        assert pool.process_next() is True
+        time.sleep(0.04)
+        assert pool.process_next() is False
+        assert self.db_service.get_webhook_queue_stats(max_attempts=2)["dead_letter"] == 1
+
+    def test_failed_delivery_backs_off(self):
+        """A failed delivery is not claimed again until its retry delay has passed"""
+        def failing(payload):
+            raise RuntimeError("upstream down")
+
+        pool = WebhookWorkerPool(self.db_service, {"push": failing}, workers=0, max_attempts=5,
+                                 retry_base_seconds=10, retry_max_seconds=60)
+        self.db_service.enqueue_webhook("push", "repo", {})
+
+        before = time.time()
+        assert pool.process_next() is True
+        assert pool.process_next() is False
+        with sqlite3.connect(self.db_path) as conn:
+            next_attempt_at, error = conn.execute("SELECT next_attempt_at, error FROM webhook_logs").fetchone()
+        assert before + 10 <= next_attempt_at <= time.time() + 10
+        assert error == "upstream down"
+        assert [pool.retry_delay(n) for n in (1, 2, 3, 4, 5)] == [10, 20, 40, 60, 60]
+
+    def test_expired_lease_is_reclaimed(self):
+        """A delivery claimed by a crashed worker is processed again"""
+        self.db_service.enqueue_webhook("push", "repo", {})
+        assert self.db_service.claim_webhook("crashed", lease_seconds=300) is not None
+        assert self.db_service.claim_webhook("other", lease_seconds=300) is None
+
+        time.sleep(0.01)
+        job = self.db_service.claim_webhook("other", lease_seconds=0.001)
+        assert job is not None
+        assert job["attempts"] == 2
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
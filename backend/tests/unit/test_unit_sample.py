@@ -1,14 +1,28 @@
 import pytest
 import sys
 import os
+import json
+import time
 
 # Add the src directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from src.core.fraud_engine import FraudEngine
 from src.core.rule_engine import RuleEngine
+from src.core.ai_analyzer import AIAnalyzer
 from src.core.risk_scorer import RiskScorer
 from src.utils.validator import InputValidator
+from src.utils.deadline import Deadline, DeadlineExceeded, io_timeout
+from src.utils.ttl_cache import TTLCache
+from src.services.webhook_admission import WebhookAdmissionController, PRIORITY_HIGH, PRIORITY_LOW
+from src.services import gitlab_service as gitlab_module
+from src.services.gitlab_service import GitLabService, LazyCommit
+from src.utils.payload_codec import FORMAT_BINARY, FORMAT_ZLIB, PayloadCodec
+from src.utils.search_query import InvalidSearchQuery, build_match_query
+from src.api import fraud_controller
+from src.api.dependencies import AppContainer
+from src.api.response_cache import etag_matches
+from src.utils.downsample import lttb, lttb_spans
 
 class TestFraudEngine:
     """Unit tests for FraudEngine"""
@@ -45,6 +59,87 @@ class TestFraudEngine:
         assert result["commit_id"] == "abc123"
         assert isinstance(result["risk_score"], (int, float))
 
+    def test_expired_deadline_returns_partial_result(self):
+        """Stages after the budget runs out are skipped and reported"""
+        engine = FraudEngine()
+        stored = []
+        engine.db_service.store_analysis_result = lambda *a, **k: stored.append(a)
+
+        commit = {"id": "abc123", "message": "Fix bug", "author": "dev",
+                  "files_changed": ["file1.py"], "lines_added": 1, "lines_deleted": 0}
+        result = engine.analyze_repository({"name": "repo"}, [commit], deadline=Deadline(0))
+
+        assert result["partial"] is True
+        assert result["skipped_stages"] == ["ai_analysis", "rule_checks", "store"]
+        assert 0.0 <= result["risk_score"] <= 1.0
+        assert stored == []
+
+    def test_complete_analysis_is_not_partial(self):
+        """A generous budget runs every stage"""
+        engine = FraudEngine()
+        engine.db_service.store_commit_analysis = lambda *a, **k: None
+        result = engine.analyze_commit({"id": "abc123", "message": "Fix bug"}, deadline=Deadline(60))
+
+        assert result["partial"] is False
+        assert result["skipped_stages"] == []
+
+class TestDeadline:
+    """Unit tests for request deadlines"""
+
+    def test_timeout_bounded_by_remaining_budget(self):
+        deadline = Deadline(5)
+        assert 0 < deadline.timeout() <= 5
+        assert deadline.timeout(cap=1) == 1
+        assert io_timeout(None, 10) == 10
+        assert io_timeout(deadline, 2) == 2
+
+    def test_expired_deadline_refuses_io(self):
+        deadline = Deadline(0)
+        assert deadline.expired()
+        with pytest.raises(DeadlineExceeded):
+            io_timeout(deadline, 10)
+
+class TestTTLCache:
+    """Unit tests for the bounded TTL cache"""
+
+    def test_add_only_once_within_ttl(self):
+        cache = TTLCache(max_entries=10, ttl_seconds=60)
+        assert cache.add("k") is True
+        assert cache.add("k") is False
+        assert "k" in cache
+
+    def test_entries_expire(self):
+        cache = TTLCache(max_entries=10, ttl_seconds=0)
+        cache.set("k", 1)
+        assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_bounded_size_evicts_oldest(self):
+        cache = TTLCache(max_entries=2, ttl_seconds=60)
+        for key in ("a", "b", "c"):
+            cache.set(key)
+        assert "a" not in cache
+        assert len(cache) == 2
+
+class TestWebhookAdmission:
+    """Test cases for webhook event prioritisation"""
+
+    def setup_method(self):
+        self.controller = WebhookAdmissionController(None, protected_branches="main,release/*")
+
+    def test_push_priority(self):
+        assert self.controller.priority_for("push", {"ref": "refs/heads/main"}) == PRIORITY_HIGH
+        assert self.controller.priority_for("push", {"ref": "refs/heads/release/2.0"}) == PRIORITY_HIGH
+        assert self.controller.priority_for("push", {"ref": "refs/heads/feature/x"}) == PRIORITY_LOW
+        default = {"ref": "refs/heads/develop", "project": {"default_branch": "develop"}}
+        assert self.controller.priority_for("push", default) == PRIORITY_HIGH
+
+    def test_merge_priority_uses_target_branch(self):
+        gitlab = {"object_attributes": {"target_branch": "main"}}
+        github = {"pull_request": {"base": {"ref": "feature/y"}}}
+        assert self.controller.priority_for("merge_request", gitlab) == PRIORITY_HIGH
+        assert self.controller.priority_for("pull_request", github) == PRIORITY_LOW
+
 class TestRuleEngine:
     """Unit tests for RuleEngine"""
 
@@ -86,6 +181,14 @@ class TestRuleEngine:
         }
         assert engine._check_large_changes(normal_commit) == False
 
+    def test_sensitive_file_violation_lists_files(self):
+        """Sensitive file violations name the files for the violations table"""
+        engine = RuleEngine()
+        violations = engine.check_commit_rules({"id": "abc", "message": "update config",
+                                                "files_changed": [".env", "README.md"]})
+        sensitive = [v for v in violations if v["type"] == "sensitive_file_modification"]
+        assert sensitive and sensitive[0]["files"] == [".env"]
+
 class TestRiskScorer:
     """Unit tests for RiskScorer"""
 
@@ -129,5 +232,370 @@ class TestInputValidator:
         assert InputValidator.validate_project_id("group/project") == True
         assert InputValidator.validate_project_id("") == False
 
+class FakeResponse:
+    """Minimal stand-in for a streamed ``requests`` response"""
+
+    def __init__(self, payload=None, body=None, headers=None):
+        self._payload = payload
+        self._body = body if body is not None else json.dumps(payload).encode()
+        self.headers = headers or {}
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self._body), chunk_size):
+            yield self._body[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class TestGitLabService:
+    """Unit tests for lazy commit loading in GitLabService"""
+
+    def _install(self, monkeypatch, diff_entries):
+        calls = []
+
+        def fake_get(url, headers=None, params=None, stream=False, timeout=None):
+            calls.append(url)
+            if url.endswith("/diff"):
+                return FakeResponse(diff_entries)
+            return FakeResponse({
+                "id": "abc123",
+                "message": "Update settings",
+                "author_name": "dev",
+                "created_at": "2024-01-01T00:00:00Z",
+                "stats": {"additions": 7, "deletions": 2, "total": 9}
+            })
+
+        monkeypatch.setattr(gitlab_module.requests, "get", fake_get)
+        return calls
+
+    def test_commit_details_uses_stats_without_fetching_diff(self, monkeypatch):
+        """Metadata and line totals come from a single request"""
+        calls = self._install(monkeypatch, [{"new_path": "app.py", "diff": "+x"}])
+        commit = GitLabService().get_commit_details("1", "abc123")
+
+        assert isinstance(commit, LazyCommit)
+        assert commit["lines_added"] == 7
+        assert commit["lines_deleted"] == 2
+        assert len(calls) == 1
+        assert not commit.diff_loaded
+
+    def test_diff_loaded_once_on_first_access(self, monkeypatch):
+        """Reading diff fields fetches and caches the diff"""
+        calls = self._install(monkeypatch, [{"new_path": "app.py", "diff": "+eval(x)"}])
+        commit = GitLabService().get_commit_details("1", "abc123")
+
+        assert commit.get("diff") == "+eval(x)"
+        assert commit["files_changed"] == ["app.py"]
+        assert commit["diff_truncated"] is False
+        assert len(calls) == 2
+
+    def test_known_files_do_not_trigger_diff_fetch(self, monkeypatch):
+        """Paths supplied by the caller are used as-is"""
+        calls = self._install(monkeypatch, [])
+        commit = GitLabService().get_commit_details("1", "abc123", files_changed=[".env"])
+
+        assert commit.get("files_changed") == [".env"]
+        assert len(calls) == 1
+
+    def test_rules_skip_diff_fetch_for_docs_only_commit(self, monkeypatch):
+        """No content rule needs the diff of a commit that only touches docs"""
+        calls = self._install(monkeypatch, [{"new_path": "docs/guide.md", "diff": "+eval(x)"}])
+        commit = GitLabService().get_commit_details("1", "abc123", files_changed=["docs/guide.md"])
+
+        violations = RuleEngine().check_commit_rules(commit)
+        AIAnalyzer().analyze_commits([commit])
+
+        assert not any(url.endswith("/diff") for url in calls)
+        assert not commit.diff_loaded
+        assert not any(v["type"] == "potential_code_injection" for v in violations)
+
+    def test_rules_fetch_diff_for_code_changes(self, monkeypatch):
+        """Added lines in source files are still scanned for injection"""
+        calls = self._install(monkeypatch, [{"new_path": "app.py", "diff": "+eval(x)"}])
+        commit = GitLabService().get_commit_details("1", "abc123", files_changed=["app.py"])
+
+        violations = RuleEngine().check_commit_rules(commit)
+
+        assert sum(url.endswith("/diff") for url in calls) == 1
+        assert any(v["type"] == "potential_code_injection" for v in violations)
+
+    def test_trickling_diff_stops_at_deadline(self, monkeypatch):
+        """A server sending a few bytes at a time cannot hold the read past the deadline"""
+        class TricklingResponse(FakeResponse):
+            def iter_content(self, chunk_size=1):
+                self._body = b'[{"new_path": "app.py", "diff": "+x"},'
+                yield self._body
+                while not self.closed:
+                    time.sleep(0.01)
+                    yield b" "
+
+        response = TricklingResponse(body=b"")
+        monkeypatch.setattr(gitlab_module.requests, "get", lambda *args, **kwargs: response)
+
+        started = time.monotonic()
+        diff = GitLabService().get_commit_diff("1", "abc123", deadline=Deadline(0.1))
+
+        assert time.monotonic() - started < 1
+        assert response.closed
+        assert diff["diff_truncated"] is True
+        assert diff["files_changed"] == ["app.py"]
+
+    def test_manual_analysis_scores_each_commit_on_its_own_changes(self, monkeypatch):
+        """/analyze attributes files and line counts to every commit, not just the head"""
+        changes = {
+            "c1": ({"additions": 1, "deletions": 0}, [{"new_path": ".env", "diff": "+SECRET=1"}]),
+            "c2": ({"additions": 1, "deletions": 0}, [{"new_path": "app.py", "diff": "+print(1)"}])
+        }
+
+        def fake_get(url, headers=None, params=None, stream=False, timeout=None):
+            if url.endswith("/projects/1"):
+                return FakeResponse({"id": 1, "name": "repo", "description": "", "web_url": "u",
+                                     "created_at": "", "last_activity_at": "", "visibility": "private"})
+            if url.endswith("/repository/commits"):
+                return FakeResponse([{"id": cid, "message": "m", "author_name": "a",
+                                      "created_at": "2024-01-01T00:00:00Z", "web_url": "u"}
+                                     for cid in ("c2", "c1")])
+            if url.endswith("/contributors"):
+                return FakeResponse([])
+            commit_id = url.split("/")[-2 if url.endswith("/diff") else -1]
+            stats, diff = changes[commit_id]
+            if url.endswith("/diff"):
+                return FakeResponse(diff)
+            return FakeResponse({"id": commit_id, "message": "m", "author_name": "a",
+                                 "created_at": "2024-01-01T00:00:00Z", "stats": stats})
+
+        analyzed = []
+
+        class RecordingEngine:
+            def analyze_repository(self, repo_data, commits, deadline=None):
+                analyzed.extend(commits)
+                return {"skipped_stages": []}
+
+        monkeypatch.setattr(gitlab_module.requests, "get", fake_get)
+        monkeypatch.setattr(fraud_controller, "container",
+                            AppContainer(gitlab_service=GitLabService(), fraud_engine=RecordingEngine()))
+
+        fraud_controller.analyze_repository(project_id="1")
+
+        by_id = {commit["id"]: commit for commit in analyzed}
+        assert by_id["c1"]["files_changed"] == [".env"]
+        assert by_id["c1"]["lines_added"] == 1
+        assert by_id["c2"]["files_changed"] == ["app.py"]
+
+    def test_diff_truncated_at_size_limit(self, monkeypatch):
+        """Oversized diffs are cut off and flagged"""
+        entries = [{"new_path": f"gen/file{i}.js", "diff": "+" + "x" * 200} for i in range(50)]
+        self._install(monkeypatch, entries)
+        service = GitLabService()
+        service.diff_max_bytes = 1000
+        commit = service.get_commit_details("1", "abc123")
+
+        assert commit["diff_truncated"] is True
+        assert 0 < len(commit["files_changed"]) < 50
+        assert len(commit["diff"]) < 1000
+
+    def _compare_payload(self):
+        return {
+            "commit": {"id": "c2"},
+            "commits": [
+                {"id": "c1", "message": "Add config", "author_name": "a", "created_at": "2024-01-01T00:00:00Z"},
+                {"id": "c2", "message": "Add helper", "author_name": "b", "created_at": "2024-01-01T01:00:00Z"}
+            ],
+            "diffs": [
+                {"new_path": ".env", "diff": "@@ -0,0 +1 @@\n+SECRET=1"},
+                {"new_path": "util.py", "diff": "@@ -1 +1,2 @@\n-a\n+b\n+eval(x)"},
+                {"new_path": "README.md", "diff": "@@ -1 +1 @@\n-x\n+y"}
+            ]
+        }
+
+    def test_range_commits_attributed_per_commit(self, monkeypatch):
+        """A compare call yields per-commit files, diffs and line counts"""
+        calls = []
+
+        def fake_get(url, headers=None, params=None, stream=False, timeout=None):
+            calls.append(url)
+            return FakeResponse(self._compare_payload())
+
+        monkeypatch.setattr(gitlab_module.requests, "get", fake_get)
+        commits = GitLabService().get_range_commits(
+            "1", "c0", "c2", {"c1": [".env"], "c2": ["util.py"]}
+        )
+
+        assert len(calls) == 1
+        assert [c["id"] for c in commits] == ["c1", "c2"]
+        assert commits[0]["files_changed"] == [".env"]
+        assert commits[0]["lines_added"] == 1
+        # README.md was not listed for any commit, so it goes to the head
+        assert commits[1]["files_changed"] == ["util.py", "README.md"]
+        assert "eval(x)" in commits[1]["diff"]
+        assert commits[1]["lines_added"] == 3
+        assert commits[1]["lines_deleted"] == 2
+
+    def test_truncated_range_keeps_commits(self, monkeypatch):
+        """A compare body cut at the limit still returns every commit"""
+        body = json.dumps(self._compare_payload()).encode()
+        cut = body.index(b"util.py")
+
+        monkeypatch.setattr(gitlab_module.requests, "get",
+                            lambda *a, **k: FakeResponse(body=body))
+        service = GitLabService()
+        service.compare_max_bytes = cut
+        commits = service.get_range_commits("1", "c0", "c2", {"c1": [".env"], "c2": ["util.py"]})
+
+        assert [c["id"] for c in commits] == ["c1", "c2"]
+        assert commits[0]["files_changed"] == [".env"]
+        assert commits[1]["diff"] == ""
+        assert all(c["diff_truncated"] for c in commits)
+
+    def test_unlisted_range_commits_keep_their_own_stats(self, monkeypatch):
+        """Without per-commit paths (merge requests) nothing is piled onto the head"""
+        stats = {"c1": {"additions": 1, "deletions": 0}, "c2": {"additions": 2, "deletions": 1}}
+        diffs = {"c1": [{"new_path": ".env", "diff": "+SECRET=1"}],
+                 "c2": [{"new_path": "util.py", "diff": "-a\n+b\n+eval(x)"}]}
+
+        def fake_get(url, headers=None, params=None, stream=False, timeout=None):
+            if url.endswith("/compare"):
+                return FakeResponse(self._compare_payload())
+            commit_id = url.split("/")[-2 if url.endswith("/diff") else -1]
+            if url.endswith("/diff"):
+                return FakeResponse(diffs[commit_id])
+            return FakeResponse({"id": commit_id, "message": "m", "author_name": "a",
+                                 "created_at": "2024-01-01T00:00:00Z", "stats": stats[commit_id]})
+
+        monkeypatch.setattr(gitlab_module.requests, "get", fake_get)
+        commits = GitLabService().get_range_commits("1", "c0", "c2")
+
+        assert [c["id"] for c in commits] == ["c1", "c2"]
+        assert commits[0]["lines_added"] == 1
+        assert commits[0]["files_changed"] == [".env"]
+        assert commits[1]["lines_added"] == 2
+        assert commits[1]["files_changed"] == ["util.py"]
+
+class TestPayloadCodec:
+    """Unit tests for the stored payload encoding"""
+
+    def test_round_trip(self):
+        value = {
+            "commit_id": "0123456789abcdef0123456789abcdef01234567",
+            "numbers": [0, 63, 64, -1, -(2 ** 70), 2 ** 70, 0.731, -2.5],
+            "text": ["", "héllo ✓", "ABCDEF0123456789", "abc"],
+            "flags": [True, False, None],
+            "nested": {"details": {"total_commits": 5}, "empty": {}},
+        }
+        codec = PayloadCodec(compression="none")
+        assert PayloadCodec.decode(codec.encode(value)) == value
+
+    def test_non_string_keys_match_json(self):
+        value = {1: "a", 2.5: "b", True: "c", None: "d"}
+        encoded = PayloadCodec(compression="none").encode(value)
+        assert PayloadCodec.decode(encoded) == json.loads(json.dumps(value))
+
+    def test_legacy_json_text_decodes(self):
+        assert PayloadCodec.decode('{"anomaly_score": 0.5}') == {"anomaly_score": 0.5}
+        assert PayloadCodec.decode("") is None
+        assert PayloadCodec.decode(None) is None
+
+    def test_analysis_documents_shrink(self):
+        codec = PayloadCodec(compression="none")
+        documents = [
+            {"anomaly_score": 0.7312, "is_anomaly": True,
+             "details": {"total_commits": 5, "anomalous_commits": 2}},
+            [{"type": "suspicious_commit_message", "commit_id": "a1b2c3d4" * 5, "severity": "medium",
+              "description": "Commit message contains suspicious patterns"}],
+            ["Immediate code review required", "Consider rolling back recent commits"],
+        ]
+        for document in documents:
+            assert len(codec.encode(document)) * 3 <= len(json.dumps(document))
+
+    def test_large_payloads_compressed(self):
+        payload = {"commits": [{"id": "%040x" % i, "message": f"Fix bug in module {i}",
+                                "author": {"name": "dev", "email": "dev@example.com"}} for i in range(50)]}
+        codec = PayloadCodec(compression="zlib", compress_min_bytes=512)
+        encoded = codec.encode(payload)
+        assert encoded[0] == FORMAT_ZLIB
+        assert PayloadCodec.decode(encoded) == payload
+        assert codec.encode({"small": 1})[0] == FORMAT_BINARY
+
+    def test_unserializable_value_rejected(self):
+        with pytest.raises(TypeError):
+            PayloadCodec().encode({"when": object()})
+
+
+class TestSearchQuery:
+    """Unit tests for turning free text into FTS5 queries"""
+
+    def test_terms_phrases_and_prefixes(self):
+        assert build_match_query("disable auth*") == '"disable" AND "auth"*'
+        assert build_match_query('"force push" main') == '"force push" AND "main"'
+
+    def test_or_groups_adjacent_terms(self):
+        assert build_match_query("disable auth OR login") == '"disable" AND ("auth" OR "login")'
+        assert build_match_query("OR token OR OR") == '"token"'
+
+    def test_syntax_characters_are_quoted(self):
+        assert build_match_query('NEAR(a b) col:x a"b -c') == '"NEAR(a" AND "b)" AND "col:x" AND "ab" AND "-c"'
+
+    def test_query_without_terms_rejected(self):
+        for text in ("", "   ", '""', "* OR"):
+            with pytest.raises(InvalidSearchQuery):
+                build_match_query(text)
+
+
+class TestEtagMatching:
+    """Unit tests for If-None-Match handling"""
+
+    def test_matches_listed_weak_or_wildcard_tags(self):
+        assert etag_matches('"a1"', '"a1"')
+        assert etag_matches('"zz", W/"a1"', '"a1"')
+        assert etag_matches("*", '"a1"')
+
+    def test_other_or_missing_tags_do_not_match(self):
+        assert not etag_matches('"a2"', '"a1"')
+        assert not etag_matches(None, '"a1"')
+        assert not etag_matches("a1", '"a1"')
+
+
+class TestLTTB:
+    """Unit tests for Largest-Triangle-Three-Buckets downsampling"""
+
+    def test_short_series_kept_whole(self):
+        assert lttb([0, 1, 2], [5, 6, 7], 10) == [0, 1, 2]
+        assert lttb([], [], 10) == []
+
+    def test_keeps_ends_and_spikes(self):
+        xs = list(range(1000))
+        ys = [0.1] * 1000
+        ys[437], ys[811] = 0.95, 0.0
+        kept = lttb(xs, ys, 50)
+        assert len(kept) == 50 and kept == sorted(set(kept))
+        assert kept[0] == 0 and kept[-1] == 999
+        assert 437 in kept and 811 in kept
+
+    def test_spans_cover_every_point_once(self):
+        kept = lttb(list(range(1000)), [0.1] * 1000, 50)
+        spans = lttb_spans(1000, 50)
+        assert len(spans) == 50
+        assert [i for start, end in spans for i in range(start, end)] == list(range(1000))
+        assert all(start <= i < end for i, (start, end) in zip(kept, spans))
+        assert lttb_spans(3, 10) == [(0, 1), (1, 2), (2, 3)]
+
+    def test_missing_values_count_as_zero(self):
+        kept = lttb(list(range(100)), [None if x % 2 else 0.5 for x in range(100)], 10)
+        assert len(kept) == 10
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -114,8 +114,18 @@ const Alerts = () => {
 
   useEffect(() => {
     fetchAlerts();
-    const interval = setInterval(fetchAlerts, 5000);
-    return () => clearInterval(interval);
+    // Refresh when the server pushes an alert change; the slow poll only
+    // picks up simulated alerts and covers a dropped event stream
+    const events = apiClient.subscribeEvents({
+      alert: fetchAlerts,
+      alert_resolved: fetchAlerts,
+      resync: fetchAlerts
+    }, ['alert', 'alert_resolved']);
+    const interval = setInterval(fetchAlerts, 30000);
+    return () => {
+      events.close();
+      clearInterval(interval);
+    };
   }, []);
 
   // --- ACTIONS ---
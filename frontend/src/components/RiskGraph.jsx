@@ -1,16 +1,36 @@
-import React, { useState, useMemo } from 'react';
+import React, { useState, useMemo, useEffect } from 'react';
 import {
   XAxis, YAxis, CartesianGrid, Tooltip, Legend,
   ResponsiveContainer, BarChart, Bar, Area, AreaChart
 } from 'recharts';
+import apiClient from '../services/apiClient';
 
 const RiskGraph = ({ data }) => {
   const [chartType, setChartType] = useState('area');
+  const [history, setHistory] = useState([]);
+
+  // Without data from the parent, load 30 days of daily risk from the
+  // server-side series (already bucketed and downsampled)
+  useEffect(() => {
+    if (data && data.length > 0) return;
+    apiClient.getRiskSeries({ bucket: 'day', since_days: 30, points: 200 })
+      .then(res => {
+        const s = res.series;
+        setHistory(s.time.map((time, i) => ({
+          date: new Date(time * 1000).toISOString().split('T')[0],
+          riskScore: s.average_risk_score[i] ?? 0,
+          analyses: s.analyses[i],
+          alerts: s.high_risk_analyses[i]
+        })));
+      })
+      .catch(err => console.warn("Risk series unavailable, using sample data", err));
+  }, [data]);
 
   // --- 1. ROBUST DATA GENERATION ---
   // If data is missing or empty, generate a 30-day mock history
   const chartData = useMemo(() => {
     if (data && data.length > 0) return data;
+    if (history.length > 0) return history;
 
     const mockData = [];
     const now = new Date();
@@ -31,7 +51,7 @@ const RiskGraph = ({ data }) => {
       });
     }
     return mockData;
-  }, [data]);
+  }, [data, history]);
 
   // --- 2. SUMMARY STATS ---
   const summary = useMemo(() => {
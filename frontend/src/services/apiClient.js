@@ -60,6 +60,54 @@ class ApiClient {
     return this.get(`/api/alerts/recent?limit=${limit}`);
   }
 
+  // Keyset-paginated listings: pass the previous response's next_cursor as
+  // `cursor` to get the following page (next_cursor is null on the last one)
+  async listAlerts(params = {}) {
+    return this.get(`/api/alerts${this.queryString(params)}`);
+  }
+
+  async listAnalyses(params = {}) {
+    return this.get(`/api/fraud/analyses${this.queryString(params)}`);
+  }
+
+  async listCommitAnalyses(params = {}) {
+    return this.get(`/api/fraud/commits${this.queryString(params)}`);
+  }
+
+  // Risk over time: { bucket: "minute"|"hour"|"day", since_days, points,
+  // repository, source }. The response holds one array per field in `series`
+  async getRiskSeries(params = {}) {
+    return this.get(`/api/fraud/series${this.queryString(params)}`);
+  }
+
+  async search(q, params = {}) {
+    return this.get(`/api/search${this.queryString({ q, ...params })}`);
+  }
+
+  // Live feed of committed analyses and alerts (server-sent events).
+  // `handlers` maps event types ("alert", "alert_resolved", "analysis",
+  // "commit_analysis", "resync") to callbacks taking the parsed data; the
+  // browser reconnects by itself and resumes from the last event received.
+  // A "resync" means events were missed: reload state over REST.
+  subscribeEvents(handlers, types) {
+    const source = new EventSource(`${this.baseURL}/api/events${this.queryString({ types })}`);
+    Object.entries(handlers).forEach(([type, handler]) => {
+      source.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+    });
+    return source;
+  }
+
+  queryString(params) {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null) {
+        query.append(key, Array.isArray(value) ? value.join(",") : value);
+      }
+    });
+    const encoded = query.toString();
+    return encoded ? `?${encoded}` : "";
+  }
+
   async resolveAlert(alertId) {
     return this.post(`/api/alerts/${alertId}/resolve`);
   }
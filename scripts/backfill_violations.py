@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+DevOps Fraud Shield Violations Backfill
+Copies the rule violations of analyses stored before the normalized
+violations table existed into it. New analyses are normalized as they are
+written; this only needs to run once after upgrading, and is safe to
+interrupt and rerun.
+
+Usage: python scripts/backfill_violations.py [--batch-size 1000]
+"""
+
+import argparse
+import os
+import sys
+
+# In Docker the backend sources sit next to this script in /app
+if os.path.exists('/app/src'):
+    sys.path.insert(0, '/app')
+else:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from src.services.db_service import DBService
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the normalized violations table")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="Source rows per write transaction")
+    args = parser.parse_args()
+
+    db_service = DBService()
+    try:
+        inserted = db_service.backfill_violations(batch_size=args.batch_size)
+    finally:
+        db_service.close()
+
+    for source, count in inserted.items():
+        print(f"{source}: {count} violations backfilled")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
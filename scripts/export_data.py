@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+DevOps Fraud Shield Data Export
+Exports analysis_results, commit_analysis or alerts as NDJSON or CSV,
+optionally gzip-compressed, and imports such exports back (for restores).
+Rows are streamed in batches, so any table size runs in constant memory.
+
+Exports are incremental: each run covers the rows added or updated since
+--since and reports the watermark to pass next time. With --state the
+watermark of every table is kept in a JSON file instead, for cron jobs.
+
+Usage:
+    python scripts/export_data.py export alerts -o alerts.ndjson.gz
+    python scripts/export_data.py export commit_analysis --format csv --state export_state.json -o commits.csv
+    python scripts/export_data.py import alerts alerts.ndjson.gz
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# In Docker the backend sources sit next to this script in /app
+if os.path.exists('/app/src'):
+    sys.path.insert(0, '/app')
+else:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from src.services.data_export import FORMATS, DataExporter
+from src.services.db_service import DBService
+
+def guess_format(path, fmt):
+    """--format, or the format named by the file extension"""
+    if fmt:
+        return fmt
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "ndjson"
+
+def load_state(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+def save_state(path, state):
+    # Replace the file atomically so an interrupted run keeps the old watermarks
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def export_table(exporter, args):
+    state = load_state(args.state)
+    since = args.since if args.since is not None else state.get(args.table)
+    if not isinstance(since, str):
+        # Id watermarks from before updated rows were tracked: start over once
+        since = None
+    fmt = guess_format(args.output, args.format)
+    compress = args.gzip or args.output.endswith(".gz")
+
+    with open(args.output, "wb") as out:
+        rows, watermark = exporter.export(args.table, out, fmt, since, compress)
+
+    if args.state:
+        state[args.table] = watermark
+        save_state(args.state, state)
+    print(f"Exported {rows} {args.table} rows; next export: --since {watermark}")
+
+def import_table(exporter, args):
+    fmt = guess_format(args.input, args.format)
+    with open(args.input, "rb") as source:
+        inserted = exporter.import_file(args.table, source, fmt)
+    print(f"Imported {inserted} {args.table} rows (rows already present were skipped unless updated)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import analysis history")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Rows per read or write transaction (default: EXPORT_BATCH_SIZE or 1000)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write a table as NDJSON or CSV")
+    export_parser.add_argument("table", choices=sorted(DBService.EXPORTS))
+    # Not stdout: the service logs go there
+    export_parser.add_argument("-o", "--output", required=True, help="Output file; a .gz name compresses")
+    export_parser.add_argument("--format", choices=sorted(FORMATS), help="Default: from the file name, else ndjson")
+    export_parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    export_parser.add_argument("--since", help="Watermark of the previous export: only rows added or updated since")
+    export_parser.add_argument("--state", help="JSON file keeping the watermark of each table between runs")
+
+    import_parser = commands.add_parser("import", help="Load an export back into its table")
+    import_parser.add_argument("table", choices=sorted(DBService.EXPORTS))
+    import_parser.add_argument("input", help="Export file, gzip-compressed or not")
+    import_parser.add_argument("--format", choices=sorted(FORMATS), help="Default: from the file name, else ndjson")
+    args = parser.parse_args()
+
+    db_service = DBService()
+    try:
+        exporter = DataExporter(db_service, batch_size=args.batch_size)
+        if args.command == "export":
+            export_table(exporter, args)
+        else:
+            import_table(exporter, args)
+    finally:
+        db_service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,70 @@
 #!/usr/bin/env python3
 """
-Initialize the database with schema
+Initialize the database, or upgrade an existing one, to the current schema
+
+    --check-stats    verify the /api/fraud/stats counters against a full recount
+    --repair-stats   same, resetting the counters if they have drifted
 """
+import argparse
 import sqlite3
 import os
+import sys
+
+# In Docker the backend sources sit next to this script in /app
+if os.path.exists('/app/src'):
+    sys.path.insert(0, '/app')
+else:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-def init_database():
+from src.services.db_migrations import SCHEMA_VERSION, migrate
+from src.services.db_service import DBService
+
+def init_database(check_stats=False, repair_stats=False):
     # In Docker container, files are in /app
     # Locally, adjust paths accordingly
-    if os.path.exists('/app/database/schema.sql'):
+    if os.path.exists('/app/database'):
         # Docker environment
-        db_path = '/app/database/fraud_logs.db'
-        schema_path = '/app/database/schema.sql'
+        db_path = os.getenv('DB_PATH', '/app/database/fraud_logs.db')
     else:
         # Local development
-        db_path = os.path.join(os.path.dirname(__file__), '..', 'backend', 'database', 'fraud_logs.db')
-        schema_path = os.path.join(os.path.dirname(__file__), '..', 'backend', 'database', 'schema.sql')
+        db_path = os.getenv('DB_PATH') or os.path.join(
+            os.path.dirname(__file__), '..', 'backend', 'database', 'fraud_logs.db'
+        )
 
     # Create database directory if it doesn't exist
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
-    # Connect to database
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Read and execute schema
-    with open(schema_path, 'r') as f:
-        schema_sql = f.read()
+    try:
+        applied = migrate(conn)
+    finally:
+        conn.close()
 
-    cursor.executescript(schema_sql)
-    conn.commit()
-    conn.close()
+    print(f"Database initialized at schema version {SCHEMA_VERSION} "
+          f"(applied migrations: {applied or 'none'})")
 
-    print("Database initialized successfully!")
+    if check_stats or repair_stats:
+        db_service = DBService(db_path=db_path)
+        try:
+            result = db_service.check_fraud_stats(repair=repair_stats)
+        finally:
+            db_service.close()
+        if result is None:
+            sys.exit("Statistics check failed, see the log for details")
+        print(f"Statistics counters: {result['counters']}")
+        print(f"Full recount:        {result['recomputed']}")
+        if result["consistent"]:
+            print("Counters are consistent")
+        elif result["repaired"]:
+            print(f"Counters repaired (drift: {result['drift']})")
+        else:
+            sys.exit(f"Counters have drifted: {result['drift']}")
 
 if __name__ == "__main__":
-    init_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check-stats", action="store_true",
+                        help="verify the statistics counters against a full recount")
+    parser.add_argument("--repair-stats", action="store_true",
+                        help="reset the statistics counters if they have drifted")
+    args = parser.parse_args()
+    init_database(check_stats=args.check_stats, repair_stats=args.repair_stats)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+DevOps Fraud Shield Database Retention
+Rolls expired analyses up into daily aggregates, deletes them and finished
+webhook deliveries past their retention, then reclaims the freed space.
+Retention periods come from the RETENTION_* environment variables. Run it
+from cron with RETENTION_INTERVAL_SECONDS=0 on the API to keep the work out
+of the API processes.
+
+Usage: python scripts/run_retention.py [--full-vacuum]
+"""
+
+import argparse
+import os
+import sys
+
+# In Docker the backend sources sit next to this script in /app
+if os.path.exists('/app/src'):
+    sys.path.insert(0, '/app')
+else:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from src.services.db_service import DBService
+from src.services.retention import RetentionManager
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database retention policies")
+    parser.add_argument("--full-vacuum", action="store_true",
+                        help="afterwards rewrite the whole database, enabling incremental "
+                             "auto-vacuum on databases created before it was the default "
+                             "(blocks writers while it runs)")
+    args = parser.parse_args()
+
+    db_service = DBService()
+    try:
+        result = RetentionManager(db_service).run_once()
+        print(f"Rolled up {result['analysis']} analyses and {result['commit']} commit analyses, "
+              f"deleted {result['webhook_logs']} webhook deliveries, "
+              f"released {result['vacuumed_pages']} pages in {result['duration']}s")
+        if args.full_vacuum:
+            db_service.full_vacuum()
+            print("Database vacuumed")
+    finally:
+        db_service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
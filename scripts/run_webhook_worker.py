@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+DevOps Fraud Shield Webhook Worker
+Drains the durable webhook queue in a separate process. Run the API with
+WEBHOOK_WORKERS=0 to move all webhook analysis out of the API process.
+
+Usage: python scripts/run_webhook_worker.py [--workers 4]
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from src.api.dependencies import get_container
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued webhook deliveries")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEBHOOK_WORKER_THREADS", "4")),
+                        help="Number of worker threads")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    container = get_container()
+    container.warm_up()
+    webhook_workers = container.webhook_workers
+    webhook_workers.workers = args.workers
+    webhook_workers.start()
+    stop.wait()
+    webhook_workers.stop()
+    container.db_service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
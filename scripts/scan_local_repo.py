@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+DevOps Fraud Shield Offline Repository Scanner
+Runs fraud analysis over the full history of a local (bare or mirror) clone
+without calling the GitLab API.
+
+Usage: python scripts/scan_local_repo.py /path/to/repo.git [--batch-size 500] [--since 2024-01-01]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from src.core.fraud_engine import FraudEngine
+from src.services.git_scanner import LocalGitScanner
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a local git clone for fraud indicators")
+    parser.add_argument("repo_path", help="Path to a bare, mirror or working clone")
+    parser.add_argument("--batch-size", type=int, default=500, help="Commits analyzed per batch")
+    parser.add_argument("--rev", default="--all", help="Revision range to scan (default: all refs)")
+    parser.add_argument("--since", help="Only scan commits newer than this date")
+    parser.add_argument("--max-count", type=int, help="Stop after this many commits")
+    parser.add_argument("--name", help="Repository name to record results under")
+    args = parser.parse_args()
+
+    scanner = LocalGitScanner(args.repo_path)
+    if not scanner.is_repository():
+        print(f"Not a git repository: {args.repo_path}", file=sys.stderr)
+        return 1
+
+    summary = scanner.scan(
+        FraudEngine(),
+        batch_size=args.batch_size,
+        repository=args.name,
+        rev=args.rev,
+        since=args.since,
+        max_count=args.max_count
+    )
+    print(json.dumps(summary, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())